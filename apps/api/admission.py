@@ -0,0 +1,203 @@
+"""
+Admission control for the API: an ASGI middleware in front of the routes.
+Requests are classed by path: probes (/health, /ready, /metrics/*, /admin/*) always pass;
+"verify" (pipeline runs and other expensive work) and "read" (cheap lookups) each have a
+concurrency limit and share one bounded wait queue. When a slot frees, queued reads are
+admitted before queued verifies; a read arriving at a full queue displaces the newest
+queued verify. Requests that would wait longer than their class's queue-time SLO, or
+that find the queue full, are shed with 503 and Retry-After. A limit of 0 disables it.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+
+ADMISSION_VERIFY_LIMIT = int(os.environ.get("ADMISSION_VERIFY_LIMIT", "8"))
+ADMISSION_READ_LIMIT = int(os.environ.get("ADMISSION_READ_LIMIT", "64"))
+ADMISSION_QUEUE_SIZE = int(os.environ.get("ADMISSION_QUEUE_SIZE", "128"))
+ADMISSION_VERIFY_QUEUE_MS = float(os.environ.get("ADMISSION_VERIFY_QUEUE_MS", "2000"))
+ADMISSION_READ_QUEUE_MS = float(os.environ.get("ADMISSION_READ_QUEUE_MS", "250"))
+
+PROBE_PATHS = frozenset(("/health", "/ready"))
+PRIORITY = {"read": 0, "verify": 1}  # lower is admitted first
+# Queue-wait histogram buckets (upper bounds, ms); the last bucket is open-ended
+WAIT_BUCKETS_MS = (1, 5, 25, 100, 250, 1000, 2500)
+SERVICE_EWMA_ALPHA = 0.1
+
+
+def classify(method: str, path: str) -> str:
+    """Endpoint class of a request: probe, verify or read."""
+    if path in PROBE_PATHS or path.startswith(("/metrics/", "/admin/")):
+        return "probe"
+    if (method == "POST" and path in ("/verify", "/execute")) or path.endswith("/export"):
+        return "verify"  # pipeline runs, artifact rendering and full topic streams
+    return "read"
+
+
+class _Class:
+    __slots__ = ("limit", "max_wait", "inflight", "queued", "admitted", "shed", "service_s", "wait_hist")
+
+    def __init__(self, limit: int, max_wait_ms: float):
+        self.limit = limit
+        self.max_wait = max_wait_ms / 1000
+        self.inflight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed = 0
+        self.service_s = 0.0
+        self.wait_hist = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+
+class AdmissionController:
+    """Slots and the priority wait queue; all methods run on the event loop."""
+
+    def __init__(
+        self,
+        verify_limit: int = ADMISSION_VERIFY_LIMIT,
+        read_limit: int = ADMISSION_READ_LIMIT,
+        queue_size: int = ADMISSION_QUEUE_SIZE,
+        verify_queue_ms: float = ADMISSION_VERIFY_QUEUE_MS,
+        read_queue_ms: float = ADMISSION_READ_QUEUE_MS,
+    ):
+        self.classes = {"verify": _Class(verify_limit, verify_queue_ms), "read": _Class(read_limit, read_queue_ms)}
+        self.queue_size = queue_size
+        self._heap: list[tuple[int, int, str, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    def _free(self, c: _Class) -> bool:
+        return c.limit <= 0 or c.inflight < c.limit
+
+    async def acquire(self, cls: str) -> bool:
+        """Take a slot for the class, waiting in the queue if needed; False means shed."""
+        c = self.classes[cls]
+        t = time.monotonic()
+        if self._free(c) and not c.queued:
+            c.inflight += 1
+            self._record(c, t)
+            return True
+        if len(self._heap) >= self.queue_size and not self._displace(cls):
+            c.shed += 1
+            return False
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (PRIORITY[cls], next(self._seq), cls, fut))
+        c.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), c.max_wait)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # Client went away while queued: give back a slot reserved for it meanwhile
+            if fut.done() and fut.result():
+                self.release(cls, c.service_s)
+            elif not fut.done():
+                self._remove(fut)
+                c.queued -= 1
+            raise
+        if fut.done() and fut.result():
+            self._record(c, t)  # the slot was reserved by _dispatch
+            return True
+        if not fut.done():
+            self._remove(fut)
+            c.queued -= 1
+        c.shed += 1
+        return False
+
+    def release(self, cls: str, service_s: float) -> None:
+        c = self.classes[cls]
+        c.inflight -= 1
+        c.service_s = service_s if not c.service_s else c.service_s + SERVICE_EWMA_ALPHA * (service_s - c.service_s)
+        self._dispatch()
+
+    def retry_after(self, cls: str) -> int:
+        """Seconds until a slot is likely free: queued work ahead divided by the class's limit."""
+        c = self.classes[cls]
+        ahead = c.queued + c.inflight
+        return max(1, math.ceil(c.service_s * ahead / max(c.limit, 1)))
+
+    def _record(self, c: _Class, queued_at: float) -> None:
+        c.admitted += 1
+        waited_ms = (time.monotonic() - queued_at) * 1000
+        c.wait_hist[next((i for i, b in enumerate(WAIT_BUCKETS_MS) if waited_ms <= b), len(WAIT_BUCKETS_MS))] += 1
+
+    def _dispatch(self) -> None:
+        """Hand freed slots to queued requests, highest priority first."""
+        kept = []
+        while self._heap:
+            item = heapq.heappop(self._heap)
+            c = self.classes[item[2]]
+            if self._free(c):
+                c.queued -= 1
+                c.inflight += 1  # reserved for the waiter before it resumes
+                item[3].set_result(True)
+            else:
+                kept.append(item)
+        for item in kept:
+            heapq.heappush(self._heap, item)
+
+    def _displace(self, cls: str) -> bool:
+        """Make room for a higher-priority arrival by shedding the newest lower-priority waiter."""
+        victims = [w for w in self._heap if PRIORITY[w[2]] > PRIORITY[cls]]
+        if not victims:
+            return False
+        victim = max(victims, key=lambda w: (w[0], w[1]))
+        self._remove(victim[3])
+        self.classes[victim[2]].queued -= 1
+        victim[3].set_result(False)
+        return True
+
+    def _remove(self, fut: asyncio.Future) -> None:
+        self._heap = [w for w in self._heap if w[3] is not fut]
+        heapq.heapify(self._heap)
+
+    def metrics(self) -> dict:
+        labels = [f"<={b}ms" for b in WAIT_BUCKETS_MS] + [f">{WAIT_BUCKETS_MS[-1]}ms"]
+        return {
+            name: {
+                "limit": c.limit,
+                "inflight": c.inflight,
+                "queued": c.queued,
+                "admitted": c.admitted,
+                "shed": c.shed,
+                "avg_service_ms": round(c.service_s * 1000, 2),
+                "queue_wait_histogram": dict(zip(labels, c.wait_hist)),
+            }
+            for name, c in self.classes.items()
+        } | {"queue_size": self.queue_size, "queue_depth": len(self._heap)}
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware: streaming responses keep their slot
+    until the body is sent)."""
+
+    def __init__(self, app, controller: AdmissionController = None):
+        self.app = app
+        self.controller = controller or AdmissionController()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        cls = classify(scope["method"], scope["path"])
+        if cls == "probe":
+            return await self.app(scope, receive, send)
+        if not await self.controller.acquire(cls):
+            return await self._shed(cls, send)
+        t = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(cls, time.monotonic() - t)
+
+    async def _shed(self, cls: str, send) -> None:
+        body = b'{"detail":"Server busy, retry later"}'
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.controller.retry_after(cls)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
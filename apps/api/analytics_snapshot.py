@@ -0,0 +1,270 @@
+"""
+Columnar analytics snapshot of topics, sessions, claims and sources.
+Periodically rebuilt from the store into numpy structured arrays (.npy) plus a UTF-8 string
+table; readers open them with mmap so every uvicorn worker shares the same page-cache pages.
+Read-only endpoints (/sources/top, /topic/{topic}/compare, contradictions) answer from it
+with vectorized aggregation instead of GROQ. Enabled when ANALYTICS_SNAPSHOT_DIR is set.
+
+Build once by hand: python analytics_snapshot.py
+"""
+import fcntl
+import os
+import shutil
+import time
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+ANALYTICS_SNAPSHOT_DIR = os.environ.get("ANALYTICS_SNAPSHOT_DIR", "")
+ANALYTICS_SNAPSHOT_INTERVAL = float(os.environ.get("ANALYTICS_SNAPSHOT_INTERVAL", "300"))
+KEEP_SNAPSHOTS = 2
+
+STANCES = ("neutral", "support", "oppose")
+
+TOPIC_DTYPE = np.dtype([("id", "i4"), ("slug", "i4"), ("title", "i4")])
+SESSION_DTYPE = np.dtype([
+    ("id", "i4"), ("topic", "i4"), ("question", "i4"), ("answer", "i4"),
+    ("reliability", "f4"), ("created_at", "i4"), ("created_ts", "f8"), ("claims_count", "i4"),
+])
+CLAIM_DTYPE = np.dtype([("id", "i4"), ("session", "i4"), ("topic", "i4"), ("stance", "i1"), ("text", "i4")])
+SOURCE_DTYPE = np.dtype([("id", "i4"), ("url", "i4"), ("title", "i4"), ("citation_count", "i4")])
+
+
+def _ts(value: Optional[str]) -> float:
+    try:
+        return datetime.fromisoformat((value or "").replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return 0.0
+
+
+class _Strings:
+    """Deduplicating string table builder: strings.bin + strings_off.npy (n + 1 offsets)."""
+
+    def __init__(self):
+        self._index: dict[str, int] = {}
+        self._chunks: list[bytes] = []
+        self._offsets = [0]
+
+    def add(self, s: Optional[str]) -> int:
+        s = s or ""
+        idx = self._index.get(s)
+        if idx is None:
+            b = s.encode()
+            idx = self._index[s] = len(self._chunks)
+            self._chunks.append(b)
+            self._offsets.append(self._offsets[-1] + len(b))
+        return idx
+
+    def save(self, path: str) -> None:
+        with open(os.path.join(path, "strings.bin"), "wb") as f:
+            f.write(b"".join(self._chunks) or b"\0")
+        np.save(os.path.join(path, "strings_off.npy"), np.asarray(self._offsets, dtype=np.int64))
+
+
+def build_snapshot(store, root: str, page_size: int = 1000) -> str:
+    """Stream the store into a new snapshot directory and atomically make it current."""
+    strings = _Strings()
+    topic_rows: dict[str, int] = {}
+    topics = []
+    for t in store.iter_documents("topic", "{ _id, slug, title }", page_size):
+        topic_rows[t["_id"]] = len(topics)
+        topics.append((strings.add(t["_id"]), strings.add(t.get("slug")), strings.add(t.get("title"))))
+
+    session_rows: dict[str, int] = {}
+    sessions = []
+    for s in store.iter_documents(
+        "session",
+        '{ _id, question, answer, reliabilityScore, createdAt, "topic": topic._ref, "claims_count": count(claims) }',
+        page_size,
+    ):
+        session_rows[s["_id"]] = len(sessions)
+        sessions.append((
+            strings.add(s["_id"]), topic_rows.get(s.get("topic"), -1),
+            strings.add(s.get("question")), strings.add(s.get("answer")),
+            float(s.get("reliabilityScore") or 0), strings.add(s.get("createdAt")),
+            _ts(s.get("createdAt")), int(s.get("claims_count") or 0),
+        ))
+
+    source_rows: dict[str, int] = {}
+    sources = []
+    for s in store.iter_documents("source", "{ _id, url, title }", page_size):
+        source_rows[s["_id"]] = len(sources)
+        sources.append((strings.add(s["_id"]), strings.add(s.get("url")), strings.add(s.get("title")), 0))
+
+    claims = []
+    claim_sources: list[int] = []
+    claim_source_off = [0]
+    for c in store.iter_documents(
+        "claim",
+        '{ _id, text, stance, "session": session._ref, "topic": topic._ref, "sources": sources[]._ref }',
+        page_size,
+    ):
+        stance = c.get("stance") or "neutral"
+        claims.append((
+            strings.add(c["_id"]), session_rows.get(c.get("session"), -1), topic_rows.get(c.get("topic"), -1),
+            STANCES.index(stance) if stance in STANCES else 0, strings.add(c.get("text")),
+        ))
+        refs = {source_rows[r] for r in c.get("sources") or [] if r in source_rows}
+        claim_sources.extend(sorted(refs))
+        claim_source_off.append(len(claim_sources))
+
+    source_arr = np.array(sources, dtype=SOURCE_DTYPE)
+    if len(source_arr):
+        source_arr["citation_count"] = np.bincount(
+            np.asarray(claim_sources, dtype=np.int64), minlength=len(source_arr)
+        )
+
+    os.makedirs(root, exist_ok=True)
+    name = f"snap-{time.time_ns()}"
+    tmp = os.path.join(root, f".{name}.tmp")
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "topics.npy"), np.array(topics, dtype=TOPIC_DTYPE))
+    np.save(os.path.join(tmp, "sessions.npy"), np.array(sessions, dtype=SESSION_DTYPE))
+    np.save(os.path.join(tmp, "claims.npy"), np.array(claims, dtype=CLAIM_DTYPE))
+    np.save(os.path.join(tmp, "sources.npy"), source_arr)
+    np.save(os.path.join(tmp, "claim_sources.npy"), np.asarray(claim_sources, dtype=np.int32))
+    np.save(os.path.join(tmp, "claim_sources_off.npy"), np.asarray(claim_source_off, dtype=np.int64))
+    strings.save(tmp)
+    os.rename(tmp, os.path.join(root, name))
+    with open(os.path.join(root, "CURRENT.tmp"), "w") as f:
+        f.write(name)
+    os.replace(os.path.join(root, "CURRENT.tmp"), os.path.join(root, "CURRENT"))
+    _prune(root, keep=name)
+    return os.path.join(root, name)
+
+
+def _prune(root: str, keep: str) -> None:
+    """Delete old snapshots; readers that still map them keep their pages until they reload."""
+    snaps = sorted(d for d in os.listdir(root) if d.startswith("snap-"))
+    for d in snaps[:-KEEP_SNAPSHOTS]:
+        if d != keep:
+            shutil.rmtree(os.path.join(root, d), ignore_errors=True)
+
+
+def rebuild_if_due(store, root: str, interval: float = ANALYTICS_SNAPSHOT_INTERVAL) -> bool:
+    """Rebuild when the current snapshot is older than interval. A lock file makes sure only
+    one process (of many uvicorn workers) builds; the others keep reading the old snapshot."""
+    os.makedirs(root, exist_ok=True)
+    current = os.path.join(root, "CURRENT")
+    if os.path.exists(current) and time.time() - os.path.getmtime(current) < interval:
+        return False
+    with open(os.path.join(root, "build.lock"), "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        try:
+            if os.path.exists(current) and time.time() - os.path.getmtime(current) < interval:
+                return False
+            build_snapshot(store, root)
+            return True
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class AnalyticsSnapshot:
+    """Read-only, memory-mapped view over one snapshot directory."""
+
+    def __init__(self, path: str):
+        self.path = path
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")  # noqa: E731
+        self.topics = load("topics.npy")
+        self.sessions = load("sessions.npy")
+        self.claims = load("claims.npy")
+        self.sources = load("sources.npy")
+        self.claim_sources = load("claim_sources.npy")
+        self.claim_sources_off = load("claim_sources_off.npy")
+        self._str_off = load("strings_off.npy")
+        self._str_blob = np.memmap(os.path.join(path, "strings.bin"), dtype=np.uint8, mode="r")
+        self._topic_rows = {self.s(t["slug"]): row for row, t in enumerate(self.topics)}
+
+    def s(self, idx: int) -> str:
+        start, end = int(self._str_off[idx]), int(self._str_off[idx + 1])
+        return bytes(self._str_blob[start:end]).decode()
+
+    def _topic_row(self, topic: str) -> int:
+        return self._topic_rows.get(topic.replace(" ", "-").lower()[:50], -1)
+
+    def top_sources(self, limit: int = 20) -> list[dict]:
+        counts = np.asarray(self.sources["citation_count"])
+        limit = max(0, min(limit, len(counts)))
+        if limit == 0:
+            return []
+        top = np.argpartition(-counts, limit - 1)[:limit]
+        top = top[np.lexsort((top, -counts[top]))]
+        return [
+            {"url": self.s(self.sources[i]["url"]), "title": self.s(self.sources[i]["title"]), "citation_count": int(counts[i])}
+            for i in top
+        ]
+
+    def compare_sessions_by_topic(self, topic: str) -> list[dict]:
+        row = self._topic_row(topic)
+        if row < 0:
+            return []
+        idx = np.flatnonzero(np.asarray(self.sessions["topic"]) == row)
+        idx = idx[np.argsort(-np.asarray(self.sessions["created_ts"])[idx], kind="stable")]
+        return [
+            {
+                "session_id": self.s(s["id"]),
+                "question": self.s(s["question"]),
+                "answer": self.s(s["answer"]),
+                "reliability_score": round(float(s["reliability"]), 4),
+                "created_at": self.s(s["created_at"]),
+                "claims_count": int(s["claims_count"]),
+            }
+            for s in self.sessions[idx]
+        ]
+
+    def get_contradictions(self, topic: Optional[str] = None) -> list[dict]:
+        stance = np.asarray(self.claims["stance"])
+        topics = np.asarray(self.claims["topic"])
+        mask = stance != 0
+        if topic:
+            row = self._topic_row(topic)
+            if row < 0:
+                return []
+            mask &= topics == row
+        pairs = []
+        for t in np.unique(topics[mask]):
+            in_topic = mask & (topics == t)
+            supports = np.flatnonzero(in_topic & (stance == 1))
+            opposes = np.flatnonzero(in_topic & (stance == 2))
+            slug = self.s(self.topics[t]["slug"]) if t >= 0 else "general"
+            for a in supports:
+                for b in opposes:
+                    pairs.append({
+                        "topic": slug,
+                        "support_claim": self.s(self.claims[a]["text"]),
+                        "oppose_claim": self.s(self.claims[b]["text"]),
+                        "support_id": self.s(self.claims[a]["id"]),
+                        "oppose_id": self.s(self.claims[b]["id"]),
+                    })
+        return pairs
+
+
+class SnapshotReader:
+    """Follows root/CURRENT and swaps to a newer snapshot when one is published."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._name: Optional[str] = None
+        self._snapshot: Optional[AnalyticsSnapshot] = None
+
+    def current(self) -> Optional[AnalyticsSnapshot]:
+        try:
+            with open(os.path.join(self.root, "CURRENT")) as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return None
+        if name != self._name:
+            self._snapshot = AnalyticsSnapshot(os.path.join(self.root, name))
+            self._name = name
+        return self._snapshot
+
+
+if __name__ == "__main__":
+    from sanity_store import SanityStore
+
+    root = ANALYTICS_SNAPSHOT_DIR or "analytics-snapshot"
+    print(build_snapshot(SanityStore(), root))
@@ -0,0 +1,208 @@
+"""
+Bulk backfill / re-scoring over the stored corpus.
+Streams sessions (with their claims and sources dereferenced) from Sanity page by page, re-runs
+claim building and reliability scoring in a process pool over chunks, and writes the changes
+back in batched transactions of at most --batch mutations, cut at session boundaries (a
+session is never split across transactions). Progress is checkpointed after every flushed
+batch, so an interrupted run resumes where it stopped. Memory is bounded by page size,
+in-flight chunks and the mutation batch, not by corpus size. Every session is scored with
+fresh BM25 statistics, so the output does not depend on how sessions were split over workers
+and reruns are deterministic.
+
+  python backfill.py --checkpoint backfill.ckpt                # re-score reliabilityScore
+  python backfill.py --checkpoint backfill.ckpt --rebuild      # also rewrite claim/source docs
+  python backfill.py --dry-run --workers 8 --chunk 500
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator
+
+from claim_extraction import BM25Model
+from models import Citation
+from sanity_store import SanityStore
+from verification import RELIABILITY_THRESHOLD, _build_claims_from_citations, _compute_reliability
+
+SESSION_PROJECTION = """{
+    _id, question, answer, reliabilityScore, canExecute, mode, createdAt, "topic": topic->title,
+    "claims": claims[]->{ _id, text, stance, "sources": sources[]->{ url, title, snippet, sourceName } }
+}"""
+
+
+def rescore_session(doc: dict, rebuild: bool = False) -> list[dict]:
+    """Mutations bringing one stored session in line with the current claim building and scoring.
+    Empty when nothing changed. canExecute is recomputed from the new score and the session's
+    mode, so a rescore can grant execution as well as revoke it. Sessions stored before the
+    mode was recorded count as execute-mode only if they could execute; the mode is then written
+    back so that a later rescore can grant execution again."""
+    citations = [
+        Citation(s.get("title") or "", s.get("url") or "", s.get("snippet") or "", None, s.get("sourceName"))
+        for cl in doc.get("claims") or [] for s in cl.get("sources") or []
+    ]
+    claims, citations = _build_claims_from_citations(citations, doc.get("question") or "", model=BM25Model())
+    score = _compute_reliability(claims, citations)
+    mode = doc.get("mode") or ("execute" if doc.get("canExecute") else "answer")
+    can_execute = mode == "execute" and score >= RELIABILITY_THRESHOLD
+    session_id = doc["_id"]
+
+    if not rebuild:
+        changes = {"reliabilityScore": score, "canExecute": can_execute, "mode": mode}
+        if all(doc.get(k) == v for k, v in changes.items()):
+            return []
+        return [{"patch": {"id": session_id, "set": changes}}]  # mode is recorded, so a later revoke is undone
+
+    mutations = SanityStore.build_mutations({
+        "session_id": session_id,
+        "question": doc.get("question") or "",
+        "answer": doc.get("answer") or "",
+        "reliability_score": score,
+        "can_execute": can_execute,
+        "mode": mode,
+        "claims": claims,
+        "citations": citations,
+        "topic": doc.get("topic"),
+        "created_at": doc.get("createdAt"),
+    })[1:]  # the topic document already exists
+    new_claim_ids = {m["createOrReplace"]["_id"] for m in mutations if m["createOrReplace"]["_type"] == "claim"}
+    stale = [cl["_id"] for cl in doc.get("claims") or [] if cl.get("_id") and cl["_id"] not in new_claim_ids]
+    return mutations + [{"delete": {"id": claim_id}} for claim_id in stale]
+
+
+def rescore_chunk(docs: list[dict], rebuild: bool = False) -> list[tuple[str, list[dict]]]:
+    """Process-pool entry point: (session id, mutations) for a chunk of sessions, in order."""
+    return [(doc["_id"], rescore_session(doc, rebuild)) for doc in docs]
+
+
+def _chunks(docs: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    chunk = []
+    for doc in docs:
+        chunk.append(doc)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def load_checkpoint(path: str) -> dict:
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {"last_id": "", "sessions": 0, "mutations": 0, "done": False}
+
+
+def save_checkpoint(path: str, state: dict) -> None:
+    """Atomic write: a crash leaves either the old or the new checkpoint, never a torn one."""
+    if not path:
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def run_backfill(
+    store,
+    checkpoint: str = "",
+    rebuild: bool = False,
+    workers: int = os.cpu_count() or 1,
+    chunk_size: int = 200,
+    batch_size: int = 500,
+    page_size: int = 1000,
+    dry_run: bool = False,
+    report_every: float = 10.0,
+    log=sys.stderr,
+) -> dict:
+    """Re-score every stored session. workers=0 runs in-process (tests, small corpora).
+    Returns the final checkpoint state plus throughput figures."""
+    state = load_checkpoint(checkpoint)
+    if state.get("done"):
+        return state
+    docs = store.iter_documents("session", SESSION_PROJECTION, page_size, after=state["last_id"])
+    pool = ProcessPoolExecutor(workers) if workers > 0 else None
+    in_flight: deque = deque()
+    buffer: list[dict] = []
+    started = last_report = time.perf_counter()
+    sessions = mutations = 0
+    tail = state["last_id"]  # last session whose mutations are buffered
+    pending = 0  # sessions buffered since the last flush
+
+    def flush() -> None:
+        nonlocal buffer, pending
+        if buffer and not dry_run:
+            store.mutate_batch(buffer)
+        state["mutations"] += len(buffer)
+        state["sessions"] += pending
+        state["last_id"] = tail
+        buffer, pending = [], 0
+        save_checkpoint(checkpoint, state)
+
+    def collect(fut_or_result) -> None:
+        nonlocal sessions, mutations, last_report, tail, pending
+        result = fut_or_result.result() if pool else fut_or_result
+        for session_id, session_mutations in result:
+            if buffer and len(buffer) + len(session_mutations) > batch_size:
+                flush()  # at a session boundary; a larger session gets its own transaction
+            buffer.extend(session_mutations)
+            sessions += 1
+            mutations += len(session_mutations)
+            pending += 1
+            tail = session_id
+        if len(buffer) >= batch_size:
+            flush()
+        now = time.perf_counter()
+        if log and now - last_report >= report_every:
+            last_report = now
+            print(json.dumps({"sessions": state["sessions"] + pending, "last_id": tail,
+                              "sessions_per_s": round(sessions / (now - started), 1)}), file=log, flush=True)
+
+    try:
+        for chunk in _chunks(docs, chunk_size):
+            if pool is None:
+                collect(rescore_chunk(chunk, rebuild))
+                continue
+            in_flight.append(pool.submit(rescore_chunk, chunk, rebuild))
+            # Bounded in-flight work; results are consumed in submission order so the
+            # checkpoint only ever covers a contiguous prefix of the corpus.
+            while len(in_flight) > 2 * workers:
+                collect(in_flight.popleft())
+        while in_flight:
+            collect(in_flight.popleft())
+        flush()
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+    state["done"] = True
+    save_checkpoint(checkpoint, state)
+    elapsed = time.perf_counter() - started
+    return {
+        **state,
+        "run_sessions": sessions,
+        "run_mutations": mutations,
+        "elapsed_s": round(elapsed, 2),
+        "sessions_per_s": round(sessions / elapsed, 1) if elapsed else 0.0,
+        "dry_run": dry_run,
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Re-score (and optionally rebuild) every stored session.")
+    ap.add_argument("--checkpoint", default="backfill.ckpt", help="resume file; delete it to start over")
+    ap.add_argument("--rebuild", action="store_true", help="rewrite claim and source documents too")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--chunk", type=int, default=200, help="sessions per process-pool task")
+    ap.add_argument("--batch", type=int, default=500, help="mutations per transaction")
+    ap.add_argument("--page", type=int, default=1000, help="documents per GROQ page")
+    ap.add_argument("--dry-run", action="store_true")
+    a = ap.parse_args()
+    store = SanityStore()
+    if not store.enabled:
+        sys.exit("SANITY_PROJECT_ID and SANITY_TOKEN must be set")
+    print(json.dumps(run_backfill(
+        store, a.checkpoint, a.rebuild, a.workers, a.chunk, a.batch, a.page, a.dry_run,
+    ), indent=2))
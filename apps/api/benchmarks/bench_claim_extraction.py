@@ -0,0 +1,71 @@
+"""
+Microbenchmark: query-aware claim extraction (sentence split + BM25 top-k per source) vs. the
+previous 200-character cut, for 10/100/300 citations per request.
+"cold" clears the per-snippet analysis cache before every request (all sources unseen);
+"warm" is a repeat of the same sources (search-cache hits, popular pages).
+Two snippet shapes: "web" (2-3 sentences, like You.com descriptions) and "long" (8 sentences).
+Usage: python benchmarks/bench_claim_extraction.py [--repeat 50]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from claim_extraction import analyze_snippet  # noqa: E402
+from models import Citation  # noqa: E402
+from verification import _build_claims_from_citations  # noqa: E402
+
+QUESTION = "How does the Python asyncio event loop schedule coroutines?"
+WORDS = (
+    "asyncio event loop schedules coroutines tasks futures callbacks python thread io selector "
+    "await runs concurrently network sockets timeout cancellation executor blocking library"
+).split()
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 22))]
+    return " ".join(words).capitalize() + rng.choice([".", ".", ".", "!"])
+
+
+def _citations(n: int, sentences: int, seed: int) -> list[Citation]:
+    rng = random.Random(seed)
+    return [
+        Citation(f"Result {i}", f"https://site{i}.example.com/{seed}", " ".join(_sentence(rng) for _ in range(sentences)))
+        for i in range(n)
+    ]
+
+
+def _ms(fn, repeat: int, clear: bool = False) -> float:
+    best = float("inf")
+    for _ in range(3):
+        total = 0.0
+        for _ in range(repeat):
+            if clear:
+                analyze_snippet.cache_clear()
+            t = time.perf_counter()
+            fn()
+            total += time.perf_counter() - t
+        best = min(best, total / repeat * 1000)
+    return round(best, 3)
+
+
+def main(repeat: int) -> dict:
+    out = {}
+    for shape, sentences in (("web", 3), ("long", 8)):
+        for n in (10, 100, 300):
+            cites = _citations(n, sentences, seed=n)
+            out[f"{shape}_{n}"] = {
+                "truncate_ms": _ms(lambda: _build_claims_from_citations(cites), repeat),
+                "extract_cold_ms": _ms(lambda: _build_claims_from_citations(cites, QUESTION), repeat, clear=True),
+                "extract_warm_ms": _ms(lambda: _build_claims_from_citations(cites, QUESTION), repeat),
+            }
+    return out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=50)
+    print(json.dumps(main(ap.parse_args().repeat), indent=2))
@@ -0,0 +1,69 @@
+"""
+Recall/latency benchmark for ClaimIndex at 10k, 100k and 1M claims.
+Usage: python benchmarks/bench_claim_index.py [--sizes 10000 100000 1000000] [--queries 200] [--nprobe 8]
+Vectors are synthetic (topic -> subtopic -> claim clusters) so the 1M case builds in reasonable
+time; recall@10 is measured against exact brute-force search over the same memmap.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from claim_index import ClaimIndex  # noqa: E402
+from embeddings import DIM  # noqa: E402
+
+
+def _centers(rng, n_topics: int = 500, per_topic: int = 40) -> np.ndarray:
+    topics = rng.standard_normal((n_topics, DIM)).astype(np.float32)
+    return topics.repeat(per_topic, axis=0) + 0.5 * rng.standard_normal((n_topics * per_topic, DIM)).astype(np.float32)
+
+
+def _claims(centers: np.ndarray, n: int, rng) -> np.ndarray:
+    x = centers[rng.integers(len(centers), size=n)] + 0.25 * rng.standard_normal((n, DIM)).astype(np.float32)
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    return x
+
+
+def run(size: int, n_queries: int, nprobe: int, k: int = 10, batch: int = 50_000) -> dict:
+    rng = np.random.default_rng(size)
+    centers = _centers(rng)
+    with tempfile.TemporaryDirectory() as d:
+        idx = ClaimIndex(d, nprobe=nprobe)
+        t0 = time.perf_counter()
+        for start in range(0, size, batch):
+            vecs = _claims(centers, min(batch, size - start), rng)
+            idx.add([""] * len(vecs), [{}] * len(vecs), vectors=vecs)
+        build_s = time.perf_counter() - t0
+        queries = _claims(centers, n_queries, rng)
+        latencies, recalls = [], []
+        for q in queries:
+            t = time.perf_counter()
+            got = {row for row, _ in idx.search_vector(q, k)}
+            latencies.append((time.perf_counter() - t) * 1000)
+            exact = np.argpartition(-np.asarray(idx._vectors @ q), k)[:k]
+            recalls.append(len(got & set(exact.tolist())) / k)
+        lat = np.array(latencies)
+        return {
+            "size": size,
+            "ivf": idx._centroids is not None,
+            "nlist": 0 if idx._centroids is None else len(idx._centroids),
+            "nprobe": idx.nprobe,
+            "build_s": round(build_s, 2),
+            "recall_at_10": round(float(np.mean(recalls)), 4),
+            "p50_ms": round(float(np.percentile(lat, 50)), 3),
+            "p99_ms": round(float(np.percentile(lat, 99)), 3),
+        }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--nprobe", type=int, default=8)
+    args = ap.parse_args()
+    print(json.dumps([run(s, args.queries, args.nprobe) for s in args.sizes], indent=2))
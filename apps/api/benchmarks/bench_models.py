@@ -0,0 +1,134 @@
+"""
+Microbenchmark: slotted Citation/Claim models vs. the previous dict-based pipeline.
+Measures retained memory per cached session (tracemalloc) and CPU time for the in-process
+/verify work on 15 raw search results: normalize -> build claims -> reliability -> response
+bytes (dict path: validated VerifyResponse JSON; slotted path: direct orjson encoding, as /verify does).
+Usage: python benchmarks/bench_models.py [--sessions 2000] [--repeat 2000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from main import VERIFY_RESPONSE_FIELDS, VerifyResponse  # noqa: E402
+from models import to_json  # noqa: E402
+from verification import _build_claims_from_citations, _compute_reliability  # noqa: E402
+from you_client import _normalize_citation  # noqa: E402
+
+
+def _raw_results(seed: int, n: int = 15) -> list[dict]:
+    return [
+        {
+            "title": f"Result {seed}-{i}: asyncio event loop reference",
+            "url": f"https://example{i}.com/docs/{seed}",
+            "description": f"Snippet {seed}-{i}. " + "asyncio runs coroutines cooperatively on a single thread. " * 5,
+            "date": "2024-01-01",
+            "source": f"Example {i}",
+        }
+        for i in range(n)
+    ]
+
+
+# --- Previous dict-based implementation, kept here as the baseline ---
+def _legacy_normalize(raw: dict) -> dict:
+    return {
+        "title": raw.get("title") or raw.get("name") or "",
+        "url": raw.get("url") or raw.get("link") or "",
+        "snippet": raw.get("snippet") or raw.get("description") or raw.get("body") or "",
+        "published_at": raw.get("published_at") or raw.get("date"),
+        "source_name": raw.get("source") or raw.get("source_name"),
+    }
+
+
+def _legacy_build(citations: list[dict]) -> tuple[list[dict], list[dict]]:
+    seen, unique = set(), []
+    for c in citations:
+        url = c.get("url", "")
+        if not url or url in seen:
+            continue
+        seen.add(url)
+        unique.append({
+            "title": c.get("title", ""),
+            "url": url,
+            "snippet": c.get("snippet", ""),
+            "published_at": c.get("published_at"),
+            "source_name": c.get("source_name"),
+        })
+    claims = [
+        {"id": f"cl-{i}", "text": (c.get("snippet") or "")[:200] or c.get("title", ""), "stance": "neutral",
+         "citation_ids": [i], "confidence": 0.85}
+        for i, c in enumerate(unique[:10])
+    ]
+    return claims, unique
+
+
+def _legacy_reliability(claims: list[dict], citations: list[dict]) -> float:
+    n_claims, n_cit = max(len(claims), 1), max(len(citations), 1)
+    score = 0.3 + 0.3 * min(n_claims / 5, 1) + 0.3 * min(n_cit / 5, 1)
+    score += 0.1 * sum(c.get("confidence", 0.8) for c in claims) / n_claims
+    return round(min(score, 0.95), 2)
+
+
+def _response_json(payload: dict) -> bytes:
+    return VerifyResponse(
+        answer="", reliability_score=payload["reliability_score"], claims=payload["claims"],
+        citations=payload["citations"], session_id="s", can_execute=False,
+    ).model_dump_json().encode()
+
+
+def legacy_session(raw: list[dict]) -> tuple[dict, bytes]:
+    claims, citations = _legacy_build([_legacy_normalize(r) for r in raw])
+    session = {"claims": claims, "citations": citations, "reliability_score": _legacy_reliability(claims, citations)}
+    return session, _response_json(session)
+
+
+def slotted_session(raw: list[dict]) -> tuple[dict, bytes]:
+    claims, citations = _build_claims_from_citations([_normalize_citation(r) for r in raw])
+    session = {"claims": claims, "citations": citations, "reliability_score": _compute_reliability(claims, citations)}
+    return session, to_json({k: session.get(k) for k in VERIFY_RESPONSE_FIELDS})
+
+
+def _memory_per_session(fn, inputs: list[list[dict]]) -> float:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [fn(raw)[0] for raw in inputs]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(s.size_diff for s in after.compare_to(before, "filename"))
+    assert len(kept) == len(inputs)
+    return retained / len(inputs)
+
+
+def _cpu_us(fn, raw: list[dict], repeat: int, rounds: int = 5) -> float:
+    """Best-of-rounds mean time per call, in microseconds."""
+    best = float("inf")
+    for _ in range(rounds):
+        t = time.perf_counter()
+        for _ in range(repeat):
+            fn(raw)
+        best = min(best, (time.perf_counter() - t) / repeat * 1e6)
+    return best
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=2000)
+    args = ap.parse_args()
+    inputs = [_raw_results(i) for i in range(args.sessions)]
+    report = {}
+    for name, fn in (("dict", legacy_session), ("slotted", slotted_session)):
+        report[name] = {
+            "bytes_per_session": round(_memory_per_session(fn, inputs)),
+            "us_per_verify": round(_cpu_us(fn, inputs[0], args.repeat), 1),
+        }
+    report["memory_reduction_pct"] = round(
+        100 * (1 - report["slotted"]["bytes_per_session"] / report["dict"]["bytes_per_session"]), 1
+    )
+    report["cpu_reduction_pct"] = round(
+        100 * (1 - report["slotted"]["us_per_verify"] / report["dict"]["us_per_verify"]), 1
+    )
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,78 @@
+"""
+Microbenchmark: response encoding for /verify and /session/{id}.
+Compares FastAPI's default path (VerifyResponse validation + response_model re-validation +
+jsonable_encoder + json.dumps) against the precomputed orjson bytes the endpoints now serve.
+Usage: python benchmarks/bench_response.py [--repeat 5000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from main import VERIFY_RESPONSE_FIELDS, VerifyResponse  # noqa: E402
+from models import to_json, to_payload  # noqa: E402
+from verification import run_verification_pipeline  # noqa: E402
+from you_client import YouClient  # noqa: E402
+
+VERIFY_FIELD = create_response_field(name="response", type_=VerifyResponse)
+
+
+def _drive(coro):
+    """Run a coroutine that never suspends (serialize_response with is_coroutine=True)."""
+    try:
+        coro.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("coroutine suspended")
+
+
+def _best_us(fn, repeat: int, rounds: int = 5) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        t = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - t) / repeat * 1e6)
+    return best
+
+
+def main(repeat: int) -> dict:
+    result = asyncio.run(run_verification_pipeline(
+        "How does asyncio work?", "answer", None, YouClient(stub=True), type("S", (), {"enabled": False})()
+    ))
+    cached = to_json(result)
+
+    def verify_default():
+        payload = to_payload(result)
+        model = VerifyResponse(**{k: payload.get(k) for k in VERIFY_RESPONSE_FIELDS})
+        content = _drive(serialize_response(field=VERIFY_FIELD, response_content=model))
+        return json.dumps(content).encode()
+
+    def verify_fast():
+        return to_json({k: result.get(k) for k in VERIFY_RESPONSE_FIELDS})
+
+    def session_default():
+        return json.dumps(jsonable_encoder(to_payload(result))).encode()
+
+    def session_fast():
+        return cached
+
+    out = {name: round(_best_us(fn, repeat), 2) for name, fn in (
+        ("verify_default_us", verify_default), ("verify_orjson_us", verify_fast),
+        ("session_default_us", session_default), ("session_cached_us", session_fast),
+    )}
+    out["verify_speedup"] = round(out["verify_default_us"] / out["verify_orjson_us"], 1)
+    return out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5000)
+    print(json.dumps(main(ap.parse_args().repeat), indent=2))
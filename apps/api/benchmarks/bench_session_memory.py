@@ -0,0 +1,85 @@
+"""
+Session cache memory benchmark: resident bytes per cached session (tracemalloc) for
+  plain     session dicts with Claim/Citation models plus their encoded /session bytes
+            (the previous _sessions + _session_payloads layout)
+  packed    PackedSessions over a SnippetStore (shared, compressed texts; bounded body cache)
+Sessions come from the real pipeline with search results drawn from --distinct-queries
+result sets (fresh strings per search, as when parsed from upstream or cache bytes), so
+popular sources recur across sessions as they do in production.
+Usage: python benchmarks/bench_session_memory.py [--sessions 5000] [--distinct-queries 300]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from fakes import you_results  # noqa: E402
+from models import Citation, to_json  # noqa: E402
+from snippet_store import PackedSessions  # noqa: E402
+from verification import run_verification_pipeline  # noqa: E402
+
+
+class PoolYou:
+    def __init__(self, distinct: int):
+        self.distinct = distinct
+        self.calls = 0
+
+    async def search(self, query: str) -> list[Citation]:
+        self.calls += 1
+        raw = you_results(f"python asyncio topic {self.calls % self.distinct}")["results"]
+        return [Citation(r["title"], r["url"], r["description"], r["date"], r["source"]) for r in raw]
+
+
+async def _results(n: int, distinct: int) -> list[dict]:
+    you = PoolYou(distinct)
+    return [await run_verification_pipeline(f"question {i} about asyncio", "answer", "python", you, None)
+            for i in range(n)]
+
+
+def _measure(build):
+    """(bytes still allocated after build(), what it built)."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return size, kept
+
+
+def main(sessions: int, distinct: int) -> dict:
+    def plain():
+        cache, payloads = {}, {}
+        for r in asyncio.run(_results(sessions, distinct)):
+            cache[r["session_id"]] = r
+            payloads[r["session_id"]] = (r, to_json(r))
+        return cache, payloads
+
+    def packed():
+        cache = PackedSessions()
+        for r in asyncio.run(_results(sessions, distinct)):
+            cache[r["session_id"]] = r
+            cache.set_encoded(r["session_id"], to_json(r))
+        return cache
+
+    plain_bytes, _ = _measure(plain)
+    packed_bytes, cache = _measure(packed)
+    return {
+        "sessions": sessions,
+        "distinct_queries": distinct,
+        "plain_bytes_per_session": plain_bytes // sessions,
+        "packed_bytes_per_session": packed_bytes // sessions,
+        "reduction_pct": round(100 * (1 - packed_bytes / plain_bytes), 1),
+        "store": cache.store.stats(),
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=5000)
+    ap.add_argument("--distinct-queries", type=int, default=300)
+    a = ap.parse_args()
+    print(json.dumps(main(a.sessions, a.distinct_queries), indent=2))
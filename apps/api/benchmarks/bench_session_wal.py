@@ -0,0 +1,85 @@
+"""
+Session WAL benchmark: write overhead and recovery time (default 1M sessions).
+  append_us         caller-side cost of SessionWAL.append (what /verify pays)
+  write_rps         sessions made durable per second (group commit, fdatasync)
+  fsyncs            commits needed for all appends
+  compact_ms        compaction of every closed segment into a snapshot
+  recovery_ms       cold start: mmap scan of snapshot + segments into the index
+  get_us            reading one session back (pread + inflate), p50 over 10k random ids
+Session bodies are real pipeline outputs (fake search results), one per id.
+Usage: python benchmarks/bench_session_wal.py [--sessions 1000000] [--dir /tmp/wal-bench]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from bench_session_memory import _results  # noqa: E402
+from models import to_json  # noqa: E402
+from session_wal import SessionWAL  # noqa: E402
+
+
+def main(sessions: int, path: str, fsync_ms: float) -> dict:
+    bodies = [to_json(r) for r in asyncio.run(_results(300, 300))]
+    ids = [f"{i:08d}-bench-session" for i in range(sessions)]
+    wal = SessionWAL(path, fsync_ms=fsync_ms)
+    wal.open()
+
+    t = time.perf_counter()
+    for i, session_id in enumerate(ids):
+        wal.append(session_id, bodies[i % len(bodies)])
+    append_s = time.perf_counter() - t
+    wal.flush(timeout=3600)
+    write_s = time.perf_counter() - t
+    stats = dict(wal.stats)
+
+    t = time.perf_counter()
+    kept = wal.compact(wal._segment - 1) if wal._segment > 1 else 0
+    compact_ms = (time.perf_counter() - t) * 1000
+    wal.close()
+    disk = sum(os.path.getsize(os.path.join(path, n)) for n in os.listdir(path))
+
+    reopened = SessionWAL(path)
+    t = time.perf_counter()
+    report = reopened.open()
+    recovery_ms = (time.perf_counter() - t) * 1000
+    gets = []
+    for session_id in random.Random(0).sample(ids, min(10000, sessions)):
+        t = time.perf_counter()
+        reopened.get(session_id)
+        gets.append((time.perf_counter() - t) * 1e6)
+    reopened.close()
+    return {
+        "sessions": sessions,
+        "avg_body_bytes": sum(map(len, bodies)) // len(bodies),
+        "disk_bytes_per_session": disk // sessions,
+        "append_us": round(append_s / sessions * 1e6, 2),
+        "write_rps": round(sessions / write_s),
+        "fsyncs": stats["fsyncs"],
+        "compacted_sessions": kept,
+        "compact_ms": round(compact_ms, 1),
+        "recovered": report["recovered"],
+        "recovery_ms": round(recovery_ms, 1),
+        "get_us_p50": round(statistics.median(gets), 1),
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=1_000_000)
+    ap.add_argument("--dir", default="")
+    ap.add_argument("--fsync-ms", type=float, default=10)
+    a = ap.parse_args()
+    path = a.dir or tempfile.mkdtemp(prefix="wal-bench-")
+    try:
+        print(json.dumps(main(a.sessions, path, a.fsync_ms), indent=2))
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,95 @@
+"""
+Startup benchmark: how quickly a cold API process can take traffic.
+  import_ms         python -c "import main" (deferred reportlab/httpx)
+  import_eager_ms   same, plus the modules that used to be imported eagerly (previous behaviour)
+  health_ms         uvicorn spawn -> first 200 from /health (liveness)
+  ready_ms          uvicorn spawn -> first 200 from /ready (warm-up done)
+With --snapshot-sessions N, a synthetic NDJSON warm-up snapshot of N sessions is generated
+and passed as WARMUP_SNAPSHOT, so ready_ms includes priming the caches.
+Usage: python benchmarks/bench_startup.py [--runs 5] [--snapshot-sessions 2000]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(__file__))
+from fakes import you_results  # noqa: E402
+from load import API_DIR, _free_port  # noqa: E402
+
+EAGER = "import httpx, reportlab.platypus, reportlab.lib.styles, reportlab.lib.pagesizes"
+
+
+def _import_ms(code: str, env: dict) -> float:
+    t = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=API_DIR, env=env, check=True)
+    return (time.perf_counter() - t) * 1000
+
+
+def _serve_ms(env: dict) -> tuple[float, float]:
+    port = _free_port()
+    t = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=API_DIR, env=env,
+    )
+    health = ready = None
+    try:
+        while ready is None and time.perf_counter() - t < 60:
+            try:
+                if health is None and httpx.get(f"http://127.0.0.1:{port}/health", timeout=0.5).status_code == 200:
+                    health = (time.perf_counter() - t) * 1000
+                if health is not None and httpx.get(f"http://127.0.0.1:{port}/ready", timeout=0.5).status_code == 200:
+                    ready = (time.perf_counter() - t) * 1000
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.005)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return health, ready
+
+
+def _write_snapshot(path: str, n: int) -> None:
+    with open(path, "w") as f:
+        for i in range(n):
+            question = f"warm-up question {i} about python asyncio"
+            citations = [
+                {"title": r["title"], "url": r["url"], "snippet": r["description"]}
+                for r in you_results(question, n=5)["results"]
+            ]
+            f.write(json.dumps({"session_id": f"s{i}", "question": question, "citations": citations}) + "\n")
+
+
+def main(runs: int, snapshot_sessions: int) -> dict:
+    env = {**os.environ, "YOU_STUB": "true", "SANITY_PROJECT_ID": "", "SANITY_TOKEN": ""}
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        if snapshot_sessions:
+            env["WARMUP_SNAPSHOT"] = os.path.join(tmp, "warmup.ndjson")
+            _write_snapshot(env["WARMUP_SNAPSHOT"], snapshot_sessions)
+            out["snapshot_sessions"] = snapshot_sessions
+        imports = [_import_ms("import main", env) for _ in range(runs)]
+        eager = [_import_ms(f"import main; {EAGER}", env) for _ in range(runs)]
+        served = [_serve_ms(env) for _ in range(runs)]
+    out.update({
+        "import_ms": round(statistics.median(imports), 1),
+        "import_eager_ms": round(statistics.median(eager), 1),
+        "health_ms": round(statistics.median(h for h, _ in served), 1),
+        "ready_ms": round(statistics.median(r for _, r in served), 1),
+    })
+    return out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--snapshot-sessions", type=int, default=0)
+    a = ap.parse_args()
+    print(json.dumps(main(a.runs, a.snapshot_sessions), indent=2))
@@ -0,0 +1,40 @@
+"""
+Compare two load.py result files (e.g. main vs. a branch) and flag regressions.
+Usage: python benchmarks/compare.py base.json head.json [--threshold 0.10]
+Exits 1 when any scenario's p99 latency or throughput regresses by more than threshold.
+"""
+import argparse
+import json
+import sys
+
+
+def compare(base: dict, head: dict, threshold: float) -> tuple[list[dict], bool]:
+    rows, regressed = [], False
+    base_by_name = {r["scenario"]: r for r in base["results"]}
+    for h in head["results"]:
+        b = base_by_name.get(h["scenario"])
+        if not b:
+            continue
+        row = {"scenario": h["scenario"]}
+        for key, higher_is_worse in (("p50_ms", True), ("p99_ms", True), ("throughput_rps", False), ("rss_growth_kb", True)):
+            delta = (h[key] - b[key]) / b[key] if b[key] else 0.0
+            row[key] = {"base": b[key], "head": h[key], "delta_pct": round(100 * delta, 1)}
+            if key in ("p99_ms", "throughput_rps") and (delta if higher_is_worse else -delta) > threshold:
+                regressed = True
+        rows.append(row)
+    return rows, regressed
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("base")
+    ap.add_argument("head")
+    ap.add_argument("--threshold", type=float, default=0.10)
+    args = ap.parse_args()
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    rows, regressed = compare(base, head, args.threshold)
+    print(json.dumps({"base": base.get("commit"), "head": head.get("commit"), "scenarios": rows, "regressed": regressed}, indent=2))
+    sys.exit(1 if regressed else 0)
@@ -0,0 +1,8 @@
+"""Micro-benchmarks run with pytest-benchmark: python -m pytest benchmarks --benchmark-json=micro.json"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ["YOU_STUB"] = "true"
+os.environ.pop("SANITY_TOKEN", None)
+os.environ.pop("SANITY_PROJECT_ID", None)
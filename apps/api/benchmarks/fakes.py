@@ -0,0 +1,133 @@
+"""
+Local fake upstreams for benchmarks: You.com search and the Sanity HTTP API.
+Each server runs in a background thread and can inject latency, jitter and an error rate.
+
+  python benchmarks/fakes.py --you-port 9101 --sanity-port 9102 --latency-ms 80 --jitter-ms 40 --error-rate 0.01
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class Faults:
+    """Latency/jitter/error injection shared by both fakes."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def apply(self) -> bool:
+        """Sleep for the injected latency; return True when this request should fail."""
+        with self._lock:
+            delay = self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+            fail = self._rng.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay / 1000)
+        return fail
+
+
+def you_results(query: str, n: int = 10) -> dict:
+    """Deterministic, query-dependent search results in the You.com response shape."""
+    seed = zlib.crc32(query.encode())
+    return {"results": [
+        {
+            "title": f"Result {i} for {query[:40]}",
+            "url": f"https://site{(seed + i) % 97}.example.com/page/{seed % 1000}/{i}",
+            "description": f"{query} — evidence sentence {i}. " + "Supporting detail about the topic. " * 4,
+            "date": "2024-01-01",
+            "source": f"Site {(seed + i) % 97}",
+        }
+        for i in range(n)
+    ]}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    faults: Faults = Faults()
+    counts: dict
+
+    def log_message(self, *args):  # keep benchmark output clean
+        pass
+
+    def _send(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _count(self, key: str) -> None:
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+
+class YouHandler(_Handler):
+    def do_GET(self):
+        self._count("search")
+        if self.faults.apply():
+            return self._send(503, {"error": "injected"})
+        query = parse_qs(urlparse(self.path).query).get("query", [""])[0]
+        self._send(200, you_results(query))
+
+
+class SanityHandler(_Handler):
+    def do_GET(self):
+        self._count("query")
+        if self.faults.apply():
+            return self._send(503, {"error": "injected"})
+        self._send(200, {"result": []})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        self._count("mutate")
+        self.counts["mutations"] = self.counts.get("mutations", 0) + len(body.get("mutations", []))
+        if self.faults.apply():
+            return self._send(503, {"error": "injected"})
+        self._send(200, {"transactionId": "fake", "results": []})
+
+
+class FakeServer:
+    """Run a handler class on 127.0.0.1:port in a daemon thread."""
+
+    def __init__(self, handler: type, port: int = 0, faults: Faults = None):
+        self.counts: dict = {}
+        handler = type(handler.__name__, (handler,), {"faults": faults or Faults(), "counts": self.counts})
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self) -> "FakeServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--you-port", type=int, default=9101)
+    ap.add_argument("--sanity-port", type=int, default=9102)
+    ap.add_argument("--latency-ms", type=float, default=0)
+    ap.add_argument("--jitter-ms", type=float, default=0)
+    ap.add_argument("--error-rate", type=float, default=0)
+    a = ap.parse_args()
+    faults = Faults(a.latency_ms, a.jitter_ms, a.error_rate)
+    with FakeServer(YouHandler, a.you_port, faults) as you, FakeServer(SanityHandler, a.sanity_port, faults) as sanity:
+        print(f"You.com fake: {you.url}  Sanity fake: {sanity.url}  (Ctrl-C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
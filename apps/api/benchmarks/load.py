@@ -0,0 +1,215 @@
+"""
+End-to-end load scenarios against the real FastAPI app under uvicorn, with local fake
+You.com and Sanity upstreams (see fakes.py). Results are written as JSON so runs can be
+compared across commits.
+
+  python benchmarks/load.py --scenarios steady burst repeated batch --out bench-results.json
+  python benchmarks/load.py --latency-ms 120 --jitter-ms 60 --error-rate 0.02 --workers 2
+
+Scenarios:
+  steady    fixed arrival rate (--rps) for --duration seconds, distinct questions
+  burst     --burst requests fired at once
+  repeated  the same question at a fixed rate (exercises the search cache / single-flight)
+  batch     --batch distinct questions sent back-to-back by --concurrency clients
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(__file__))
+from fakes import FakeServer, Faults, SanityHandler, YouHandler  # noqa: E402
+
+API_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_kb(pid: int) -> int:
+    """Resident set size of pid and its children (uvicorn workers), in KiB (Linux /proc)."""
+    total = 0
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids += [int(p) for p in f.read().split()]
+    except OSError:
+        pass
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/status") as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+        except (OSError, StopIteration):
+            pass
+    return total
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=API_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class ApiServer:
+    """uvicorn main:app in a subprocess, pointed at the fake upstreams."""
+
+    def __init__(self, you_url: str, sanity_url: str, workers: int = 1, extra_env: dict = None):
+        self.port = _free_port()
+        self.env = {
+            **os.environ,
+            "YOU_STUB": "false",
+            "YOU_API_KEY": "bench",
+            "YOU_BASE_URL": you_url,
+            "SANITY_PROJECT_ID": "bench",
+            "SANITY_TOKEN": "bench",
+            "SANITY_API_BASE": sanity_url,
+            **(extra_env or {}),
+        }
+        self.workers = workers
+        self.proc = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "ApiServer":
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(self.port),
+             "--workers", str(self.workers), "--log-level", "warning"],
+            cwd=API_DIR, env=self.env,
+        )
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                if httpx.get(f"{self.url}/health", timeout=0.5).status_code == 200:
+                    return self
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        self.__exit__()
+        raise RuntimeError("API did not become healthy")
+
+    def __exit__(self, *exc) -> None:
+        self.proc.terminate()
+        self.proc.wait(timeout=10)
+
+
+def _summary(name: str, latencies: list[float], errors: int, elapsed: float, rss_before: int, rss_after: int) -> dict:
+    lat = sorted(latencies)
+
+    def pct(p: float) -> float:
+        return round(lat[min(len(lat) - 1, int(p / 100 * len(lat)))] * 1000, 2) if lat else 0.0
+
+    return {
+        "scenario": name,
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": pct(50),
+        "p90_ms": pct(90),
+        "p99_ms": pct(99),
+        "max_ms": round(lat[-1] * 1000, 2) if lat else 0.0,
+        "rss_before_kb": rss_before,
+        "rss_after_kb": rss_after,
+        "rss_growth_kb": rss_after - rss_before,
+    }
+
+
+async def _one(client: httpx.AsyncClient, question: str, latencies: list, errors: list) -> None:
+    t = time.perf_counter()
+    try:
+        r = await client.post("/verify", json={"question": question, "mode": "answer"})
+        if r.status_code == 200:
+            latencies.append(time.perf_counter() - t)
+            return
+    except httpx.HTTPError:
+        pass
+    errors.append(1)
+
+
+async def _paced(client, questions, rps: float, latencies, errors) -> None:
+    tasks = []
+    start = time.perf_counter()
+    for i, q in enumerate(questions):
+        delay = start + i / rps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(_one(client, q, latencies, errors)))
+    await asyncio.gather(*tasks)
+
+
+async def _workers(client, questions, concurrency: int, latencies, errors) -> None:
+    queue = iter(questions)
+
+    async def worker():
+        for q in queue:
+            await _one(client, q, latencies, errors)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def run_scenario(name: str, api: ApiServer, args) -> dict:
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=max(args.burst, args.concurrency, 100))
+    async with httpx.AsyncClient(base_url=api.url, timeout=60.0, limits=limits) as client:
+        rss_before = _rss_kb(api.proc.pid)
+        t = time.perf_counter()
+        tag = f"{name}-{time.time_ns()}"
+        if name == "steady":
+            n = int(args.rps * args.duration)
+            await _paced(client, [f"{tag} question {i}" for i in range(n)], args.rps, latencies, errors)
+        elif name == "burst":
+            await asyncio.gather(*(_one(client, f"{tag} question {i}", latencies, errors) for i in range(args.burst)))
+        elif name == "repeated":
+            n = int(args.rps * args.duration)
+            await _paced(client, ["how does python asyncio work"] * n, args.rps, latencies, errors)
+        elif name == "batch":
+            await _workers(client, [f"{tag} question {i}" for i in range(args.batch)], args.concurrency, latencies, errors)
+        else:
+            raise ValueError(f"unknown scenario {name}")
+        elapsed = time.perf_counter() - t
+        return _summary(name, latencies, len(errors), elapsed, rss_before, _rss_kb(api.proc.pid))
+
+
+def main(args) -> dict:
+    faults = Faults(args.latency_ms, args.jitter_ms, args.error_rate)
+    with FakeServer(YouHandler, faults=faults) as you, FakeServer(SanityHandler, faults=faults) as sanity:
+        with ApiServer(you.url, sanity.url, workers=args.workers) as api:
+            results = [asyncio.run(run_scenario(s, api, args)) for s in args.scenarios]
+        return {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "config": {k: v for k, v in vars(args).items() if k != "out"},
+            "upstream_calls": {"you": dict(you.counts), "sanity": dict(sanity.counts)},
+            "results": results,
+        }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scenarios", nargs="+", default=["steady", "burst", "repeated", "batch"])
+    ap.add_argument("--rps", type=float, default=20)
+    ap.add_argument("--duration", type=float, default=10)
+    ap.add_argument("--burst", type=int, default=100)
+    ap.add_argument("--batch", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=10)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--latency-ms", type=float, default=50)
+    ap.add_argument("--jitter-ms", type=float, default=20)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--out", default="")
+    args = ap.parse_args()
+    text = json.dumps(main(args), indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    print(text)
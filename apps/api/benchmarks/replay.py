@@ -0,0 +1,139 @@
+"""
+Deterministic replay of recorded /verify traffic (see traffic_recorder.py, TRAFFIC_RECORD_PATH).
+The API runs under uvicorn as in load.py; the You.com fake answers each search with the
+recorded raw body and status after the recorded upstream latency, so a perf change can be
+measured against production-shaped questions, topics, budgets and upstream timing.
+Requests are sent at their recorded arrival offsets (scaled by --speed). Output is in
+load.py's result format, so two runs can be compared with compare.py.
+
+  python benchmarks/replay.py traffic.log --speed 2 --out replay.json
+  python benchmarks/compare.py base-replay.json replay.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from fakes import FakeServer, SanityHandler, YouHandler  # noqa: E402
+from load import ApiServer, _git_commit, _rss_kb, _summary  # noqa: E402
+from traffic_recorder import read_records  # noqa: E402
+
+
+class Recording:
+    """Recorded upstream responses per query, handed out in recorded order (cycling)."""
+
+    def __init__(self, records: list[dict]):
+        self.verifies = sorted((r for r in records if r["t"] == "verify"), key=lambda r: r["ts"])
+        self.searches: dict[str, deque] = defaultdict(deque)
+        for r in sorted((r for r in records if r["t"] == "search"), key=lambda r: r["ts"]):
+            self.searches[r["query"]].append((r["latency_ms"], r["status"], r["body"]))
+        self.unmatched = 0
+        self._lock = threading.Lock()
+
+    def response(self, query: str):
+        with self._lock:
+            exchanges = self.searches.get(query)
+            if not exchanges:
+                self.unmatched += 1
+                return None
+            exchanges.rotate(-1)
+            return exchanges[-1]
+
+
+class ReplayYouHandler(YouHandler):
+    recording: Recording
+
+    def do_GET(self):
+        self._count("search")
+        query = parse_qs(urlparse(self.path).query).get("query", [""])[0]
+        exchange = self.recording.response(query)
+        if exchange is None:
+            return self._send(200, {"results": []})
+        latency_ms, status, body = exchange
+        time.sleep(latency_ms / 1000)
+        data = body.encode()
+        self.send_response(status or 504)  # status 0: no upstream response was recorded
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _percentiles(values: list[float]) -> dict:
+    lat = sorted(values)
+
+    def pct(p: float) -> float:
+        return round(lat[min(len(lat) - 1, int(p / 100 * len(lat)))], 2) if lat else 0.0
+
+    return {"p50_ms": pct(50), "p90_ms": pct(90), "p99_ms": pct(99)}
+
+
+async def _replay(api: ApiServer, recording: Recording, speed: float) -> dict:
+    latencies, errors = [], []
+    t0 = recording.verifies[0]["ts"] if recording.verifies else 0.0
+
+    async def one(client: httpx.AsyncClient, record: dict) -> None:
+        body = dict(record["request"])
+        deadline_ms = body.pop("deadline_ms", None)
+        t = time.perf_counter()
+        try:
+            r = await client.post("/verify", json=body, headers={"X-Request-Deadline": str(deadline_ms)} if deadline_ms is not None else {})
+            if r.status_code == 200:
+                latencies.append(time.perf_counter() - t)
+                return
+        except httpx.HTTPError:
+            pass
+        errors.append(1)
+
+    async with httpx.AsyncClient(base_url=api.url, timeout=60.0, limits=httpx.Limits(max_connections=200)) as client:
+        rss_before = _rss_kb(api.proc.pid)
+        tasks = []
+        start = time.perf_counter()
+        for record in recording.verifies:
+            delay = start + (record["ts"] - t0) / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(client, record)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+    return _summary("replay", latencies, len(errors), elapsed, rss_before, _rss_kb(api.proc.pid))
+
+
+def main(args) -> dict:
+    recording = Recording(list(read_records(args.log)))
+    handler = type("ReplayYou", (ReplayYouHandler,), {"recording": recording})
+    with FakeServer(handler) as you, FakeServer(SanityHandler) as sanity:
+        with ApiServer(you.url, sanity.url, workers=args.workers, extra_env={"TRAFFIC_RECORD_PATH": ""}) as api:
+            result = asyncio.run(_replay(api, recording, args.speed))
+        result["recorded"] = _percentiles([r["latency_ms"] for r in recording.verifies])
+        result["unmatched_searches"] = recording.unmatched
+        return {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "config": {k: v for k, v in vars(args).items() if k != "out"},
+            "upstream_calls": {"you": dict(you.counts), "sanity": dict(sanity.counts)},
+            "results": [result],
+        }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("log", help="traffic log written with TRAFFIC_RECORD_PATH")
+    ap.add_argument("--speed", type=float, default=1.0, help="arrival-time compression factor")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--out", default="")
+    args = ap.parse_args()
+    text = json.dumps(main(args), indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    print(text)
@@ -0,0 +1,40 @@
+"""pytest-benchmark micro-benchmarks for the per-request hot path."""
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from fakes import you_results  # noqa: E402
+from sanity_store import SanityStore  # noqa: E402
+from verification import _build_claims_from_citations, _compute_reliability  # noqa: E402
+from you_client import _normalize_citation  # noqa: E402
+
+
+@pytest.fixture(params=[3, 15, 100], ids=lambda n: f"{n}-citations")
+def citations(request):
+    return [_normalize_citation(r) for r in you_results("how does asyncio work", n=request.param)["results"]]
+
+
+def test_build_claims_from_citations(benchmark, citations):
+    claims, unique = benchmark(_build_claims_from_citations, citations)
+    assert unique
+
+
+def test_build_claims_query_aware(benchmark, citations):
+    claims, unique = benchmark(_build_claims_from_citations, citations, "how does the asyncio event loop work")
+    assert claims
+
+
+def test_compute_reliability(benchmark, citations):
+    claims, unique = _build_claims_from_citations(citations)
+    assert 0 < benchmark(_compute_reliability, claims, unique) <= 0.95
+
+
+def test_upsert_payload_building(benchmark, citations):
+    claims, unique = _build_claims_from_citations(citations)
+    result = {
+        "session_id": "bench-session", "question": "how does asyncio work", "answer": "a",
+        "reliability_score": 0.8, "claims": claims, "citations": unique, "can_execute": True,
+        "topic": "python", "created_at": "2024-01-01T00:00:00Z",
+    }
+    mutations = benchmark(SanityStore.build_mutations, result)
+    assert len(mutations) == 2 + len(unique) + len(claims)
@@ -0,0 +1,218 @@
+"""
+Query-aware claim extraction: split citation snippets into sentences, rank them against the
+question with BM25, and keep the top-k factual sentences per source.
+The BM25 model (document frequencies over hashed terms) is a process-wide instance that is
+updated incrementally with the sentences of every source the first time it is seen, and
+reused across requests. Scoring is vectorized with numpy over all sentences of a request at once.
+"""
+import hashlib
+import os
+import re
+import zlib
+from functools import lru_cache
+from itertools import chain
+from typing import Optional
+
+import numpy as np
+
+from embeddings import tokenize
+
+CLAIM_SENTENCES_PER_SOURCE = int(os.environ.get("CLAIM_SENTENCES_PER_SOURCE", "2"))
+BUCKETS = 1 << 18  # hashed vocabulary size (1 MiB of int32 document frequencies)
+MIN_TOKENS = 4
+MAX_SENTENCE_CHARS = 300
+SEEN_SOURCES_MAX = 200_000  # source hashes remembered for document frequencies
+
+_BOUNDARY_RE = re.compile(r"([.!?][\"')\]]?)\s+(?=[\"'(\[]?[A-Z0-9])")  # terminal punctuation (kept), new sentence
+_BLOCK_RE = re.compile(r"\s*(?:\n|\s[•·▪|]\s)\s*")  # line breaks, bullets and title separators
+_BLOCK_MARKS = ("\n", "•", "·", "▪", "|")
+_ABBREVIATION_END_RE = re.compile(
+    r"(?:^|\s)(?:[A-Z]|e\.g|i\.e|mrs?|ms|dr|prof|vs|fig|no|inc|ltd|st|approx|u\.s|cf)\.$", re.I
+)
+_BOILERPLATE_RE = re.compile(r"click here|read more|sign up|subscribe|cookie|log ?in|all rights reserved|javascript")
+
+
+def split_sentences(text: str) -> list[str]:
+    """Split text into sentences; abbreviations, initials and decimals do not end a sentence."""
+    text = text or ""
+    out: list[str] = []
+    blocks = _BLOCK_RE.split(text) if any(mark in text for mark in _BLOCK_MARKS) else (text,)
+    for block in blocks:
+        start = 0
+        for m in _BOUNDARY_RE.finditer(block):
+            _append_sentence(out, block[start:m.end(1)])
+            start = m.end()
+        _append_sentence(out, block[start:])
+    return out
+
+
+def _append_sentence(out: list[str], piece: str) -> None:
+    """Append a sentence, or glue it to the previous one if that ended in an abbreviation."""
+    piece = piece.strip()
+    if piece:
+        if out and _ABBREVIATION_END_RE.search(out[-1], len(out[-1]) - 8):
+            out[-1] = f"{out[-1]} {piece}"
+        else:
+            out.append(piece)
+
+
+def truncate_sentences(text: str, limit: int = 200) -> str:
+    """Whole leading sentences up to limit chars; a single over-long sentence is cut at a word."""
+    kept = ""
+    for s in split_sentences(text):
+        joined = f"{kept} {s}" if kept else s
+        if len(joined) > limit:
+            break
+        kept = joined
+    if kept:
+        return kept
+    text = (text or "").strip()
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(" ", 0, limit)
+    return text[:cut if cut > limit // 2 else limit].rstrip(" ,;:-")
+
+
+def is_factual(sentence: str, tokens: list[str], boilerplate: bool = True) -> bool:
+    """Cheap filter for claim-worthy sentences: declarative, long enough, mostly word characters, not
+    boilerplate (boilerplate=False skips that check when the whole snippet is known clean)."""
+    if len(tokens) < MIN_TOKENS or len(sentence) > MAX_SENTENCE_CHARS or sentence.endswith("?"):
+        return False
+    if boilerplate and _BOILERPLATE_RE.search(sentence.lower()):
+        return False
+    return 3 * sum(map(len, tokens)) >= len(sentence)
+
+
+_bucket_of: dict[str, int] = {}
+
+
+def _buckets(tokens: list[str]) -> list[int]:
+    """Hashed term ids; token -> bucket is memoized (bounded) since vocabularies repeat."""
+    if len(_bucket_of) > 500_000:
+        _bucket_of.clear()
+    out = []
+    for t in tokens:
+        b = _bucket_of.get(t)
+        if b is None:
+            b = _bucket_of[t] = zlib.crc32(t.encode()) & (BUCKETS - 1)
+        out.append(b)
+    return out
+
+
+@lru_cache(maxsize=8192)
+def analyze_snippet(snippet: str) -> tuple[tuple[str, tuple[int, ...], bool], ...]:
+    """(sentence, hashed terms, is_factual) per sentence. Sources recur across requests
+    (search cache, popular pages), so the analysis is cached by snippet text."""
+    boilerplate = _BOILERPLATE_RE.search(snippet.lower()) is not None
+    out = []
+    for s in split_sentences(snippet):
+        toks = tokenize(s)
+        out.append((s, tuple(_buckets(toks)), is_factual(s, toks, boilerplate)))
+    return tuple(out)
+
+
+class BM25Model:
+    """Okapi BM25 over hashed terms; document frequencies accumulate across requests."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.df = np.zeros(BUCKETS, dtype=np.int32)
+        self.n_docs = 0
+        self.total_len = 0
+        self._seen: set[bytes] = set()
+
+    def first_seen(self, source: str) -> bool:
+        """True the first time a source text is offered, so popular snippets repeated across
+        requests are counted once (bounded memory: forgets everything when full)."""
+        key = hashlib.blake2b(source.encode(), digest_size=8).digest()
+        if key in self._seen:
+            return False
+        if len(self._seen) >= SEEN_SOURCES_MAX:
+            self._seen.clear()
+        self._seen.add(key)
+        return True
+
+    def observe(self, docs: list[tuple[int, ...]]) -> None:
+        """Add documents (bucketed token lists) to the collection statistics."""
+        lens = np.fromiter(map(len, docs), dtype=np.int64, count=len(docs))
+        if not len(docs):
+            return
+        flat = np.fromiter(chain.from_iterable(docs), dtype=np.int64, count=int(lens.sum()))
+        doc_ids = np.repeat(np.arange(len(docs), dtype=np.int64), lens)
+        unique = np.unique(doc_ids * BUCKETS + flat) % BUCKETS  # each term once per document
+        np.add.at(self.df, unique, 1)
+        self.n_docs += len(docs)
+        self.total_len += int(lens.sum())
+
+    def merge(self, other: "BM25Model") -> None:
+        """Add the statistics (and seen sources) another model collected."""
+        self.df += other.df
+        self.n_docs += other.n_docs
+        self.total_len += other.total_len
+        if len(self._seen) + len(other._seen) > SEEN_SOURCES_MAX:
+            self._seen.clear()
+        self._seen.update(other._seen)
+
+    def idf(self, terms: np.ndarray) -> np.ndarray:
+        df = self.df[terms].astype(np.float32)
+        return np.log1p((self.n_docs - df + 0.5) / (df + 0.5))
+
+    def score(self, query: list[int], docs: list[tuple[int, ...]]) -> np.ndarray:
+        """BM25 score of every document against the query, as one vectorized pass."""
+        n = len(docs)
+        q = np.unique(np.asarray(query, dtype=np.int64))
+        if not n or not len(q):
+            return np.zeros(n, dtype=np.float32)
+        lens = np.fromiter(map(len, docs), dtype=np.int64, count=n)
+        flat = np.fromiter(chain.from_iterable(docs), dtype=np.int64, count=int(lens.sum()))
+        doc_ids = np.repeat(np.arange(n, dtype=np.int64), lens)
+        pos = np.minimum(np.searchsorted(q, flat), len(q) - 1)
+        hit = q[pos] == flat
+        tf = np.bincount(doc_ids[hit] * len(q) + pos[hit], minlength=n * len(q)).reshape(n, len(q))
+        avgdl = self.total_len / self.n_docs if self.n_docs else max(float(lens.mean()), 1.0)
+        norm = self.k1 * (1 - self.b + self.b * lens / avgdl)
+        return ((tf * (self.k1 + 1)) / (tf + norm[:, None]) * self.idf(q)).sum(axis=1).astype(np.float32)
+
+
+_model = BM25Model()
+
+
+def merge_statistics(model: BM25Model) -> None:
+    """Fold statistics collected in a private model (warm-up runs in a thread) into the
+    process-wide one. Call it on the event loop, where requests update that model."""
+    _model.merge(model)
+
+
+def extract_claim_sentences(
+    question: str,
+    snippets: list[str],
+    k: int = CLAIM_SENTENCES_PER_SOURCE,
+    model: Optional[BM25Model] = None,
+) -> list[list[tuple[str, float]]]:
+    """Top-k (sentence, score) per snippet, best first. Factual sentences rank ahead of the
+    rest; a snippet with no factual sentence still yields its best fragment, cut to
+    MAX_SENTENCE_CHARS."""
+    model = model or _model
+    sentences, owners, docs, factual, unseen = [], [], [], [], []
+    for i, snippet in enumerate(snippets):
+        new = model.first_seen(snippet)
+        for sentence, terms, ok in analyze_snippet(snippet):
+            sentences.append(sentence)
+            owners.append(i)
+            docs.append(terms)
+            factual.append(ok)
+            if new:
+                unseen.append(terms)
+    model.observe(unseen)
+    scores = model.score(_buckets(tokenize(question)), docs)
+    # Rank within each source: factual first, then by score; lexsort keys are last-major
+    owners_arr = np.asarray(owners, dtype=np.int64)
+    order = np.lexsort((-scores, ~np.asarray(factual, dtype=bool), owners_arr))
+    out: list[list[tuple[str, float]]] = [[] for _ in snippets]
+    for j in order.tolist():
+        picks = out[owners[j]]
+        if len(picks) < k and (factual[j] or not picks):
+            text = sentences[j] if factual[j] else truncate_sentences(sentences[j], MAX_SENTENCE_CHARS)
+            picks.append((text, float(scores[j])))
+    return out
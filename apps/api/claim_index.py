@@ -0,0 +1,365 @@
+"""
+Approximate-nearest-neighbour index over verified claims for cross-session evidence reuse.
+Vectors are appended to a float32 file and read back through np.memmap; metadata lives in
+an append-only JSONL file addressed by an offsets file. Once enough claims exist an IVF layer
+(spherical k-means centroids + inverted lists) narrows each search to a few lists.
+A (url, text) key per row keeps claims that are verified again (e.g. reused from the index)
+from being stored twice. The offsets file is written last and decides the row count: on open,
+rows a crash left half-written in the other files are cut off or rebuilt. manifest.json
+records the vector dimension; an index built for another embedder is refused.
+Training and retraining run in a background thread on the rows stored so far (rows are
+append-only); searches keep using the previous layer (or brute force) until the new
+centroids and inverted lists are swapped in.
+Enabled when CLAIM_INDEX_DIR is set.
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Callable, Optional
+
+import numpy as np
+
+from embeddings import DIM, hash_embed
+from models import Citation, to_payload
+
+CLAIM_INDEX_DIR = os.environ.get("CLAIM_INDEX_DIR", "")
+CLAIM_INDEX_MIN_SCORE = float(os.environ.get("CLAIM_INDEX_MIN_SCORE", "0.5"))
+CLAIM_INDEX_COVERAGE = int(os.environ.get("CLAIM_INDEX_COVERAGE", "5"))
+
+TRAIN_MIN = 4096        # rows before the IVF layer is trained
+RETRAIN_FACTOR = 16     # retrain when the index has grown this much since last training
+SCAN_CHUNK = 65536      # rows per brute-force block (bounds temporary memory)
+
+
+def _kmeans(x: np.ndarray, k: int, iters: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on unit vectors; returns (k, dim) unit centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), size=k, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(x @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        present, starts = np.unique(assign[order], return_index=True)
+        sums = np.add.reduceat(x[order], starts, axis=0)
+        empty = np.setdiff1d(np.arange(k), present)
+        centroids[present] = sums
+        centroids[empty] = x[rng.integers(len(x), size=len(empty))]
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        np.divide(centroids, norms, out=centroids, where=norms > 0)
+    return centroids
+
+
+def _claim_key(url: str, text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(f"{url}\0{text}".encode(), digest_size=8).digest(), "little")
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid per row, in SCAN_CHUNK blocks."""
+    assign = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), SCAN_CHUNK):
+        block = np.asarray(vectors[start:start + SCAN_CHUNK])
+        assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assign
+
+
+def _inverted_lists(assign: np.ndarray, nlist: int) -> list[np.ndarray]:
+    order = np.argsort(assign, kind="stable").astype(np.int64)
+    bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+    return [order[bounds[j]:bounds[j + 1]] for j in range(nlist)]
+
+
+class ClaimIndex:
+    """Incrementally updatable IVF/flat index persisted under `path`."""
+
+    def __init__(
+        self,
+        path: str,
+        dim: int = DIM,
+        nprobe: int = 8,
+        train_min: int = TRAIN_MIN,
+        embed: Optional[Callable[[list[str]], np.ndarray]] = None,
+    ):
+        self.path = path
+        self.dim = dim
+        self.embed = embed or (lambda texts: hash_embed(texts, dim))
+        self.nprobe = nprobe
+        self.train_min = train_min
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._vec_path = os.path.join(path, "vectors.f32")
+        self._meta_path = os.path.join(path, "meta.jsonl")
+        self._off_path = os.path.join(path, "meta.idx")
+        self._assign_path = os.path.join(path, "assign.i32")
+        self._centroids_path = os.path.join(path, "centroids.npy")
+        self._keys_path = os.path.join(path, "keys.u64")
+        self._manifest_path = os.path.join(path, "manifest.json")
+        for p in (self._vec_path, self._meta_path, self._off_path, self._assign_path, self._keys_path):
+            open(p, "ab").close()
+        self._n = os.path.getsize(self._off_path) // 8
+        self._check_dim()
+        self._recover()
+        self._vectors = self._map(self._vec_path, np.float32, (self._n, dim))
+        self._offsets = self._map(self._off_path, np.int64, (self._n,))
+        self._keys = set(np.fromfile(self._keys_path, dtype=np.uint64).tolist())
+        self._meta_file = open(self._meta_path, "rb")  # one handle, read with pread
+        self._meta_end = os.path.getsize(self._meta_path)
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: list[np.ndarray] = []
+        self._trained_at = 0
+        self._trainer: Optional[threading.Thread] = None
+        if os.path.exists(self._centroids_path):
+            self._centroids = np.load(self._centroids_path)
+            self._recover_assign()
+            assign = self._map(self._assign_path, np.int32, (self._n,))
+            self._lists = _inverted_lists(np.asarray(assign), len(self._centroids))
+            self._trained_at = self._n
+
+    def __len__(self) -> int:
+        return self._n
+
+    def contains(self, url: str, text: str) -> bool:
+        """Whether a claim with this url and text is stored (e.g. a citation made from it)."""
+        return _claim_key(url, text) in self._keys
+
+    def _check_dim(self) -> None:
+        """Refuse an index whose vectors come from an embedder of another dimension."""
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path) as f:
+                stored = json.load(f)["dim"]
+        elif self._n:
+            stored = os.path.getsize(self._vec_path) // (4 * self._n)  # indexes older than the manifest
+        else:
+            stored = self.dim
+        if stored != self.dim:
+            raise ValueError(
+                f"claim index at {self.path} holds {stored}-dim vectors but the embedder produces "
+                f"{self.dim}-dim ones; point CLAIM_INDEX_DIR at a fresh directory"
+            )
+        if not os.path.exists(self._manifest_path):
+            tmp = self._manifest_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"dim": self.dim}, f)
+            os.replace(tmp, self._manifest_path)
+
+    def _recover(self) -> None:
+        """Cut every file back to the rows the offsets file commits; rebuild missing keys."""
+        n = self._n
+        os.truncate(self._off_path, n * 8)
+        os.truncate(self._vec_path, min(os.path.getsize(self._vec_path), n * self.dim * 4))
+        end = 0
+        if n:
+            with open(self._off_path, "rb") as f:
+                f.seek((n - 1) * 8)
+                last = int(np.frombuffer(f.read(8), dtype=np.int64)[0])
+            with open(self._meta_path, "rb") as f:
+                f.seek(last)
+                end = last + len(f.readline())
+        os.truncate(self._meta_path, end)
+        have = min(os.path.getsize(self._keys_path) // 8, n)
+        os.truncate(self._keys_path, have * 8)
+        if have < n:  # crash before the keys were written, or an index older than them
+            offsets = np.fromfile(self._off_path, dtype=np.int64)
+            keys = []
+            with open(self._meta_path, "rb") as f:
+                for off in offsets[have:]:
+                    f.seek(int(off))
+                    meta = json.loads(f.readline())
+                    keys.append(_claim_key(meta.get("url", ""), meta.get("text", "")))
+            with open(self._keys_path, "ab") as f:
+                np.asarray(keys, dtype=np.uint64).tofile(f)
+
+    def _recover_assign(self) -> None:
+        have = min(os.path.getsize(self._assign_path) // 4, self._n)
+        os.truncate(self._assign_path, have * 4)
+        if have < self._n:
+            vectors = np.asarray(self._map(self._vec_path, np.float32, (self._n, self.dim))[have:])
+            with open(self._assign_path, "ab") as f:
+                np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32).tofile(f)
+
+    @staticmethod
+    def _map(path: str, dtype, shape: tuple) -> np.ndarray:
+        if shape[0] == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+    def _train(self, vectors: np.ndarray) -> None:
+        """Train on a snapshot of the first n rows without holding the lock, then swap the new
+        layer in (assigning rows added meanwhile) under a short one."""
+        n = len(vectors)
+        nlist = int(min(4096, max(16, 4 * np.sqrt(n)), n))
+        sample_size = min(n, 64 * nlist, 100_000)
+        rng = np.random.default_rng(n)
+        centroids = _kmeans(np.asarray(vectors[np.sort(rng.choice(n, size=sample_size, replace=False))]), nlist)
+        assign = _assign(vectors, centroids)
+        with self._lock:
+            late = _assign(self._vectors[n:self._n], centroids)
+            assign = np.concatenate([assign, late])
+            for path, write in ((self._assign_path, assign.tofile), (self._centroids_path, lambda f: np.save(f, centroids))):
+                tmp = path + ".tmp"
+                with open(tmp, "wb") as f:
+                    write(f)
+                os.replace(tmp, path)
+            self._centroids = centroids
+            self._lists = _inverted_lists(assign, nlist)
+            self._trained_at = n
+
+    def _train_due(self) -> bool:
+        """Start a background (re)training when the index has grown enough (lock held)."""
+        due = (self._centroids is None and self._n >= self.train_min) or (
+            self._trained_at and self._n >= RETRAIN_FACTOR * self._trained_at
+        )
+        if not due or (self._trainer is not None and self._trainer.is_alive()):
+            return False
+        self._trainer = threading.Thread(target=self._train, args=(self._vectors,), name="claim-index-train", daemon=True)
+        self._trainer.start()
+        return True
+
+    def wait_trained(self, timeout: Optional[float] = None) -> None:
+        """Block until a running (re)training has been swapped in (tests, benchmarks)."""
+        trainer = self._trainer
+        if trainer is not None:
+            trainer.join(timeout)
+
+    def _new_rows(self, keys: list[int], locked: bool = False) -> list[int]:
+        """Positions of keys neither stored nor repeated earlier in the list."""
+        if not locked:
+            with self._lock:
+                return self._new_rows(keys, locked=True)
+        batch: set[int] = set()
+        return [i for i, key in enumerate(keys) if key not in self._keys and not (key in batch or batch.add(key))]
+
+    def add(self, texts: list[str], metas: list[dict], vectors: Optional[np.ndarray] = None) -> None:
+        """Append claims (text + metadata dict) to the index and persist them. Claims already
+        stored with the same url and text are skipped."""
+        keys = [_claim_key(meta.get("url", ""), text) for text, meta in zip(texts, metas)]
+        keep = self._new_rows(keys)
+        if not keep:
+            return
+        texts, metas, keys = [texts[i] for i in keep], [metas[i] for i in keep], [keys[i] for i in keep]
+        vecs = self.embed(texts) if vectors is None else np.asarray(vectors, dtype=np.float32)[keep]
+        with self._lock:
+            fresh = self._new_rows(keys, locked=True)  # another add may have stored some meanwhile
+            if not fresh:
+                return
+            if len(fresh) < len(keys):
+                texts, metas, keys = [texts[i] for i in fresh], [metas[i] for i in fresh], [keys[i] for i in fresh]
+                vecs = vecs[fresh]
+            with open(self._meta_path, "ab") as f:
+                pos = f.tell()
+                offsets = []
+                for text, meta in zip(texts, metas):
+                    offsets.append(pos)
+                    line = json.dumps({**meta, "text": text}, ensure_ascii=False).encode() + b"\n"
+                    f.write(line)
+                    pos += len(line)
+            with open(self._vec_path, "ab") as f:
+                vecs.tofile(f)
+            with open(self._off_path, "ab") as f:
+                np.asarray(offsets, dtype=np.int64).tofile(f)
+            with open(self._keys_path, "ab") as f:
+                np.asarray(keys, dtype=np.uint64).tofile(f)
+            self._keys.update(keys)
+            start = self._n
+            self._n += len(texts)
+            if self._centroids is not None:
+                assign = np.argmax(vecs @ self._centroids.T, axis=1).astype(np.int32)
+                with open(self._assign_path, "ab") as f:
+                    assign.tofile(f)
+                for j in np.unique(assign):
+                    new_ids = start + np.flatnonzero(assign == j)
+                    self._lists[j] = np.concatenate([self._lists[j], new_ids])
+            self._meta_end = pos
+            self._vectors = self._map(self._vec_path, np.float32, (self._n, self.dim))
+            self._offsets = self._map(self._off_path, np.int64, (self._n,))
+            self._train_due()
+
+    def add_result(self, result: dict) -> None:
+        """Index every claim of a verification result together with its first citation."""
+        result = to_payload(result)
+        citations = result["citations"]
+        texts, metas = [], []
+        for cl in result["claims"]:
+            text = cl.get("text") or ""
+            if not text:
+                continue
+            ids = [i for i in cl.get("citation_ids", []) if isinstance(i, int) and 0 <= i < len(citations)]
+            c = citations[ids[0]] if ids else {}
+            texts.append(text)
+            metas.append({
+                "session_id": result.get("session_id"),
+                "topic": result.get("topic"),
+                "url": c.get("url", ""),
+                "title": c.get("title", ""),
+                "published_at": c.get("published_at"),
+                "source_name": c.get("source_name"),
+            })
+        self.add(texts, metas)
+
+    def _meta(self, row: int) -> dict:
+        with self._lock:
+            offsets, n, meta_end = self._offsets, self._n, self._meta_end
+        start = int(offsets[row])
+        end = int(offsets[row + 1]) if row + 1 < n else meta_end
+        return json.loads(os.pread(self._meta_file.fileno(), end - start, start))
+
+    def search_vector(self, q: np.ndarray, k: int = 10) -> list[tuple[int, float]]:
+        """Return up to k (row, cosine score) pairs, best first."""
+        with self._lock:
+            vectors, centroids, n = self._vectors, self._centroids, self._n
+            lists = self._lists
+        if n == 0:
+            return []
+        if centroids is None:
+            scores = np.concatenate([
+                np.asarray(vectors[s:s + SCAN_CHUNK]) @ q for s in range(0, n, SCAN_CHUNK)
+            ])
+            ids = np.arange(n)
+        else:
+            probe = np.argsort(-(centroids @ q))[: self.nprobe]
+            ids = np.sort(np.concatenate([lists[j] for j in probe]))
+            if len(ids) == 0:
+                return []
+            scores = np.asarray(vectors[ids]) @ q
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+    def search(self, text: str, k: int = 10, topic: Optional[str] = None, vector: Optional[np.ndarray] = None) -> list[dict]:
+        """Nearest stored claims for `text` (or its precomputed `vector`); each hit is its
+        metadata plus `score`."""
+        q = self.embed([text])[0] if vector is None else np.asarray(vector, dtype=np.float32)
+        hits = []
+        for row, score in self.search_vector(q, k * 4 if topic else k):
+            meta = self._meta(row)
+            if topic and meta.get("topic") != topic:
+                continue
+            hits.append({**meta, "score": round(score, 4)})
+            if len(hits) >= k:
+                break
+        return hits
+
+    def related_citations(
+        self,
+        question: str,
+        topic: Optional[str] = None,
+        min_score: float = CLAIM_INDEX_MIN_SCORE,
+        k: int = 10,
+        vector: Optional[np.ndarray] = None,
+    ) -> list[Citation]:
+        """Prior claims close to `question`, shaped as citations and deduped by url."""
+        seen = set()
+        out = []
+        for h in self.search(question, k=k, topic=topic, vector=vector):
+            url = h.get("url")
+            if h["score"] < min_score or not url or url in seen:
+                continue
+            seen.add(url)
+            out.append(Citation(
+                title=h.get("title") or "",
+                url=url,
+                snippet=h.get("text") or "",
+                published_at=h.get("published_at"),
+                source_name=h.get("source_name"),
+            ))
+        return out
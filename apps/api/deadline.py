@@ -0,0 +1,61 @@
+"""
+Per-request time budget for /verify.
+The client supplies it as X-Request-Deadline (milliseconds of budget, or an absolute Unix
+time in seconds or milliseconds) or as VerifyRequest.budget_ms; otherwise VERIFY_BUDGET_MS.
+VERIFY_BUDGET_MS is also the ceiling. Stages read the remaining time, shrink their work to
+fit, and record themselves in degraded so the response can say what was cut.
+"""
+import math
+import os
+import time
+from typing import Optional
+
+VERIFY_BUDGET_MS = float(os.environ.get("VERIFY_BUDGET_MS", "20000"))
+
+
+class Deadline:
+    """Monotonic deadline plus the list of stages that degraded to meet it."""
+
+    __slots__ = ("expires", "degraded")
+
+    def __init__(self, budget: Optional[float] = None):
+        """budget in seconds; None means unbounded."""
+        self.expires = math.inf if budget is None else time.monotonic() + max(budget, 0.0)
+        self.degraded: list[str] = []
+
+    @classmethod
+    def for_request(cls, header: Optional[str] = None, budget_ms: Optional[float] = None,
+                    default_ms: float = VERIFY_BUDGET_MS) -> "Deadline":
+        """Budget from the header, else the request field, else config; capped by config."""
+        ms = parse_deadline_header(header) if header else None
+        if ms is None:
+            ms = budget_ms
+        return cls(min(ms, default_ms) / 1000 if ms is not None else default_ms / 1000)
+
+    def remaining(self) -> float:
+        """Seconds left (inf when unbounded, never negative)."""
+        return max(self.expires - time.monotonic(), 0.0)
+
+    def timeout(self, cap: float, reserve: float = 0.0) -> float:
+        """Timeout for a stage: the remaining budget minus what later stages need, at most cap."""
+        return max(min(cap, self.remaining() - reserve), 0.0)
+
+    def degrade(self, stage: str) -> None:
+        if stage not in self.degraded:
+            self.degraded.append(stage)
+
+
+def parse_deadline_header(value: str) -> Optional[float]:
+    """Budget in ms from X-Request-Deadline: a budget in ms, or an absolute Unix time
+    (seconds or ms). None when unparsable."""
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(v) or v < 0:
+        return None
+    if v > 1e12:  # Unix time in ms
+        return max(v - time.time() * 1000, 0.0)
+    if v > 1e9:  # Unix time in seconds
+        return max(v - time.time(), 0.0) * 1000
+    return v
@@ -0,0 +1,231 @@
+"""
+Local text embeddings for LiveProof AI.
+Feature-hashed bag of unigrams + bigrams, L2-normalized. Stable across processes
+(crc32, not Python's salted hash) so vectors can be persisted and reused.
+EmbeddingBatcher batches embedding calls across concurrent requests, either to the
+embedding worker (EMBED_WORKER_URL) or to the hash model, behind an LRU cache.
+"""
+import asyncio
+import concurrent.futures
+import hashlib
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+DIM = 256
+EMBED_WORKER_URL = os.environ.get("EMBED_WORKER_URL", "")
+EMBED_DIM = int(os.environ.get("EMBED_DIM", "384"))  # worker model dimension (all-MiniLM-L6-v2)
+EMBED_BATCH_MAX = int(os.environ.get("EMBED_BATCH_MAX", "64"))
+EMBED_BATCH_WAIT_MS = float(os.environ.get("EMBED_BATCH_WAIT_MS", "3"))
+EMBED_CACHE_SIZE = int(os.environ.get("EMBED_CACHE_SIZE", "10000"))
+EMBED_WORKER_TIMEOUT = float(os.environ.get("EMBED_WORKER_TIMEOUT_MS", "2000")) / 1000
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or that the "
+    "this to was what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase alphanumeric tokens with common stopwords removed."""
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+def hash_embed(texts: list[str], dim: int = DIM) -> np.ndarray:
+    """Embed texts into a (len(texts), dim) float32 matrix of unit vectors."""
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for i, text in enumerate(texts):
+        toks = tokenize(text)
+        feats = toks + [f"{a} {b}" for a, b in zip(toks, toks[1:])]
+        for f in feats:
+            h = zlib.crc32(f.encode())
+            out[i, h % dim] += 1.0 if (h >> 31) & 1 else -1.0
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    np.divide(out, norms, out=out, where=norms > 0)
+    return out
+
+
+class EmbeddingUnavailable(RuntimeError):
+    """The embedding worker failed or returned unusable vectors."""
+
+
+def _text_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+class EmbeddingBatcher:
+    """Cross-request embedding micro-batcher with an in-process LRU cache.
+    Concurrent callers' texts are gathered for up to wait_ms (or max_batch texts) and embedded
+    in one call: POST {url}/embed on the worker when url is set, else the local hash model.
+    Vectors are cached by text hash, so repeated questions and claims are never re-embedded.
+    Worker failures raise EmbeddingUnavailable: falling back to the hash model would mix two
+    vector spaces in the semantic cache and the persisted claim index."""
+
+    def __init__(
+        self,
+        url: str = EMBED_WORKER_URL,
+        dim: Optional[int] = None,
+        max_batch: int = EMBED_BATCH_MAX,
+        wait_ms: float = EMBED_BATCH_WAIT_MS,
+        cache_size: int = EMBED_CACHE_SIZE,
+        timeout: float = EMBED_WORKER_TIMEOUT,
+    ):
+        self.url = url.rstrip("/")
+        self.dim = dim or (EMBED_DIM if url else DIM)
+        self.max_batch = max_batch
+        self.wait = wait_ms / 1000 if url else 0.0  # local model: batch within one loop tick
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self._cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._pending: dict[bytes, tuple[str, asyncio.Future]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._batches: set[asyncio.Task] = set()
+        self._client = None
+        try:
+            self._loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+        self.stats = {"requests": 0, "texts": 0, "cache_hits": 0, "batches": 0, "batched_texts": 0, "errors": 0}
+
+    def _cached(self, keys: list[bytes]) -> list[Optional[np.ndarray]]:
+        out = []
+        with self._cache_lock:
+            for key in keys:
+                v = self._cache.get(key)
+                if v is not None:
+                    self._cache.move_to_end(key)
+                    self.stats["cache_hits"] += 1
+                out.append(v)
+        return out
+
+    def _remember(self, keys: list[bytes], vectors: np.ndarray) -> None:
+        with self._cache_lock:
+            for key, v in zip(keys, vectors):
+                self._cache[key] = v
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        """(len(texts), dim) float32 unit vectors."""
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        self.stats["requests"] += 1
+        self.stats["texts"] += len(texts)
+        keys = [_text_key(t) for t in texts]
+        out = self._cached(keys)
+        waits = []
+        for i, (text, key) in enumerate(zip(texts, keys)):
+            if out[i] is not None:
+                continue
+            entry = self._pending.get(key)
+            if entry is None:
+                entry = self._pending[key] = (text, loop.create_future())
+            waits.append((i, entry[1]))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._pending and self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.wait, self._flush)
+        if waits:
+            # shield: a cancelled caller must not cancel a vector other callers are waiting for
+            vectors = await asyncio.gather(*(asyncio.shield(f) for _, f in waits))
+            for (i, _), v in zip(waits, vectors):
+                out[i] = v
+        return np.stack(out) if out else np.zeros((0, self.dim), dtype=np.float32)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = list(self._pending.items()), {}
+        for start in range(0, len(pending), self.max_batch):
+            task = asyncio.ensure_future(self._run_batch(pending[start:start + self.max_batch]))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch: list[tuple[bytes, tuple[str, asyncio.Future]]]) -> None:
+        keys = [key for key, _ in batch]
+        futures = [f for _, (_, f) in batch]
+        try:
+            vectors = await self._model([text for _, (text, _) in batch])
+        except Exception as exc:
+            self.stats["errors"] += 1
+            error = exc if isinstance(exc, EmbeddingUnavailable) else EmbeddingUnavailable(repr(exc))
+            for f in futures:
+                if not f.done():
+                    f.set_exception(error)
+                    f.exception()  # retrieved: callers may all have gone
+            return
+        self.stats["batches"] += 1
+        self.stats["batched_texts"] += len(batch)
+        self._remember(keys, vectors)
+        for f, v in zip(futures, vectors):
+            if not f.done():
+                f.set_result(v)
+
+    async def _model(self, texts: list[str]) -> np.ndarray:
+        if not self.url:
+            return hash_embed(texts, self.dim)
+        if self._client is None:
+            import httpx  # deferred: pods without an embedding worker never load it
+
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        resp = await self._client.post(f"{self.url}/embed", json={"texts": texts})
+        resp.raise_for_status()
+        vectors = np.asarray(resp.json()["embeddings"], dtype=np.float32)
+        if vectors.shape != (len(texts), self.dim):
+            raise EmbeddingUnavailable(f"worker returned shape {vectors.shape}, expected ({len(texts)}, {self.dim})")
+        if not np.linalg.norm(vectors, axis=1).all():
+            raise EmbeddingUnavailable("worker returned zero vectors (no model loaded)")
+        return vectors
+
+    def embed_blocking(self, texts: list[str]) -> np.ndarray:
+        """embed() for worker threads (persistence in the threadpool). The local model runs
+        in the calling thread; worker calls join the event loop's batches."""
+        if not self.url:
+            keys = [_text_key(t) for t in texts]
+            out = self._cached(keys)
+            missing = [i for i, v in enumerate(out) if v is None]
+            if missing:
+                vectors = hash_embed([texts[i] for i in missing], self.dim)
+                self._remember([keys[i] for i in missing], vectors)
+                for i, v in zip(missing, vectors):
+                    out[i] = v
+            return np.stack(out) if out else np.zeros((0, self.dim), dtype=np.float32)
+        loop = self._loop
+        if loop is None or not loop.is_running():
+            raise EmbeddingUnavailable("no running event loop to batch on")
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            raise RuntimeError("embed_blocking() would block the event loop; await embed() instead")
+        future = asyncio.run_coroutine_threadsafe(self.embed(texts), loop)
+        try:
+            return future.result(self.timeout + self.wait + 1)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            self.stats["errors"] += 1
+            raise EmbeddingUnavailable("no vectors from the event loop in time") from None
+
+    def metrics(self) -> dict:
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "worker": self.url or None,
+            "dim": self.dim,
+            "cached": len(self._cache),
+            "avg_batch": round(self.stats["batched_texts"] / batches, 2) if batches else 0.0,
+        }
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,318 @@
+"""
+Optional source-page enrichment (ENRICH_PAGES=true): search snippets are short and often cut
+mid-sentence, so the cited pages are fetched and their main text gives claim extraction
+better passages to rank.
+- Pages are fetched concurrently, at most ENRICH_PER_HOST at a time per host and
+  ENRICH_MAX_PAGES per request, each body capped at ENRICH_MAX_BYTES.
+- Bodies are parsed while they stream in (html.parser): scripts, styles, navigation, headers,
+  footers and forms are skipped. Text inside <main>/<article> is preferred when there is enough.
+- With ENRICH_CACHE_DIR, extracted text is cached on disk together with the page's ETag /
+  Last-Modified, and later fetches are conditional (a 304 reuses the cached text).
+- The whole stage runs within a time budget; pages not fetched in time keep their snippet.
+- Cited URLs come from search results, so every hop (redirects are followed by hand, at most
+  MAX_REDIRECTS) must resolve to public addresses only: loopback, private, link-local
+  (cloud metadata) and other non-global addresses are refused. The check lives in the
+  client's network backend, which connects to the address it checked (no second DNS lookup
+  a rebinding resolver could answer differently); TLS SNI and Host still use the hostname.
+"""
+import asyncio
+import codecs
+import hashlib
+import ipaddress
+import os
+import re
+import socket
+from html.parser import HTMLParser
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+import orjson
+
+from embeddings import tokenize
+
+ENRICH_PAGES = os.environ.get("ENRICH_PAGES", "false").lower() in ("1", "true", "yes")
+ENRICH_MAX_PAGES = int(os.environ.get("ENRICH_MAX_PAGES", "5"))
+ENRICH_PER_HOST = int(os.environ.get("ENRICH_PER_HOST", "2"))
+ENRICH_MAX_BYTES = int(os.environ.get("ENRICH_MAX_BYTES", str(512 * 1024)))
+ENRICH_CACHE_DIR = os.environ.get("ENRICH_CACHE_DIR", "")
+ENRICH_TIMEOUT = float(os.environ.get("ENRICH_TIMEOUT_MS", "1500")) / 1000
+PASSAGE_CHARS = 3000  # per page: the most question-relevant paragraphs up to this size
+MIN_BLOCK_CHARS = 40  # shorter text blocks are menus, labels, bylines
+MAIN_MIN_CHARS = 200  # <main>/<article> text needed before the rest of the page is ignored
+MAX_REDIRECTS = 5
+
+_SKIP = {"script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form", "button", "select"}
+_BLOCKS = {"p", "li", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote", "td", "dd", "dt", "div", "section"}
+_VOID = {"br", "hr", "img", "input", "meta", "link", "wbr", "source", "area", "col", "embed", "param", "track"}
+_SPACE_RE = re.compile(r"\s+")
+
+
+class MainTextParser(HTMLParser):
+    """Incremental main-text extraction: feed() chunks as they arrive, then text_blocks()."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._skip = 0
+        self._main = 0
+        self._buf: list[str] = []
+        self.blocks: list[str] = []
+        self.main_blocks: list[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _VOID:
+            return
+        if tag in _SKIP:
+            self._skip += 1
+        elif tag in ("main", "article"):
+            self._flush()
+            self._main += 1
+        elif tag in _BLOCKS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP:
+            self._skip = max(self._skip - 1, 0)
+        elif tag in ("main", "article"):
+            self._flush()
+            self._main = max(self._main - 1, 0)
+        elif tag in _BLOCKS:
+            self._flush()
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._buf.append(data)
+
+    def _flush(self) -> None:
+        text = _SPACE_RE.sub(" ", "".join(self._buf)).strip()
+        self._buf = []
+        if len(text) >= MIN_BLOCK_CHARS:
+            self.blocks.append(text)
+            if self._main:
+                self.main_blocks.append(text)
+
+    def text_blocks(self) -> list[str]:
+        self.close()
+        self._flush()
+        return self.main_blocks if sum(map(len, self.main_blocks)) >= MAIN_MIN_CHARS else self.blocks
+
+
+def select_passage(question: str, blocks: list[str], limit: int = PASSAGE_CHARS) -> str:
+    """The blocks sharing most terms with the question, up to limit chars, in page order."""
+    terms = set(tokenize(question))
+    ranked = sorted(range(len(blocks)), key=lambda i: (-len(terms.intersection(tokenize(blocks[i]))), i))
+    keep, total = [], 0
+    for i in ranked:
+        if total + len(blocks[i]) > limit:
+            continue
+        keep.append(i)
+        total += len(blocks[i])
+    return "\n".join(blocks[i] for i in sorted(keep))
+
+
+def is_public_address(ip: ipaddress.IPv4Address | ipaddress.IPv6Address) -> bool:
+    """Globally routable unicast address (not loopback, private, link-local, reserved...)."""
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+class BlockedAddress(Exception):
+    """The host resolved to an address enrichment must not connect to."""
+
+
+def _checked_backend(resolve):
+    """httpcore network backend connecting only to addresses returned by resolve(host, port)."""
+    import httpcore
+
+    class CheckedBackend(httpcore.AsyncNetworkBackend):
+        def __init__(self):
+            self._inner = httpcore.AnyIOBackend()
+
+        async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+            error = None
+            for ip in await resolve(host, port):
+                try:
+                    return await self._inner.connect_tcp(ip, port, timeout, local_address, socket_options)
+                except httpcore.ConnectError as e:
+                    error = e
+            raise error or httpcore.ConnectError(f"no address for {host}")
+
+        async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+            raise BlockedAddress(path)
+
+        async def sleep(self, seconds):
+            await self._inner.sleep(seconds)
+
+    return CheckedBackend()
+
+
+class PageEnricher:
+    def __init__(
+        self,
+        cache_dir: str = ENRICH_CACHE_DIR,
+        max_pages: int = ENRICH_MAX_PAGES,
+        per_host: int = ENRICH_PER_HOST,
+        max_bytes: int = ENRICH_MAX_BYTES,
+        timeout: float = ENRICH_TIMEOUT,
+        address_allowed: Callable[[ipaddress.IPv4Address | ipaddress.IPv6Address], bool] = is_public_address,
+    ):
+        self.cache_dir = cache_dir
+        self.max_pages = max_pages
+        self.per_host = per_host
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.address_allowed = address_allowed
+        self._hosts: dict[str, list] = {}  # host -> [semaphore, requests using it]
+        self._client = None
+        self.stats = {"fetched": 0, "not_modified": 0, "failed": 0, "timed_out": 0, "blocked": 0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _http(self):
+        if self._client is None:
+            import httpx  # deferred like YouClient: pods without enrichment never load it
+
+            import httpcore
+
+            transport = httpx.AsyncHTTPTransport()
+            # httpx 0.26 takes no network backend; swap in a pool built like its own
+            transport._pool = httpcore.AsyncConnectionPool(
+                ssl_context=httpx.create_ssl_context(), network_backend=_checked_backend(self._resolve),
+            )
+            self._client = httpx.AsyncClient(
+                transport=transport, timeout=self.timeout, follow_redirects=False,  # each hop is checked
+                trust_env=False,  # an env proxy would connect on our behalf, unchecked
+                headers={"User-Agent": "LiveProofAI/1.0 (+source verification)"},
+            )
+        return self._client
+
+    async def enrich(self, question: str, citations: list, budget: float) -> tuple[dict[str, str], bool]:
+        """Main-text passages by url for the first pages, fetched within budget seconds;
+        the flag is True when the budget cut fetches short."""
+        urls = list(dict.fromkeys(
+            c.url for c in citations if c.url and urlsplit(c.url).scheme in ("http", "https")
+        ))[:self.max_pages]
+        if not urls or budget <= 0:
+            return {}, bool(urls)
+        tasks = {asyncio.ensure_future(self._page(url)): url for url in urls}
+        done, pending = await asyncio.wait(tasks, timeout=budget)
+        for task in pending:
+            task.cancel()
+        self.stats["timed_out"] += len(pending)
+        passages = {}
+        for task in done:
+            blocks = task.result()
+            if blocks:
+                passages[tasks[task]] = select_passage(question, blocks)
+        return passages, bool(pending)
+
+    async def _page(self, url: str) -> Optional[list[str]]:
+        host = urlsplit(url).netloc
+        slot = self._hosts.get(host)
+        if slot is None:
+            slot = self._hosts[host] = [asyncio.Semaphore(self.per_host), 0]
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                return await self._fetch(url)
+        except Exception:
+            self.stats["failed"] += 1
+            return None
+        finally:
+            slot[1] -= 1
+            if not slot[1]:
+                del self._hosts[host]  # no per-host state kept for idle hosts
+
+    def _cache_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode()).hexdigest()[:32] + ".json")
+
+    async def _getaddrinfo(self, host: str, port: int) -> list[str]:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        return list(dict.fromkeys(info[4][0] for info in infos))
+
+    async def _resolve(self, host: str, port: int) -> list[str]:
+        """Addresses to connect to for host; BlockedAddress unless all pass address_allowed."""
+        if isinstance(host, bytes):
+            host = host.decode("ascii")
+        try:
+            addresses = await self._getaddrinfo(host, port)
+        except (socket.gaierror, UnicodeError):
+            addresses = []
+        if not addresses or not all(self.address_allowed(ipaddress.ip_address(a.split("%")[0])) for a in addresses):
+            raise BlockedAddress(host)
+        return addresses
+
+    async def _fetch(self, url: str) -> Optional[list[str]]:
+        cached = await asyncio.to_thread(self._load, url) if self.cache_dir else None
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        target = url
+        for _ in range(MAX_REDIRECTS + 1):
+            if urlsplit(target).scheme not in ("http", "https"):
+                self.stats["blocked"] += 1
+                return None
+            try:
+                async with self._http().stream("GET", target, headers=headers) as resp:
+                    if resp.has_redirect_location:
+                        target = str(resp.url.join(resp.headers["location"]))
+                        headers = {}  # validators belong to the first url only
+                        continue
+                    if resp.status_code == 304 and cached:
+                        self.stats["not_modified"] += 1
+                        return cached["blocks"]
+                    content_type = resp.headers.get("content-type", "")
+                    if resp.status_code != 200 or not content_type.startswith(("text/html", "application/xhtml", "text/plain")):
+                        self.stats["failed"] += 1
+                        return None
+                    try:
+                        decoder = codecs.getincrementaldecoder(resp.encoding or "utf-8")(errors="replace")
+                    except LookupError:
+                        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                    parser, plain, size = MainTextParser(), [], 0
+                    feed = plain.append if content_type.startswith("text/plain") else parser.feed
+                    async for chunk in resp.aiter_bytes():
+                        chunk = chunk[:self.max_bytes - size]
+                        size += len(chunk)
+                        feed(decoder.decode(chunk))
+                        if size >= self.max_bytes:
+                            break
+                    feed(decoder.decode(b"", final=True))
+                    etag, last_modified = resp.headers.get("etag"), resp.headers.get("last-modified")
+            except BlockedAddress:
+                self.stats["blocked"] += 1
+                return None
+            break
+        else:
+            self.stats["failed"] += 1  # too many redirects
+            return None
+        if plain:
+            blocks = [b for b in (_SPACE_RE.sub(" ", p).strip() for p in "".join(plain).split("\n\n")) if len(b) >= MIN_BLOCK_CHARS]
+        else:
+            blocks = parser.text_blocks()
+        self.stats["fetched"] += 1
+        if self.cache_dir and (etag or last_modified):
+            await asyncio.to_thread(self._store, url, {"etag": etag, "last_modified": last_modified, "blocks": blocks})
+        return blocks
+
+    def _load(self, url: str) -> Optional[dict]:
+        try:
+            with open(self._cache_path(url), "rb") as f:
+                return orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError):
+            return None
+
+    def _store(self, url: str, entry: dict) -> None:
+        path = self._cache_path(url)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(orjson.dumps(entry))
+        os.replace(tmp, path)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
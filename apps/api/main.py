@@ -1,19 +1,65 @@
 """
 LiveProof AI - FastAPI backend.
-Endpoints: /verify, /execute, /session/{id}, /topic/{topic}/compare, /sources/top
+Endpoints: /verify, /execute, /session/{id}, /topic/{topic}/compare, /topic/{topic}/digest,
+/topic/{topic}/export, /sources/top,
+/health (liveness), /ready (readiness: warm-up done), /metrics/admission, /metrics/persistence,
+/metrics/semantic-cache, /metrics/session-cache, /metrics/enrichment, /metrics/embeddings,
+/admin/profile, /admin/slow-requests, /admin/loop-lag (ADMIN_TOKEN)
 """
+import asyncio
+import hmac
+import time
+import zlib
 from contextlib import asynccontextmanager
 from typing import Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 
-from you_client import YouClient, StubMode
+import orjson
+
+from you_client import YouClient, CachedYouClient, StubMode
 from sanity_store import SanityStore
 from verification import run_verification_pipeline, run_execute
+from models import to_payload, to_json, from_payload
+from shared_state import (
+    open_state, run_state, HashRing, SHARED_STATE_URL, SHARED_STATE_PURGE_S, SESSION_TTL, API_REPLICAS,
+)
+from claim_index import ClaimIndex, CLAIM_INDEX_DIR, CLAIM_INDEX_COVERAGE
+from analytics_snapshot import (
+    SnapshotReader,
+    rebuild_if_due,
+    ANALYTICS_SNAPSHOT_DIR,
+    ANALYTICS_SNAPSHOT_INTERVAL,
+)
+from warmup import warm_up
+from claim_extraction import BM25Model, merge_statistics
+from deadline import Deadline, parse_deadline_header
+from topic_digest import DigestStore
+from semantic_cache import SemanticCache
+from embeddings import EmbeddingBatcher, EmbeddingUnavailable
+from snippet_store import PackedSessions
+from enrichment import PageEnricher, ENRICH_PAGES
+from session_wal import SessionWAL, SESSION_WAL_DIR, SESSION_WAL_WARM
+from traffic_recorder import TrafficRecorder, TRAFFIC_RECORD_PATH
+from admission import AdmissionController, AdmissionMiddleware
+from profiling import (
+    ADMIN_TOKEN,
+    PROFILE_MAX_SECONDS,
+    LoopLagMonitor,
+    ProfilingMiddleware,
+    SlowRequestLog,
+    collapsed,
+    note_request,
+    sample_stacks,
+    stage,
+)
 
 RELIABILITY_THRESHOLD = 0.65
+EXPORT_PAGE_SIZE = 200
 
 
 # --- Request/Response models ---
@@ -21,6 +67,8 @@ class VerifyRequest(BaseModel):
     question: str = Field(..., min_length=1, max_length=2000)
     mode: str = Field(default="answer", pattern="^(answer|execute)$")
     topic: Optional[str] = Field(default=None, max_length=200)
+    # Time budget in ms; X-Request-Deadline takes precedence, VERIFY_BUDGET_MS caps both
+    budget_ms: Optional[int] = Field(default=None, ge=1, le=600000)
 
 
 class VerifyResponse(BaseModel):
@@ -32,6 +80,9 @@ class VerifyResponse(BaseModel):
     can_execute: bool
     next_question: Optional[str] = None
     topic: Optional[str] = None
+    degraded_stages: list[str] = []
+    stale: bool = False  # search results were served from cache past their freshness TTL
+    cached_from: Optional[str] = None  # session whose claims were reused for a similar question
 
 
 class ExecuteRequest(BaseModel):
@@ -46,18 +97,127 @@ class ExecuteResponse(BaseModel):
     safety_notes: list[str]
 
 
+VERIFY_RESPONSE_FIELDS = tuple(VerifyResponse.model_fields)
+
+
+class JSONBytesResponse(Response):
+    """Pre-encoded JSON body; FastAPI skips response_model validation for Response returns."""
+    media_type = "application/json"
+
+
 # --- In-memory session store (fallback when Sanity not configured) ---
-_sessions: dict[str, dict] = {}
+# Packed against a shared snippet store; recently encoded /session bodies are kept alongside
+_sessions = PackedSessions()
+# Persistence writes deferred past the response when the budget could not fit them
+_background: set[asyncio.Task] = set()
+# EWMA of inline persistence time (seconds); decides whether persistence fits the budget
+_persist_cost = [0.0]
+PERSIST_EWMA_ALPHA = 0.2
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: init You client and Sanity store from env
-    app.state.you_client = YouClient()
+    # Startup: init shared state tier, You client and Sanity store from env
+    app.state.shared = open_state(SHARED_STATE_URL)
+    app.state.ring = HashRing(API_REPLICAS)
+    app.state.recorder = TrafficRecorder(TRAFFIC_RECORD_PATH) if TRAFFIC_RECORD_PATH else None
+    app.state.you_client = CachedYouClient(YouClient(recorder=app.state.recorder), app.state.shared)
     app.state.sanity = SanityStore()
+    # One vector space for every store: switching EMBED_WORKER_URL needs a fresh CLAIM_INDEX_DIR
+    # (an index of another dimension is refused at startup)
+    embedder = app.state.embedder = EmbeddingBatcher()
+    app.state.claim_index = (
+        ClaimIndex(CLAIM_INDEX_DIR, dim=embedder.dim, embed=embedder.embed_blocking) if CLAIM_INDEX_DIR else None
+    )
+    app.state.analytics = SnapshotReader(ANALYTICS_SNAPSHOT_DIR) if ANALYTICS_SNAPSHOT_DIR else None
+    app.state.digests = DigestStore(app.state.shared)
+    app.state.semantic_cache = SemanticCache(embed=embedder.embed_blocking, dim=embedder.dim)
+    app.state.enricher = PageEnricher() if ENRICH_PAGES else None
+    app.state.session_wal = SessionWAL(SESSION_WAL_DIR) if SESSION_WAL_DIR else None
+    app.state.session_wal_recovery = None
+    app.state.ready = False
+    app.state.warmup = None
+    warmer = asyncio.create_task(_warm_up())
+    loop_lag.start()
+    purger = asyncio.create_task(_purge_shared_state(app.state.shared))
+    refresher = None
+    if app.state.analytics and app.state.sanity.enabled:
+        refresher = asyncio.create_task(_refresh_analytics_snapshot(app.state.sanity))
     yield
     # Shutdown
-    pass
+    warmer.cancel()
+    purger.cancel()
+    loop_lag.stop()
+    if refresher:
+        refresher.cancel()
+    if _background:
+        await asyncio.gather(*_background, return_exceptions=True)
+    if app.state.recorder:
+        app.state.recorder.close()
+    if app.state.enricher:
+        await app.state.enricher.aclose()
+    await app.state.embedder.aclose()
+    if app.state.session_wal is not None:
+        await run_in_threadpool(app.state.session_wal.close)
+
+
+async def _warm_up() -> None:
+    """Recover logged sessions, warm caches and deferred imports off the event loop, then
+    report ready."""
+    if app.state.session_wal is not None:
+        try:
+            app.state.session_wal_recovery = await run_in_threadpool(_recover_sessions, app.state.session_wal)
+        except Exception as exc:
+            app.state.session_wal_recovery = {"error": repr(exc)}
+            app.state.session_wal = None  # serve without the log rather than never becoming ready
+    try:
+        ranker = BM25Model()
+        app.state.warmup = await run_in_threadpool(
+            warm_up,
+            app.state.shared,
+            app.state.you_client,
+            app.state.sanity,
+            app.state.claim_index,
+            app.state.analytics,
+            model=ranker,
+        )
+        merge_statistics(ranker)  # back on the loop, where requests use the shared model
+    except Exception as exc:
+        app.state.warmup = {"error": repr(exc)}  # serve cold rather than never becoming ready
+    app.state.ready = True
+
+
+def _recover_sessions(wal: SessionWAL) -> dict:
+    """Index the session log, then load the most recent sessions into memory; older ones are
+    read from the log on demand (get_session)."""
+    report = wal.open()
+    loaded = 0
+    for session_id in wal.recent(SESSION_WAL_WARM):
+        raw = wal.get(session_id)
+        if raw is not None and session_id not in _sessions:
+            _sessions[session_id] = from_payload(orjson.loads(raw))
+            loaded += 1
+    return {**report, "loaded": loaded}
+
+
+async def _refresh_analytics_snapshot(sanity: SanityStore) -> None:
+    """Rebuild the analytics snapshot in the background; one worker builds, all read."""
+    while True:
+        try:
+            await run_in_threadpool(rebuild_if_due, sanity, ANALYTICS_SNAPSHOT_DIR, ANALYTICS_SNAPSHOT_INTERVAL)
+        except Exception:
+            pass  # keep serving the previous snapshot (or GROQ) on build failure
+        await asyncio.sleep(min(ANALYTICS_SNAPSHOT_INTERVAL, 60))
+
+
+async def _purge_shared_state(shared) -> None:
+    """Drop expired sessions, search results and locks that nobody reads again."""
+    while True:
+        await asyncio.sleep(SHARED_STATE_PURGE_S)
+        try:
+            await run_in_threadpool(shared.purge_expired)
+        except Exception:
+            pass  # busy or unavailable: retry next round
 
 
 app = FastAPI(
@@ -66,6 +226,13 @@ app = FastAPI(
     version="1.0.0",
     lifespan=lifespan,
 )
+# Slow /verify and /execute requests with per-stage timings; event-loop stall detection
+slow_requests = SlowRequestLog()
+loop_lag = LoopLagMonitor()
+app.add_middleware(ProfilingMiddleware, log=slow_requests)
+# Per-endpoint-class concurrency limits and load shedding; probes bypass it
+admission = AdmissionController()
+app.add_middleware(AdmissionMiddleware, controller=admission)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -75,9 +242,32 @@ app.add_middleware(
 )
 
 
+async def load_session(session_id: str) -> Optional[dict]:
+    """get_session() without blocking the event loop when the session is not in memory."""
+    if session_id in _sessions:
+        return _sessions[session_id]
+    return await run_in_threadpool(get_session, session_id)
+
+
 def get_session(session_id: str) -> Optional[dict]:
+    """Session from memory, the shared tier, the local log or Sanity (blocking I/O)."""
     if session_id in _sessions:
         return _sessions[session_id]
+    # Another replica may have created it
+    raw = app.state.shared.get(f"session:{session_id}")
+    if raw is not None:
+        session = from_payload(orjson.loads(raw))
+        _sessions[session_id] = session
+        _sessions.set_encoded(session_id, raw)
+        return session
+    # Logged before a restart of this pod
+    wal: Optional[SessionWAL] = app.state.session_wal
+    raw = wal.get(session_id) if wal is not None and session_id in wal else None
+    if raw is not None:
+        session = from_payload(orjson.loads(raw))
+        _sessions[session_id] = session
+        _sessions.set_encoded(session_id, raw)
+        return session
     sanity = app.state.sanity
     if sanity.enabled:
         doc = sanity.get_session(session_id)
@@ -86,11 +276,25 @@ def get_session(session_id: str) -> Optional[dict]:
     return None
 
 
+def get_analytics_snapshot():
+    reader = app.state.analytics
+    return reader.current() if reader else None
+
+
 @app.post("/verify", response_model=VerifyResponse)
-async def verify(req: VerifyRequest):
-    """Run verification pipeline: You.com search -> claims -> reliability -> Sanity."""
-    you_client: YouClient = app.state.you_client
+async def verify(req: VerifyRequest, request: Request):
+    """Run verification pipeline: You.com search -> claims -> reliability -> Sanity.
+    The time budget (X-Request-Deadline, budget_ms or VERIFY_BUDGET_MS) is shared by all
+    stages; degraded_stages lists the ones that cut work to fit it."""
+    you_client: CachedYouClient = app.state.you_client
     sanity: SanityStore = app.state.sanity
+    claim_index: Optional[ClaimIndex] = app.state.claim_index
+    started = time.perf_counter()
+    recorder: Optional[TrafficRecorder] = app.state.recorder
+    rid = recorder.begin() if recorder else None
+    deadline = Deadline.for_request(request.headers.get("X-Request-Deadline"), req.budget_ms)
+    note_request(question_chars=len(req.question), mode=req.mode, topic=bool(req.topic),
+                 budget_s=round(min(deadline.remaining(), 1e9), 3))
 
     result = await run_verification_pipeline(
         question=req.question,
@@ -98,29 +302,75 @@ async def verify(req: VerifyRequest):
         topic=req.topic,
         you_client=you_client,
         sanity_store=sanity,
+        claim_index=claim_index,
+        prior_coverage=CLAIM_INDEX_COVERAGE,
+        deadline=deadline,
+        semantic_cache=app.state.semantic_cache,
+        enricher=app.state.enricher,
+        embedder=app.state.embedder,
     )
-    # Persist to in-memory for quick lookup
-    _sessions[result["session_id"]] = result
-    # Persist to Sanity when enabled
+    # Persist to in-memory for quick lookup (compact models, not dicts)
+    session_id = result["session_id"]
+    # Decide before encoding: the stored session and the response both list degraded stages
+    defer = deadline.remaining() < 1.5 * _persist_cost[0]
+    if defer:
+        deadline.degrade("persistence")
+    _sessions[session_id] = result
+    with stage("cache_session"):
+        # Encode once: /session/{id} serves these bytes as-is, here and on other replicas
+        session_bytes = to_json(result)
+        _sessions.set_encoded(session_id, session_bytes)
+        await run_state(app.state.shared, "set", f"session:{session_id}", session_bytes, SESSION_TTL)
+        if app.state.session_wal is not None:
+            app.state.session_wal.append(session_id, session_bytes)
+    persisting = run_in_threadpool(_persist, to_payload(result), sanity, claim_index, app.state.digests)
+    if defer:
+        task = asyncio.create_task(persisting)
+        _background.add(task)
+        task.add_done_callback(_background.discard)
+    else:
+        with stage("persistence"):
+            await persisting
+
+    # Trusted internal data: encode the response fields directly instead of re-validating
+    response = JSONBytesResponse(to_json({k: result.get(k) for k in VERIFY_RESPONSE_FIELDS}))
+    replica = app.state.ring.node_for(session_id)
+    if replica:
+        # Routing hint: follow-up /execute and /session calls are cheapest on this replica
+        response.headers["X-Session-Affinity"] = replica
+    if rid:
+        recorded = req.model_dump(exclude_none=True)
+        header_ms = parse_deadline_header(request.headers.get("X-Request-Deadline", ""))
+        if header_ms is not None:
+            recorded["deadline_ms"] = round(header_ms)  # absolute deadlines become a relative budget
+        recorder.record_verify(rid, recorded, (time.perf_counter() - started) * 1000, response.status_code)
+    return response
+
+
+def _persist(payload: dict, sanity: SanityStore, claim_index: Optional[ClaimIndex], digests: DigestStore) -> None:
+    """Write a verified session to Sanity, the claim index and its topic digest; updates
+    the cost estimate."""
+    t = time.perf_counter()
     if sanity.enabled:
-        sanity.upsert_verification_result(result)
-
-    return VerifyResponse(
-        answer=result["answer"],
-        reliability_score=result["reliability_score"],
-        claims=result["claims"],
-        citations=result["citations"],
-        session_id=result["session_id"],
-        can_execute=result["can_execute"],
-        next_question=result.get("next_question"),
-        topic=result.get("topic"),
-    )
+        sanity.upsert_verification_result(payload)
+    # Index claims for reuse by later sessions
+    if claim_index is not None:
+        try:
+            claim_index.add_result(payload)
+        except EmbeddingUnavailable:
+            pass  # claims stay unindexed; counted in /metrics/embeddings errors
+    digests.update(payload)
+    cost = time.perf_counter() - t
+    prev = _persist_cost[0]
+    _persist_cost[0] = prev + PERSIST_EWMA_ALPHA * (cost - prev) if prev else cost
 
 
 @app.post("/execute", response_model=ExecuteResponse)
 async def execute(req: ExecuteRequest):
     """Execute a safe action (code snippet, PDF report, config) for a verified session."""
-    session = get_session(req.session_id)
+    note_request(action_type=req.action_type)
+    with stage("load_session"):
+        session = await load_session(req.session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     if not session.get("can_execute"):
@@ -128,10 +378,11 @@ async def execute(req: ExecuteRequest):
             status_code=400,
             detail="Execution not allowed: reliability below threshold. Ask for clarification.",
         )
-    outcome = run_execute(
-        session=session,
-        action_type=req.action_type,
-    )
+    with stage("execute"):
+        outcome = run_execute(
+            session=session,
+            action_type=req.action_type,
+        )
     return ExecuteResponse(
         artifact=outcome["artifact"],
         artifact_type=outcome["artifact_type"],
@@ -142,16 +393,25 @@ async def execute(req: ExecuteRequest):
 
 @app.get("/session/{session_id}")
 async def get_session_endpoint(session_id: str):
-    """Get a session by ID (from memory or Sanity)."""
-    session = get_session(session_id)
+    """Get a session by ID (from memory or Sanity). Recently encoded bodies are served as-is;
+    replacing a session drops its cached body."""
+    raw = _sessions.encoded(session_id)
+    if raw is not None:
+        return JSONBytesResponse(raw)
+    session = await load_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-    return session
+    raw = to_json(session)
+    _sessions.set_encoded(session_id, raw)
+    return JSONBytesResponse(raw)
 
 
 @app.get("/topic/{topic}/compare")
 async def topic_compare(topic: str):
-    """Compare sessions for the same topic (from Sanity structured content)."""
+    """Compare sessions for the same topic (from the analytics snapshot or Sanity)."""
+    snapshot = get_analytics_snapshot()
+    if snapshot:
+        return {"topic": topic, "sessions": snapshot.compare_sessions_by_topic(topic)}
     sanity: SanityStore = app.state.sanity
     if not sanity.enabled:
         return {"topic": topic, "sessions": [], "message": "Sanity not configured; no compare data."}
@@ -159,9 +419,65 @@ async def topic_compare(topic: str):
     return {"topic": topic, "sessions": sessions}
 
 
+@app.get("/topic/{topic}/digest")
+async def topic_digest(topic: str):
+    """Precomputed topic digest: reliability stats and trend, consensus claim, top sources,
+    claim clusters and latest sessions. Maintained on every persisted verification."""
+    body = await run_in_threadpool(app.state.digests.get, topic)
+    if body is None:
+        raise HTTPException(status_code=404, detail="No verified sessions for this topic yet")
+    return JSONBytesResponse(body)
+
+
+async def _export_pages(topic: str, since: str):
+    """Pages of sessions for a topic, oldest first: from Sanity, else the in-memory store."""
+    sanity: SanityStore = app.state.sanity
+    if sanity.enabled:
+        pages = sanity.iter_topic_sessions(topic, since, EXPORT_PAGE_SIZE)
+        while True:
+            # One blocking GROQ round-trip per page, off the event loop
+            page = await run_in_threadpool(next, pages, None)
+            if page is None:
+                return
+            yield page
+        return
+    slug = topic.replace(" ", "-").lower()[:50]
+    keys = sorted(
+        (created, sid) for sid in _sessions
+        if (_sessions.field(sid, "topic") or "general").replace(" ", "-").lower()[:50] == slug
+        and (created := _sessions.field(sid, "created_at") or "") >= since
+    )
+    for i in range(0, len(keys), EXPORT_PAGE_SIZE):
+        yield [s for _, sid in keys[i:i + EXPORT_PAGE_SIZE] if (s := _sessions.get(sid)) is not None]
+
+
+async def _ndjson(pages, gzip: bool):
+    """One JSON session per line; with gzip, each page is sync-flushed so clients see progress."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+    async for page in pages:
+        chunk = b"".join(to_json(session) + b"\n" for session in page)
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH) if compressor else chunk
+    if compressor:
+        yield compressor.flush()
+
+
+@app.get("/topic/{topic}/export")
+async def topic_export(topic: str, request: Request, since: str = ""):
+    """Stream every session for a topic (claims and citations included) as NDJSON, oldest first.
+    since: ISO timestamp; only sessions created at or after it (incremental pulls)."""
+    gzip = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {"Content-Encoding": "gzip", "Vary": "Accept-Encoding"} if gzip else {"Vary": "Accept-Encoding"}
+    return StreamingResponse(
+        _ndjson(_export_pages(topic, since), gzip), media_type="application/x-ndjson", headers=headers,
+    )
+
+
 @app.get("/sources/top")
 async def sources_top(limit: int = 20):
-    """Top cited sources across all sessions (from Sanity)."""
+    """Top cited sources across all sessions (from the analytics snapshot or Sanity)."""
+    snapshot = get_analytics_snapshot()
+    if snapshot:
+        return {"sources": snapshot.top_sources(limit=limit)}
     sanity: SanityStore = app.state.sanity
     if not sanity.enabled:
         return {"sources": [], "message": "Sanity not configured."}
@@ -172,3 +488,89 @@ async def sources_top(limit: int = 20):
 @app.get("/health")
 async def health():
     return {"status": "ok", "service": "liveproof-api"}
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness: 503 until warm-up has finished, so traffic only reaches warm pods."""
+    if not getattr(app.state, "ready", False):
+        return JSONResponse({"status": "warming"}, status_code=503)
+    return {"status": "ready", "warmup": app.state.warmup}
+
+
+@app.get("/metrics/admission")
+async def admission_metrics():
+    """Live admission-control state per endpoint class: limits, in flight, queued, shed,
+    queue-wait histogram."""
+    return admission.metrics()
+
+
+def require_admin(request: Request) -> None:
+    """Admin endpoints exist only when ADMIN_TOKEN is set and need it as a bearer token."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Admin token required")
+
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def admin_profile(
+    seconds: float = Query(default=5.0, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(default=5.0, ge=1, le=1000),
+):
+    """Sample every thread for `seconds`; collapsed stacks (flamegraph.pl / speedscope input)."""
+    counts = await run_in_threadpool(sample_stacks, seconds, interval_ms / 1000)
+    return PlainTextResponse(collapsed(counts), headers={"Content-Disposition": "attachment; filename=profile.folded"})
+
+
+@app.get("/admin/slow-requests", dependencies=[Depends(require_admin)])
+async def admin_slow_requests():
+    """Recent /verify and /execute requests above SLOW_REQUEST_MS, newest first."""
+    return slow_requests.snapshot()
+
+
+@app.get("/admin/loop-lag", dependencies=[Depends(require_admin)])
+async def admin_loop_lag():
+    """Event-loop lag and the stalls above LOOP_LAG_MS with the call that blocked the loop."""
+    return loop_lag.snapshot()
+
+
+@app.get("/metrics/semantic-cache")
+async def semantic_cache_metrics():
+    """Semantic result cache: lookups, hits, hit rate, best-match similarity histogram."""
+    return app.state.semantic_cache.metrics()
+
+
+@app.get("/metrics/enrichment")
+async def enrichment_metrics():
+    """Source-page enrichment: pages fetched, revalidated (304), failed, cut by the budget."""
+    enricher: Optional[PageEnricher] = app.state.enricher
+    return {"enabled": enricher is not None, **(enricher.stats if enricher else {})}
+
+
+@app.get("/metrics/embeddings")
+async def embedding_metrics():
+    """Embedding batcher: texts embedded, cache hits, batches sent and their average size."""
+    return app.state.embedder.metrics()
+
+
+@app.get("/metrics/session-cache")
+async def session_cache_metrics():
+    """In-process session cache: sessions, distinct texts and their raw vs stored bytes."""
+    wal: Optional[SessionWAL] = app.state.session_wal
+    return {
+        **_sessions.stats(),
+        "wal": {**wal.metrics(), "recovery": app.state.session_wal_recovery} if wal is not None else None,
+    }
+
+
+@app.get("/metrics/persistence")
+async def persistence_metrics():
+    """Sanity mutations planned vs sent since startup; unchanged shared documents are skipped."""
+    stats = dict(app.state.sanity.stats)
+    n = stats["verifications"] or 1
+    stats["planned_per_verify"] = round(stats["planned"] / n, 2)
+    stats["sent_per_verify"] = round(stats["sent"] / n, 2)
+    stats["reduction"] = round(1 - stats["sent"] / stats["planned"], 4) if stats["planned"] else 0.0
+    return stats
@@ -0,0 +1,93 @@
+"""
+Compact internal types for citations and claims.
+Slotted dataclasses are what flows through the pipeline and sits in the session cache.
+to_json() encodes them straight to response bytes (orjson handles slotted dataclasses
+natively, with the same field order as to_dict); to_payload() gives plain dicts for Sanity.
+"""
+from dataclasses import dataclass, field
+from typing import Optional, Union
+
+import orjson
+
+
+@dataclass(slots=True)
+class Citation:
+    title: str = ""
+    url: str = ""
+    snippet: str = ""
+    published_at: Optional[str] = None
+    source_name: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "title": self.title,
+            "url": self.url,
+            "snippet": self.snippet,
+            "published_at": self.published_at,
+            "source_name": self.source_name,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Citation":
+        return cls(
+            title=d.get("title") or "",
+            url=d.get("url") or "",
+            snippet=d.get("snippet") or "",
+            published_at=d.get("published_at"),
+            source_name=d.get("source_name"),
+        )
+
+
+@dataclass(slots=True)
+class Claim:
+    id: str
+    text: str
+    stance: str = "neutral"
+    citation_ids: list[Union[int, str]] = field(default_factory=list)  # indices or "source-..." ids
+    confidence: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "text": self.text,
+            "stance": self.stance,
+            "citation_ids": list(self.citation_ids),
+            "confidence": self.confidence,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Claim":
+        return cls(
+            id=d.get("id") or "",
+            text=d.get("text") or "",
+            stance=d.get("stance") or "neutral",
+            citation_ids=list(d.get("citation_ids") or []),
+            confidence=d.get("confidence"),
+        )
+
+
+def _plain(item):
+    return item.to_dict() if isinstance(item, (Citation, Claim)) else item
+
+
+def to_payload(result: dict) -> dict:
+    """Session/result dict with claims and citations as plain dicts (already-plain items pass through)."""
+    return {
+        **result,
+        "claims": [_plain(c) for c in result.get("claims") or []],
+        "citations": [_plain(c) for c in result.get("citations") or []],
+    }
+
+
+def from_payload(payload: dict) -> dict:
+    """Inverse of to_payload: plain claim/citation dicts back to models."""
+    return {
+        **payload,
+        "claims": [Claim.from_dict(c) for c in payload.get("claims") or []],
+        "citations": [Citation.from_dict(c) for c in payload.get("citations") or []],
+    }
+
+
+def to_json(obj) -> bytes:
+    """Encode a payload (dicts, lists, Citation/Claim) to JSON bytes without re-validation."""
+    return orjson.dumps(obj)
@@ -0,0 +1,201 @@
+"""
+Admin-only diagnostics for the API process (enabled when ADMIN_TOKEN is set):
+- a time-boxed sampling profiler over all threads (sys._current_frames), returned as
+  collapsed stacks ("frame;frame;frame count" lines, ready for flamegraph.pl/speedscope);
+- a slow-request log: /verify and /execute requests slower than SLOW_REQUEST_MS, with
+  their request shape and per-stage timings, kept in a bounded ring buffer;
+- an event-loop lag monitor: a loop heartbeat plus a watchdog thread that, when the loop
+  stalls longer than LOOP_LAG_MS, captures the loop thread's stack so the blocking call
+  (synchronous Sanity I/O, PDF rendering in run_execute, ...) is named.
+"""
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Optional
+
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "1000"))
+SLOW_REQUEST_BUFFER = int(os.environ.get("SLOW_REQUEST_BUFFER", "100"))
+LOOP_LAG_MS = float(os.environ.get("LOOP_LAG_MS", "100"))
+PROFILE_MAX_SECONDS = 30.0
+PROFILED_PATHS = ("/verify", "/execute")
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_request: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("profiled_request", default=None)
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _stack(frame, limit: int = 128) -> list[str]:
+    """Frame names of a stack, outermost first."""
+    names = []
+    while frame is not None and len(names) < limit:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return names[::-1]
+
+
+def _own_frame(frame) -> str:
+    """Innermost frame in the API's own modules: the call responsible for what runs below it."""
+    while frame is not None:
+        if frame.f_code.co_filename.startswith(API_DIR):
+            return f"{_frame_name(frame)}:{frame.f_lineno}"
+        frame = frame.f_back
+    return ""
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> Counter:
+    """Blocking: sample every thread's stack for `seconds`; returns collapsed stack counts.
+    Run it in a worker thread so the event loop keeps running (and gets sampled)."""
+    me = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    counts: Counter = Counter()
+    end = time.monotonic() + min(seconds, PROFILE_MAX_SECONDS)
+    while time.monotonic() < end:
+        for ident, frame in sys._current_frames().items():
+            if ident != me:
+                counts[";".join([names.get(ident, str(ident))] + _stack(frame))] += 1
+        time.sleep(interval)
+    return counts
+
+
+def collapsed(counts: Counter) -> str:
+    """Collapsed-stack text, heaviest stacks first."""
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage into the current profiled request (no-op outside one)."""
+    req = _request.get()
+    if req is None:
+        yield
+        return
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        req["stages_ms"][name] = round(req["stages_ms"].get(name, 0.0) + (time.perf_counter() - t) * 1000, 2)
+
+
+def note_request(**shape) -> None:
+    """Record request-shape fields (sizes, modes; not content) for the slow-request log."""
+    req = _request.get()
+    if req is not None:
+        req["shape"].update(shape)
+
+
+class SlowRequestLog:
+    """Ring buffer of requests slower than a threshold."""
+
+    def __init__(self, threshold_ms: float = SLOW_REQUEST_MS, size: int = SLOW_REQUEST_BUFFER):
+        self.threshold_ms = threshold_ms
+        self.entries: deque = deque(maxlen=size)
+        self.seen = 0
+
+    def record(self, req: dict) -> None:
+        self.seen += 1
+        if req["total_ms"] >= self.threshold_ms:
+            self.entries.append(req)
+
+    def snapshot(self) -> dict:
+        return {"threshold_ms": self.threshold_ms, "seen": self.seen, "slow": list(self.entries)[::-1]}
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware: times /verify and /execute and feeds the slow-request log."""
+
+    def __init__(self, app, log: SlowRequestLog):
+        self.app = app
+        self.log = log
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in PROFILED_PATHS:
+            return await self.app(scope, receive, send)
+        req = {"method": scope["method"], "path": scope["path"], "status": None, "shape": {}, "stages_ms": {},
+               "started_at": time.time()}
+        token = _request.set(req)
+        t = time.perf_counter()
+
+        async def send_status(message):
+            if message["type"] == "http.response.start":
+                req["status"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            _request.reset(token)
+            req["total_ms"] = round((time.perf_counter() - t) * 1000, 2)
+            self.log.record(req)
+
+
+class LoopLagMonitor:
+    """Heartbeat task on the loop plus a watchdog thread that names what blocks the loop."""
+
+    def __init__(self, threshold_ms: float = LOOP_LAG_MS, interval: float = 0.02, size: int = SLOW_REQUEST_BUFFER):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.events: deque = deque(maxlen=size)
+        self.max_lag_ms = 0.0
+        self.samples = 0
+        self._beat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _heartbeat(self) -> None:
+        while True:
+            t = time.monotonic()
+            self._beat = t
+            await asyncio.sleep(self.interval)
+            lag = time.monotonic() - t - self.interval
+            self.samples += 1
+            self.max_lag_ms = max(self.max_lag_ms, lag * 1000)
+
+    def _watch(self) -> None:
+        """While the heartbeat is overdue, sample the loop thread; one event per stall."""
+        stall: Optional[dict] = None
+        while not self._stop.wait(self.interval):
+            overdue = time.monotonic() - self._beat - self.interval
+            if overdue >= self.threshold:
+                frame = sys._current_frames().get(self._loop_thread)
+                if stall is None:
+                    stall = {"at": time.time(), "stacks": Counter()}
+                stall["stacks"][(";".join(_stack(frame)), _own_frame(frame))] += 1
+                stall["blocked_ms"] = round(overdue * 1000, 1)
+            elif stall is not None:
+                self._close(stall)
+                stall = None
+
+    def _close(self, stall: dict) -> None:
+        (stack, culprit), _ = stall["stacks"].most_common(1)[0]
+        self.events.append({"at": stall["at"], "blocked_ms": stall["blocked_ms"], "culprit": culprit, "stack": stack})
+
+    def snapshot(self) -> dict:
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "samples": self.samples,
+            "max_lag_ms": round(self.max_lag_ms, 2),
+            "blocking_events": list(self.events)[::-1],
+        }
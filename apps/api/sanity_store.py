@@ -4,23 +4,42 @@ Stores: topic, session, claim, source; supports GROQ for compare, top sources, c
 Uses Sanity HTTP API (documents create/patch) when SANITY_PROJECT_ID and SANITY_TOKEN are set.
 """
 import os
+import json
 import hashlib
+import threading
+import time
 import uuid
+from collections import OrderedDict
 from typing import Optional
 
-import httpx
+from models import Citation, Claim, to_payload
 
 SANITY_PROJECT_ID = os.environ.get("SANITY_PROJECT_ID", "")
 SANITY_DATASET = os.environ.get("SANITY_DATASET", "production")
 SANITY_TOKEN = os.environ.get("SANITY_TOKEN", "")  # write token for mutations
 SANITY_API_VERSION = "v2024-01-01"
+SANITY_API_BASE = os.environ.get("SANITY_API_BASE", "")  # override host, e.g. a local fake for benchmarks
 BASE = f"https://{SANITY_PROJECT_ID}.api.sanity.io/{SANITY_API_VERSION}"
+# Last-written content hashes of shared documents (topics, sources), per process
+SANITY_HASH_CACHE_SIZE = int(os.environ.get("SANITY_HASH_CACHE_SIZE", "50000"))
+# Re-assert cached documents after this long, in case they were edited or deleted in the studio
+SANITY_HASH_TTL = float(os.environ.get("SANITY_HASH_TTL", "3600"))
+SHARED_DOC_TYPES = ("topic", "source")
 
 
 def _url_hash(url: str) -> str:
     return hashlib.sha256(url.encode()).hexdigest()[:16]
 
 
+def _field_hashes(doc: dict) -> dict:
+    """Content hash per field of a document body (system fields excluded)."""
+    return {
+        k: hashlib.sha256(json.dumps(v, sort_keys=True).encode()).hexdigest()[:16]
+        for k, v in doc.items()
+        if not k.startswith("_")
+    }
+
+
 class SanityStore:
     def __init__(
         self,
@@ -32,7 +51,11 @@ class SanityStore:
         self.dataset = dataset or SANITY_DATASET
         self.token = token or SANITY_TOKEN
         self.enabled = bool(self.project_id and self.token)
-        self.base = f"https://{self.project_id}.api.sanity.io/{SANITY_API_VERSION}"
+        api_base = SANITY_API_BASE.rstrip("/") or f"https://{self.project_id}.api.sanity.io"
+        self.base = f"{api_base}/{SANITY_API_VERSION}"
+        self._written: "OrderedDict[str, tuple[dict, float]]" = OrderedDict()
+        self._written_lock = threading.Lock()
+        self.stats = {"verifications": 0, "planned": 0, "sent": 0, "skipped": 0, "created": 0, "patched": 0}
 
     def _headers(self) -> dict:
         return {
@@ -40,12 +63,15 @@ class SanityStore:
             "Authorization": f"Bearer {self.token}",
         }
 
-    def _mutate(self, payload: dict) -> dict:
+    def _mutate(self, payload: dict, params: Optional[dict] = None) -> dict:
         if not self.enabled:
             return {}
+        import httpx  # deferred: pods without Sanity never load the HTTP stack
+
         with httpx.Client(timeout=10.0) as client:
             r = client.post(
                 f"{self.base}/data/mutate/{self.dataset}",
+                params=params,
                 headers=self._headers(),
                 json=payload,
             )
@@ -55,6 +81,8 @@ class SanityStore:
     def _query(self, query: str, params: Optional[dict] = None) -> list:
         if not self.enabled:
             return []
+        import httpx
+
         with httpx.Client(timeout=10.0) as client:
             r = client.get(
                 f"{self.base}/data/query/{self.dataset}",
@@ -65,8 +93,103 @@ class SanityStore:
             data = r.json()
             return data.get("result", [])
 
-    def upsert_verification_result(self, result: dict) -> None:
-        """Persist verification result as topic, session, claims, sources."""
+    def mutate_batch(self, mutations: list[dict]) -> dict:
+        """Apply many mutations in one transaction (bulk jobs: no returned documents, async visibility)."""
+        if not mutations:
+            return {}
+        return self._mutate({"mutations": mutations}, {"returnIds": "false", "visibility": "async"})
+
+    def iter_documents(self, doc_type: str, projection: str = "{...}", page_size: int = 1000, after: str = ""):
+        """Stream all documents of a type, paging by _id so memory stays bounded.
+        after: resume after this _id (exclusive)."""
+        last_id = after
+        while True:
+            q = f'*[_type == $type && _id > $last] | order(_id) [0...{int(page_size)}] {projection}'
+            page = self._query(q, {"$type": json.dumps(doc_type), "$last": json.dumps(last_id)})
+            if not isinstance(page, list) or not page:
+                return
+            yield from page
+            if len(page) < page_size:
+                return
+            last_id = page[-1]["_id"]
+
+    def upsert_verification_result(self, result: dict) -> dict:
+        """Persist verification result as topic, session, claims, sources, in one transaction.
+        Shared documents already written with the same content are skipped. Returns the
+        mutation counts for this result."""
+        planned = self.build_mutations(result)
+        mutations, written = self.diff_mutations(planned)
+        if self.enabled:
+            self._mutate({"mutations": mutations})
+            self._remember(written)
+        counts = {
+            "planned": len(planned),
+            "sent": len(mutations),
+            "skipped": sum(1 for m in planned if self._shared_id(m)) - len(written),
+            "created": sum(1 for m in mutations if "createIfNotExists" in m),
+            "patched": sum(1 for m in mutations if "patch" in m),
+        }
+        with self._written_lock:
+            self.stats["verifications"] += 1
+            for k, v in counts.items():
+                self.stats[k] += v
+        return counts
+
+    @staticmethod
+    def _shared_id(mutation: dict) -> Optional[str]:
+        doc = mutation.get("createOrReplace")
+        return doc["_id"] if doc and doc.get("_type") in SHARED_DOC_TYPES else None
+
+    def diff_mutations(self, mutations: list[dict]) -> tuple[list[dict], dict]:
+        """Rewrite createOrReplace of shared documents (topics, sources) against the
+        last-written hashes: unchanged -> dropped; changed fields -> patch; not seen
+        recently -> createIfNotExists plus a set patch (the document may predate the cache).
+        Returns the mutations to send and the hashes to remember once they succeed."""
+        out, written = [], {}
+        now = time.monotonic()
+        for m in mutations:
+            doc_id = self._shared_id(m)
+            if doc_id is None:
+                out.append(m)
+                continue
+            doc = m["createOrReplace"]
+            hashes = _field_hashes(doc)
+            with self._written_lock:
+                cached = self._written.get(doc_id)
+            if cached is not None and cached[1] > now:
+                prev = cached[0]
+                changed = [k for k in hashes if prev.get(k) != hashes[k]]
+                removed = [k for k in prev if k not in hashes]
+                if not changed and not removed:
+                    continue
+                patch = {"id": doc_id}
+                to_set = {k: doc[k] for k in changed if doc[k] is not None}
+                to_unset = [k for k in changed if doc[k] is None] + removed
+                if to_set:
+                    patch["set"] = to_set
+                if to_unset:
+                    patch["unset"] = to_unset
+                out.append({"patch": patch})
+            else:
+                body = {k: v for k, v in doc.items() if not k.startswith("_")}
+                out.append({"createIfNotExists": doc})
+                out.append({"patch": {"id": doc_id, "set": body}})
+            written[doc_id] = hashes
+        return out, written
+
+    def _remember(self, written: dict) -> None:
+        expires = time.monotonic() + SANITY_HASH_TTL
+        with self._written_lock:
+            for doc_id, hashes in written.items():
+                self._written[doc_id] = (hashes, expires)
+                self._written.move_to_end(doc_id)
+            while len(self._written) > SANITY_HASH_CACHE_SIZE:
+                self._written.popitem(last=False)
+
+    @staticmethod
+    def build_mutations(result: dict) -> list[dict]:
+        """Mutations for a verification result: topic, sources, claims, then session."""
+        result = to_payload(result)
         session_id = result.get("session_id") or str(uuid.uuid4())
         topic_slug = (result.get("topic") or "general").replace(" ", "-").lower()[:50]
         transactions = []
@@ -137,26 +260,28 @@ class SanityStore:
                 "answer": result.get("answer", ""),
                 "reliabilityScore": result.get("reliability_score", 0),
                 "canExecute": result.get("can_execute", False),
+                **({"mode": result["mode"]} if result.get("mode") else {}),
                 "claims": claim_refs,
                 "createdAt": result.get("created_at") or "",
             }
         })
 
-        for tx in transactions:
-            self._mutate({"mutations": [tx]})
+        return transactions
 
     def get_session(self, session_id: str) -> Optional[dict]:
         """Fetch session by ID and hydrate for API response."""
-        q = f'*[_id == "{session_id}"][0]{{ _id, question, answer, reliabilityScore, canExecute, topic->, claims[]->{{ _id, text, stance, sources[]->{{ _id, url, title, snippet, sourceName }} }} }}'
+        q = f'*[_id == "{session_id}"][0]{{ _id, question, answer, reliabilityScore, canExecute, createdAt, topic->, claims[]->{{ _id, text, stance, sources[]->{{ _id, url, title, snippet, sourceName }} }} }}'
         result = self._query(q)
         if result is None:
             return None
         first = result[0] if isinstance(result, list) and len(result) > 0 else (result if isinstance(result, dict) else None)
         if not first:
             return None
-        if not first:
-            return None
-        # Map to our response shape
+        return self._hydrate_session(first)
+
+    @staticmethod
+    def _hydrate_session(first: dict) -> dict:
+        """Map a session document (claims and sources dereferenced) to our response shape."""
         claims = []
         citations_map = {}
         for c in first.get("claims") or []:
@@ -165,32 +290,51 @@ class SanityStore:
             for s in srcs:
                 ref_id = s.get("_id")
                 if ref_id and ref_id not in citations_map:
-                    citations_map[ref_id] = {
-                        "title": s.get("title") or "",
-                        "url": s.get("url") or "",
-                        "snippet": s.get("snippet") or "",
-                        "source_name": s.get("sourceName"),
-                    }
+                    citations_map[ref_id] = Citation(
+                        title=s.get("title") or "",
+                        url=s.get("url") or "",
+                        snippet=s.get("snippet") or "",
+                        source_name=s.get("sourceName"),
+                    )
                 if ref_id:
                     citation_ids.append(ref_id)
-            claims.append({
-                "id": c.get("_id"),
-                "text": c.get("text"),
-                "stance": c.get("stance"),
-                "citation_ids": citation_ids,
-            })
+            claims.append(Claim(
+                id=c.get("_id") or "",
+                text=c.get("text") or "",
+                stance=c.get("stance") or "neutral",
+                citation_ids=citation_ids,
+            ))
         return {
             "session_id": first.get("_id"),
             "question": first.get("question"),
             "answer": first.get("answer"),
             "reliability_score": first.get("reliabilityScore"),
-            "can_execute": first.get("can_execute"),
+            "can_execute": first.get("canExecute"),
             "claims": claims,
             "citations": list(citations_map.values()),
             "topic": first.get("topic", {}).get("title") if isinstance(first.get("topic"), dict) else None,
             "created_at": first.get("createdAt"),
         }
 
+    def iter_topic_sessions(self, topic: str, since: str = "", page_size: int = 200):
+        """Sessions for a topic with claims and citations, oldest first, one page (list) at a time.
+        Keyset-paged on (createdAt, _id); since keeps sessions created at or after it."""
+        slug = topic.replace(" ", "-").lower()[:50]
+        q = f'''*[_type == "session" && topic->slug == $slug
+            && (coalesce(createdAt, "") > $after || (coalesce(createdAt, "") == $after && _id > $last))]
+            | order(createdAt asc, _id asc) [0...{int(page_size)}]
+            {{ _id, question, answer, reliabilityScore, canExecute, createdAt, topic->,
+               claims[]->{{ _id, text, stance, sources[]->{{ _id, url, title, snippet, sourceName }} }} }}'''
+        after, last = since, ""
+        while True:
+            page = self._query(q, {"$slug": json.dumps(slug), "$after": json.dumps(after), "$last": json.dumps(last)})
+            if not isinstance(page, list) or not page:
+                return
+            yield [self._hydrate_session(doc) for doc in page]
+            if len(page) < page_size:
+                return
+            after, last = page[-1].get("createdAt") or "", page[-1]["_id"]
+
     def compare_sessions_by_topic(self, topic: str) -> list[dict]:
         """GROQ: sessions for same topic, for compare view."""
         slug = topic.replace(" ", "-").lower()[:50]
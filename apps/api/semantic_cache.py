@@ -0,0 +1,147 @@
+"""
+Semantic cache of verified results, keyed on question embeddings.
+Questions asked in other words ("how does asyncio work" / "explain python asyncio") map to
+nearby vectors; when a fresh cached result for the same topic is similar enough, its claims
+and citations are reused under a new session instead of running search and extraction.
+Per topic, vectors sit in a ring (numpy matrix) that starts small and doubles up to
+SEMANTIC_CACHE_MAX_PER_TOPIC, so lookups are one mat-vec. Topics are client-supplied: at most
+SEMANTIC_CACHE_MAX_TOPICS rings are kept, the least recently used one is evicted.
+Only clean results are cached: no degraded stages, no stale search results, some citations.
+Per process; disabled with SEMANTIC_CACHE_TTL=0.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+
+from embeddings import DIM, hash_embed
+
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TTL = float(os.environ.get("SEMANTIC_CACHE_TTL", "600"))
+SEMANTIC_CACHE_MAX_PER_TOPIC = int(os.environ.get("SEMANTIC_CACHE_MAX_PER_TOPIC", "2000"))
+SEMANTIC_CACHE_MAX_TOPICS = int(os.environ.get("SEMANTIC_CACHE_MAX_TOPICS", "256"))
+RING_INITIAL = 16
+
+# Similarity histogram of the best match per lookup: [0, 0.1), ..., [0.9, 1.0]
+SIMILARITY_BUCKETS = 10
+
+
+class _TopicRing:
+    __slots__ = ("vectors", "stored_at", "entries", "next")
+
+    def __init__(self, capacity: int, dim: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.stored_at = np.full(capacity, -np.inf)
+        self.entries: list[Optional[dict]] = [None] * capacity
+        self.next = 0
+
+    def slot(self, max_size: int) -> int:
+        """Index for the next entry: doubles the ring while it is full and below max_size,
+        then overwrites the oldest entry."""
+        capacity = len(self.stored_at)
+        if self.next >= capacity and capacity < max_size:
+            extra = min(2 * capacity, max_size) - capacity
+            self.vectors = np.concatenate([self.vectors, np.zeros((extra, self.vectors.shape[1]), dtype=np.float32)])
+            self.stored_at = np.concatenate([self.stored_at, np.full(extra, -np.inf)])
+            self.entries.extend([None] * extra)
+            capacity += extra
+        i = self.next % capacity
+        self.next += 1
+        return i
+
+
+class SemanticCache:
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = SEMANTIC_CACHE_TTL,
+        max_per_topic: int = SEMANTIC_CACHE_MAX_PER_TOPIC,
+        max_topics: int = SEMANTIC_CACHE_MAX_TOPICS,
+        embed: Callable[[list[str]], np.ndarray] = hash_embed,
+        dim: int = DIM,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_per_topic = max_per_topic
+        self.max_topics = max_topics
+        self.embed = embed
+        self.dim = dim
+        self._topics: "OrderedDict[str, _TopicRing]" = OrderedDict()
+        self.evicted_topics = 0
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.similarity_hist = [0] * SIMILARITY_BUCKETS
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_per_topic > 0
+
+    def _vector(self, question: str) -> np.ndarray:
+        return np.asarray(self.embed([question])[0], dtype=np.float32)
+
+    def lookup(self, question: str, topic: str, vector: Optional[np.ndarray] = None) -> Optional[tuple[dict, float]]:
+        """Freshest-enough most similar cached result for the topic: (entry, similarity).
+        vector is the question's embedding when the caller already has it."""
+        if not self.enabled:
+            return None
+        q = self._vector(question) if vector is None else np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self.lookups += 1
+            ring = self._topics.get(topic)
+            if ring is None:
+                return None
+            self._topics.move_to_end(topic)
+            sims = ring.vectors @ q
+            sims[ring.stored_at < time.monotonic() - self.ttl] = -1.0
+            best = int(np.argmax(sims))
+            sim = float(sims[best])
+            if sim < 0:
+                return None  # nothing fresh
+            self.similarity_hist[min(int(sim * SIMILARITY_BUCKETS), SIMILARITY_BUCKETS - 1)] += 1
+            if sim < self.threshold:
+                return None
+            self.hits += 1
+            return ring.entries[best], sim
+
+    def add(self, question: str, topic: str, result: dict, vector: Optional[np.ndarray] = None) -> bool:
+        """Cache a verified result if it is clean; returns whether it was stored."""
+        if not self.enabled or result.get("degraded_stages") or result.get("stale") or not result.get("citations"):
+            return False
+        v = self._vector(question) if vector is None else np.asarray(vector, dtype=np.float32)
+        entry = {
+            "session_id": result["session_id"],
+            "claims": result["claims"],
+            "citations": result["citations"],
+        }
+        with self._lock:
+            ring = self._topics.get(topic)
+            if ring is None:
+                ring = self._topics[topic] = _TopicRing(min(RING_INITIAL, self.max_per_topic), self.dim)
+                while len(self._topics) > self.max_topics:
+                    self._topics.popitem(last=False)
+                    self.evicted_topics += 1
+            self._topics.move_to_end(topic)
+            i = ring.slot(self.max_per_topic)
+            ring.vectors[i] = v
+            ring.stored_at[i] = time.monotonic()
+            ring.entries[i] = entry
+        return True
+
+    def metrics(self) -> dict:
+        labels = [f"{i / SIMILARITY_BUCKETS:.1f}-{(i + 1) / SIMILARITY_BUCKETS:.1f}" for i in range(SIMILARITY_BUCKETS)]
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "ttl_s": self.ttl,
+            "topics": len(self._topics),
+            "evicted_topics": self.evicted_topics,
+            "entries": sum(min(r.next, self.max_per_topic) for r in self._topics.values()),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "best_similarity_histogram": dict(zip(labels, self.similarity_hist)),
+        }
@@ -0,0 +1,310 @@
+"""
+Crash-safe local log of verified sessions (SESSION_WAL_DIR), so in-memory sessions survive
+a restart or deploy when Sanity is not configured.
+Each /verify appends one frame: <u32 length><u32 crc32><f64 written_at> + session id + NUL +
+zlib(session JSON). A writer thread group-commits: everything queued is written with one
+write() and made durable with one fdatasync, at most every SESSION_WAL_FSYNC_MS.
+The log is split into numbered segments (SESSION_WAL_SEGMENT_MB); once a few are closed,
+a compaction thread copies the latest frame of each unexpired session into a snapshot
+(NNNNNNNN.snap covers every segment up to NNNNNNNN) and deletes what it replaced.
+On startup the snapshot and newer segments are scanned through mmap into an index
+(session id -> frame location): frames are not decoded, a torn tail ends its segment, and
+sessions older than SESSION_TTL are dropped. Sessions are read back on demand with pread.
+"""
+import heapq
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from typing import Iterator, Optional
+
+from shared_state import SESSION_TTL
+
+SESSION_WAL_DIR = os.environ.get("SESSION_WAL_DIR", "")
+SESSION_WAL_FSYNC_MS = float(os.environ.get("SESSION_WAL_FSYNC_MS", "10"))
+SESSION_WAL_SEGMENT_MB = float(os.environ.get("SESSION_WAL_SEGMENT_MB", "64"))
+SESSION_WAL_WARM = int(os.environ.get("SESSION_WAL_WARM", "10000"))
+COMPACT_AFTER_SEGMENTS = 4
+MAX_COMMIT_RECORDS = 4096  # bounds one write(); segments roll over between commits
+_HEADER = struct.Struct("<IId")
+_MAX_FRAME = 64 * 1024 * 1024
+
+
+def _frame(session_id: str, session_bytes: bytes, written_at: float) -> bytes:
+    payload = session_id.encode() + b"\0" + zlib.compress(session_bytes, 1)
+    ts = struct.pack("<d", written_at)
+    return _HEADER.pack(len(payload), zlib.crc32(payload, zlib.crc32(ts)), written_at) + payload
+
+
+def scan_frames(buf) -> Iterator[tuple[int, int, float, str]]:
+    """(offset, frame length, written_at, session id) per intact frame; stops at a torn or
+    corrupt one. buf is bytes or an mmap."""
+    off, end = 0, len(buf)
+    while off + _HEADER.size <= end:
+        size, crc, written_at = _HEADER.unpack_from(buf, off)
+        start = off + _HEADER.size
+        if size > _MAX_FRAME or start + size > end:
+            return
+        if zlib.crc32(buf[start:start + size], zlib.crc32(buf[off + 8:start])) != crc:
+            return
+        sep = buf.find(b"\0", start, start + size)
+        if sep < 0:
+            return
+        yield off, _HEADER.size + size, written_at, bytes(buf[start:sep]).decode()
+        off = start + size
+
+
+class SessionWAL:
+    def __init__(
+        self,
+        path: str,
+        fsync_ms: float = SESSION_WAL_FSYNC_MS,
+        segment_mb: float = SESSION_WAL_SEGMENT_MB,
+        ttl: float = SESSION_TTL,
+        compact_after: int = COMPACT_AFTER_SEGMENTS,
+    ):
+        self.path = path
+        self.fsync_interval = fsync_ms / 1000
+        self.segment_bytes = int(segment_mb * 1024 * 1024)
+        self.ttl = ttl
+        self.compact_after = compact_after
+        os.makedirs(path, exist_ok=True)
+        # session id -> (file name, frame offset, frame length, written_at)
+        self._index: dict[str, tuple[str, int, int, float]] = {}
+        self._fds: dict[str, int] = {}  # read descriptors per segment/snapshot
+        self._lock = threading.Lock()
+        self._compacting = threading.Lock()
+        self._q: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self._compactor: Optional[threading.Thread] = None
+        self._segment = 0
+        self._snapshot = 0
+        self._fd = -1
+        self._size = 0
+        self.stats = {"appended": 0, "fsyncs": 0, "compactions": 0, "recovered": 0, "recovery_ms": 0.0, "torn_frames": 0}
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _open_read(self, name: str) -> None:
+        self._fds[name] = os.open(self._file(name), os.O_RDONLY)
+
+    # --- recovery ---
+
+    def open(self) -> dict:
+        """Scan the snapshot and newer segments into the index, then start writing a new
+        segment. Returns recovery stats."""
+        t = time.perf_counter()
+        names = sorted(os.listdir(self.path))
+        snaps = [n for n in names if n.endswith(".snap")]
+        self._snapshot = int(snaps[-1][:-5]) if snaps else 0
+        segments = [n for n in names if n.endswith(".wal")]
+        for name in names:  # leftovers of an interrupted compaction
+            if name.endswith(".tmp") or (name in snaps[:-1]) or (name in segments and int(name[:-4]) <= self._snapshot):
+                os.unlink(self._file(name))
+        sources = snaps[-1:] + [n for n in segments if int(n[:-4]) > self._snapshot]
+        expired_before = time.time() - self.ttl
+        for name in sources:
+            self._scan(name, expired_before)
+        self._segment = max([self._snapshot] + [int(n[:-4]) for n in sources if n.endswith(".wal")])
+        self._rotate()
+        self.stats["recovered"] = len(self._index)
+        self.stats["recovery_ms"] = round((time.perf_counter() - t) * 1000, 1)
+        self._writer = threading.Thread(target=self._run, name="session-wal", daemon=True)
+        self._writer.start()
+        return {k: self.stats[k] for k in ("recovered", "recovery_ms", "torn_frames")}
+
+    def _scan(self, name: str, expired_before: float) -> None:
+        size = os.path.getsize(self._file(name))
+        self._open_read(name)
+        if size == 0:
+            return
+        index = self._index
+        with mmap.mmap(self._fds[name], size, access=mmap.ACCESS_READ) as mm:
+            end = 0
+            for off, length, written_at, session_id in scan_frames(mm):
+                end = off + length
+                if written_at < expired_before:
+                    index.pop(session_id, None)
+                else:
+                    index[session_id] = (name, off, length, written_at)
+            if end < size:
+                self.stats["torn_frames"] += 1
+
+    # --- reads ---
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, session_id: str) -> Optional[bytes]:
+        """Session JSON bytes as last logged, or None."""
+        with self._lock:
+            loc = self._index.get(session_id)
+            if loc is None or loc[3] < time.time() - self.ttl:
+                return None
+            name, off, length, _ = loc
+            frame = os.pread(self._fds[name], length, off)
+        payload = frame[_HEADER.size:]
+        return zlib.decompress(payload[payload.index(b"\0") + 1:])
+
+    def recent(self, n: int) -> list[str]:
+        """Ids of the n most recently logged sessions, newest first."""
+        with self._lock:
+            items = heapq.nlargest(n, self._index.items(), key=lambda kv: kv[1][3])
+        return [session_id for session_id, _ in items]
+
+    # --- writes ---
+
+    def append(self, session_id: str, session_bytes: bytes) -> None:
+        """Queue a session for the next group commit (durable within about fsync_ms)."""
+        self._q.put((session_id, session_bytes, time.time()))
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until everything appended so far is durable."""
+        done = threading.Event()
+        self._q.put(done)
+        return done.wait(timeout)
+
+    def _run(self) -> None:
+        last_sync = 0.0
+        while True:
+            items = [self._q.get()]
+            wait = last_sync + self.fsync_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)  # let more records join this commit
+            while len(items) < MAX_COMMIT_RECORDS:
+                try:
+                    items.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            closing = any(item is None for item in items)
+            records = [item for item in items if isinstance(item, tuple)]
+            if records:
+                self._commit(records)
+                last_sync = time.monotonic()
+            for item in items:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if closing:
+                return
+
+    def _commit(self, records: list[tuple[str, bytes, float]]) -> None:
+        frames = [_frame(*record) for record in records]
+        name = f"{self._segment:08d}.wal"
+        os.write(self._fd, b"".join(frames))
+        os.fdatasync(self._fd)
+        self.stats["fsyncs"] += 1
+        self.stats["appended"] += len(records)
+        with self._lock:
+            off = self._size
+            for (session_id, _, written_at), frame in zip(records, frames):
+                self._index[session_id] = (name, off, len(frame), written_at)
+                off += len(frame)
+            self._size = off
+        if self._size >= self.segment_bytes:
+            self._rotate()
+            if self._segment - self._snapshot > self.compact_after and not (self._compactor and self._compactor.is_alive()):
+                self._compactor = threading.Thread(target=self.compact, args=(self._segment - 1,),
+                                                   name="session-wal-compact", daemon=True)
+                self._compactor.start()
+
+    def _rotate(self) -> None:
+        """Close the current segment and start the next one."""
+        if self._fd >= 0:
+            os.close(self._fd)
+        self._segment += 1
+        name = f"{self._segment:08d}.wal"
+        self._fd = os.open(self._file(name), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._size = 0
+        with self._lock:
+            self._open_read(name)
+        self._sync_dir()
+
+    def _sync_dir(self) -> None:
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    # --- compaction ---
+
+    def compact(self, upto: int) -> int:
+        """Rewrite the live sessions of the snapshot and segments <= upto into snapshot
+        `upto`; returns the number of sessions kept. Frames are copied, not re-encoded."""
+        with self._compacting:
+            return self._compact(upto) if upto > self._snapshot else 0
+
+    def _compact(self, upto: int) -> int:
+        merged = {f"{self._snapshot:08d}.snap"} | {f"{n:08d}.wal" for n in range(self._snapshot + 1, upto + 1)}
+        expired_before = time.time() - self.ttl
+        with self._lock:
+            live = sorted(
+                ((loc, session_id) for session_id, loc in self._index.items() if loc[0] in merged),
+                key=lambda item: (item[0][0], item[0][1]),
+            )
+            fds = {name: fd for name, fd in self._fds.items() if name in merged}
+        name = f"{upto:08d}.snap"
+        tmp = self._file(name + ".tmp")
+        moved, off = [], 0
+        with open(tmp, "wb") as f:
+            for loc, session_id in live:
+                src, src_off, length, written_at = loc
+                if written_at < expired_before:
+                    moved.append((session_id, loc, None))
+                    continue
+                f.write(os.pread(fds[src], length, src_off))
+                moved.append((session_id, loc, (name, off, length, written_at)))
+                off += length
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._file(name))
+        self._sync_dir()
+        with self._lock:
+            self._open_read(name)
+            for session_id, old, new in moved:
+                if self._index.get(session_id) == old:  # not rewritten meanwhile
+                    if new is None:
+                        del self._index[session_id]
+                    else:
+                        self._index[session_id] = new
+            for src in merged:
+                fd = self._fds.pop(src, None)
+                if fd is not None:
+                    os.close(fd)
+                if os.path.exists(self._file(src)):
+                    os.unlink(self._file(src))
+            self._snapshot = upto
+        self.stats["compactions"] += 1
+        return sum(1 for _, _, new in moved if new is not None)
+
+    def close(self) -> None:
+        """Commit what is queued, stop the writer and close all files."""
+        if self._writer is not None:
+            self._q.put(None)
+            self._writer.join()
+            self._writer = None
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds.clear()
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def metrics(self) -> dict:
+        return {
+            **self.stats,
+            "sessions": len(self._index),
+            "segment": self._segment,
+            "snapshot": self._snapshot,
+            "queued": self._q.qsize(),
+        }
@@ -0,0 +1,180 @@
+"""
+Shared state tier for API replicas: session payloads, search cache and single-flight locks.
+Backends are selected by SHARED_STATE_URL:
+  memory://                 per-process dict (default; single replica or tests)
+  sqlite:////data/state.db  SQLite file on a volume shared by all replicas
+SQLite runs in rollback-journal mode (journal_mode=DELETE): WAL mode needs shared memory
+between all processes using the file, which pods on different nodes do not have. Locking
+relies on the volume's POSIX file locks, so the shared volume must support them.
+SQLite calls can wait up to the busy timeout; async code goes through run_state().
+Expired entries are removed by purge_expired(), which the API runs every SHARED_STATE_PURGE_S.
+HashRing turns the replica list into consistent-hash routing hints for session affinity.
+"""
+import asyncio
+import bisect
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+
+SHARED_STATE_URL = os.environ.get("SHARED_STATE_URL", "memory://")
+SESSION_TTL = float(os.environ.get("SESSION_TTL", str(24 * 3600)))
+API_REPLICAS = [r for r in os.environ.get("API_REPLICAS", "").split(",") if r]
+SHARED_STATE_PURGE_S = float(os.environ.get("SHARED_STATE_PURGE_S", "300"))
+
+
+class MemoryState:
+    """In-process backend: same interface as SQLiteState, nothing shared across processes."""
+
+    blocking = False
+
+    def __init__(self):
+        self._data: dict[str, tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._get(key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        """get() with self._lock already held."""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and expires <= time.time():
+            self._data.pop(key, None)
+            return None
+        return value
+
+    def acquire(self, key: str, ttl: float) -> Optional[str]:
+        """Take a lock for ttl seconds; returns a release token, or None if held elsewhere."""
+        with self._lock:
+            if self._get(f"lock:{key}") is not None:
+                return None
+            token = uuid.uuid4().hex
+            self._data[f"lock:{key}"] = (token.encode(), time.time() + ttl)
+            return token
+
+    def release(self, key: str, token: str) -> None:
+        with self._lock:
+            if self._get(f"lock:{key}") == token.encode():
+                self._data.pop(f"lock:{key}", None)
+
+    def purge_expired(self) -> int:
+        """Drop expired entries that were never read again; returns how many."""
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (_, expires) in list(self._data.items()) if expires is not None and expires <= now]
+            for k in expired:
+                self._data.pop(k, None)
+        return len(expired)
+
+
+class SQLiteState:
+    """SQLite backend; every replica opening the same file sees the same state."""
+
+    blocking = True  # may wait on other replicas' locks (busy timeout)
+
+    def __init__(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            # Not WAL: its shared-memory index only works for processes on one host
+            self._conn.execute("PRAGMA journal_mode=DELETE")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)"
+            )
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires IS NULL OR expires > ?)", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl if ttl else None),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def acquire(self, key: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM kv WHERE key = ? AND expires <= ?", (f"lock:{key}", now))
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+                    (f"lock:{key}", token.encode(), now + ttl),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return token if cur.rowcount == 1 else None
+
+    def release(self, key: str, token: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM kv WHERE key = ? AND value = ?", (f"lock:{key}", token.encode()))
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM kv WHERE expires <= ?", (time.time(),)).rowcount
+
+
+async def run_state(state, method: str, *args):
+    """Call a backend method from async code: blocking backends run in a worker thread."""
+    fn = getattr(state, method)
+    if state.blocking:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+
+def open_state(url: str = SHARED_STATE_URL):
+    """Backend for a SHARED_STATE_URL."""
+    if url.startswith("sqlite:///"):
+        return SQLiteState(url[len("sqlite:///"):])
+    if url in ("", "memory://"):
+        return MemoryState()
+    raise ValueError(f"Unsupported SHARED_STATE_URL: {url}")
+
+
+class HashRing:
+    """Consistent-hash ring over replica names (with virtual nodes) for routing hints."""
+
+    def __init__(self, nodes: list[str], vnodes: int = 64):
+        self._ring = sorted(
+            (self._hash(f"{node}#{i}"), node) for node in nodes for i in range(vnodes)
+        )
+        self._keys = [h for h, _ in self._ring]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+    def node_for(self, key: str) -> Optional[str]:
+        if not self._ring:
+            return None
+        i = bisect.bisect(self._keys, self._hash(key)) % len(self._ring)
+        return self._ring[i][1]
@@ -0,0 +1,219 @@
+"""
+Content-addressed, compressed text store shared by all cached sessions.
+The same citation titles and snippets recur across sessions (popular sources, repeated
+topics) and claim texts are sentences cut from them; each distinct text is stored once,
+keyed by its blake2b digest, and sessions hold the (canonical, shared) key instead.
+Texts longer than SNIPPET_MIN_COMPRESS bytes are zlib-compressed; once
+SNIPPET_DICT_TRAIN_AFTER texts have been seen, a preset dictionary is trained from the
+phrases that recur across them (zlib zdict, the stdlib stand-in for a zstd dictionary), so
+even short snippets compress. Keys resolve lazily, through a small LRU of decoded texts.
+
+PackedSessions is the in-process session cache on top of it: a mapping of session id to
+session dict that stores sessions packed (scalars plus key tuples for the answer, claims and
+citations) and rebuilds the dict with Claim/Citation models on access. The encoded /session
+body is kept only for the SESSION_BYTES_CACHE most recently used sessions.
+"""
+import hashlib
+import os
+import sys
+import threading
+import zlib
+from collections import Counter, OrderedDict
+from collections.abc import MutableMapping
+from typing import Iterator, Optional
+
+from models import Citation, Claim
+
+SNIPPET_MIN_COMPRESS = int(os.environ.get("SNIPPET_MIN_COMPRESS", "48"))
+SNIPPET_DICT_TRAIN_AFTER = int(os.environ.get("SNIPPET_DICT_TRAIN_AFTER", "500"))
+SESSION_BYTES_CACHE = int(os.environ.get("SESSION_BYTES_CACHE", "256"))
+ZDICT_SIZE = 32 * 1024  # zlib's window: dictionary bytes beyond this are never referenced
+DECODED_CACHE_SIZE = 2048
+_RAW, _ZLIB = 0, 1  # codec byte; 2 + n: zlib with trained dictionary n
+
+
+def train_zdict(samples: list[str], size: int = ZDICT_SIZE, ngram: int = 4) -> bytes:
+    """Preset dictionary from word n-grams that recur across samples, most frequent last
+    (zlib encodes nearer matches in fewer bits)."""
+    counts: Counter = Counter()
+    for text in samples:
+        words = text.split()
+        counts.update({" ".join(words[i:i + ngram]) for i in range(max(len(words) - ngram + 1, 0))})
+    picked, total = [], 0
+    for phrase, n in counts.most_common():
+        if n < 2 or total >= size:
+            break
+        picked.append(phrase)
+        total += len(phrase) + 1
+    return " ".join(reversed(picked)).encode()[-size:]
+
+
+class SnippetStore:
+    def __init__(self, min_compress: int = SNIPPET_MIN_COMPRESS, train_after: int = SNIPPET_DICT_TRAIN_AFTER):
+        self.min_compress = min_compress
+        self.train_after = train_after
+        self._blobs: dict[bytes, bytes] = {}
+        self._keys: dict[bytes, bytes] = {}  # canonical key objects, shared by every reference
+        self._dicts: list[bytes] = []
+        self._samples: list[str] = []
+        self._decoded: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.raw_bytes = 0
+
+    def put(self, text: str) -> bytes:
+        """Store text (once per distinct content); returns its key."""
+        data = text.encode()
+        key = hashlib.blake2b(data, digest_size=12).digest()
+        with self._lock:
+            canonical = self._keys.get(key)
+            if canonical is not None:
+                return canonical
+            if len(data) < self.min_compress:
+                blob = bytes((_RAW,)) + data
+            else:
+                blob = self._compress(data)
+                if self.train_after and not self._dicts:
+                    self._samples.append(text)
+                    if len(self._samples) >= self.train_after:
+                        self.train(self._samples)
+                        self._samples = []
+            self._keys[key] = key
+            self._blobs[key] = blob
+            self.raw_bytes += len(data)
+            return key
+
+    def get(self, key: bytes) -> str:
+        with self._lock:
+            text = self._decoded.get(key)
+            if text is not None:
+                self._decoded.move_to_end(key)
+                return text
+            blob = self._blobs[key]
+            codec = blob[0]
+            if codec == _RAW:
+                text = blob[1:].decode()
+            elif codec == _ZLIB:
+                text = zlib.decompress(blob[1:]).decode()
+            else:
+                d = zlib.decompressobj(zdict=self._dicts[codec - 2])
+                text = (d.decompress(blob[1:]) + d.flush()).decode()
+            self._decoded[key] = text
+            if len(self._decoded) > DECODED_CACHE_SIZE:
+                self._decoded.popitem(last=False)
+            return text
+
+    def _compress(self, data: bytes) -> bytes:
+        if self._dicts:
+            c = zlib.compressobj(9, zdict=self._dicts[-1])
+            blob = bytes((1 + len(self._dicts),)) + c.compress(data) + c.flush()
+        else:
+            blob = bytes((_ZLIB,)) + zlib.compress(data, 9)
+        return blob if len(blob) <= len(data) else bytes((_RAW,)) + data
+
+    def train(self, samples: list[str]) -> None:
+        """Add a dictionary trained on samples; later texts are compressed with it (earlier
+        blobs keep decoding with the codec they were written with)."""
+        zdict = train_zdict(samples)
+        if zdict and len(self._dicts) < 254:
+            self._dicts.append(zdict)
+
+    def stats(self) -> dict:
+        stored = sum(len(b) for b in self._blobs.values())
+        return {
+            "texts": len(self._blobs),
+            "raw_bytes": self.raw_bytes,
+            "stored_bytes": stored,
+            "dictionaries": len(self._dicts),
+            "compression_ratio": round(self.raw_bytes / stored, 2) if stored else 0.0,
+        }
+
+
+def _citation(c) -> Citation:
+    return c if isinstance(c, Citation) else Citation.from_dict(c)
+
+
+def _claim(c) -> Claim:
+    return c if isinstance(c, Claim) else Claim.from_dict(c)
+
+
+class PackedSessions(MutableMapping):
+    """session_id -> session dict, stored packed against a SnippetStore."""
+
+    def __init__(self, store: Optional[SnippetStore] = None, bytes_cache: int = SESSION_BYTES_CACHE):
+        self.store = store or SnippetStore()
+        self.bytes_cache = bytes_cache
+        self._packed: dict[str, tuple] = {}
+        self._encoded: OrderedDict = OrderedDict()
+
+    def _pack(self, session: dict) -> tuple:
+        put = self.store.put
+        scalars = {k: v for k, v in session.items() if k not in ("answer", "claims", "citations")}
+        claims = tuple(
+            (c.id, put(c.text), sys.intern(c.stance), tuple(c.citation_ids), c.confidence)
+            for c in map(_claim, session.get("claims") or [])
+        )
+        citations = tuple(
+            (put(c.title), sys.intern(c.url), put(c.snippet), c.published_at, c.source_name)
+            for c in map(_citation, session.get("citations") or [])
+        )
+        answer = session.get("answer")
+        return scalars, put(answer) if answer is not None else None, claims, citations
+
+    def _unpack(self, packed: tuple) -> dict:
+        scalars, answer, claims, citations = packed
+        get = self.store.get
+        session = dict(scalars)
+        if answer is not None:
+            session["answer"] = get(answer)
+        session["claims"] = [Claim(i, get(t), s, list(ids), conf) for i, t, s, ids, conf in claims]
+        session["citations"] = [Citation(get(t), u, get(s), p, n) for t, u, s, p, n in citations]
+        return session
+
+    def __getitem__(self, session_id: str) -> dict:
+        return self._unpack(self._packed[session_id])
+
+    def __setitem__(self, session_id: str, session: dict) -> None:
+        self._packed[session_id] = self._pack(session)
+        self._encoded.pop(session_id, None)
+
+    def __delitem__(self, session_id: str) -> None:
+        del self._packed[session_id]
+        self._encoded.pop(session_id, None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._packed))
+
+    def __len__(self) -> int:
+        return len(self._packed)
+
+    def __contains__(self, session_id) -> bool:
+        return session_id in self._packed
+
+    def clear(self) -> None:
+        self._packed.clear()
+        self._encoded.clear()
+
+    def stats(self) -> dict:
+        """Session count, cached /session bodies and the text store's figures."""
+        return {"sessions": len(self._packed), "encoded_bodies": len(self._encoded), **self.store.stats()}
+
+    def field(self, session_id: str, name: str, default=None):
+        """One scalar field without rebuilding the session (e.g. topic, created_at)."""
+        packed = self._packed.get(session_id)
+        return packed[0].get(name, default) if packed else default
+
+    def encoded(self, session_id: str) -> Optional[bytes]:
+        """Cached /session body, when the session was encoded recently."""
+        raw = self._encoded.get(session_id)
+        if raw is not None:
+            self._encoded.move_to_end(session_id)
+        return raw
+
+    def set_encoded(self, session_id: str, raw: bytes) -> None:
+        """Remember the encoded body of the session currently stored under session_id."""
+        if session_id not in self._packed or self.bytes_cache <= 0:
+            return
+        self._encoded[session_id] = raw
+        self._encoded.move_to_end(session_id)
+        while len(self._encoded) > self.bytes_cache:
+            self._encoded.popitem(last=False)
@@ -0,0 +1,95 @@
+"""Unit tests for admission control: classing, limits, read priority, shedding, middleware."""
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from admission import AdmissionController, AdmissionMiddleware, classify
+from main import app
+
+
+def test_classify():
+    assert classify("GET", "/health") == "probe"
+    assert classify("GET", "/ready") == "probe"
+    assert classify("GET", "/metrics/admission") == "probe"
+    assert classify("POST", "/verify") == "verify"
+    assert classify("GET", "/topic/x/export") == "verify"
+    assert classify("GET", "/session/abc") == "read"
+    assert classify("GET", "/topic/x/digest") == "read"
+
+
+async def test_limit_queues_then_admits_in_order():
+    ctl = AdmissionController(verify_limit=1, read_limit=1, queue_size=8, verify_queue_ms=1000)
+    assert await ctl.acquire("verify")
+    waiter = asyncio.create_task(ctl.acquire("verify"))
+    await asyncio.sleep(0.01)
+    assert ctl.metrics()["verify"]["queued"] == 1
+    ctl.release("verify", 0.05)
+    assert await waiter
+    assert ctl.metrics()["verify"]["inflight"] == 1
+    assert ctl.metrics()["verify"]["admitted"] == 2
+
+
+async def test_queue_time_slo_sheds():
+    ctl = AdmissionController(verify_limit=1, read_limit=1, queue_size=8, verify_queue_ms=20)
+    assert await ctl.acquire("verify")
+    assert not await ctl.acquire("verify")
+    m = ctl.metrics()
+    assert m["verify"]["shed"] == 1 and m["verify"]["queued"] == 0 and m["queue_depth"] == 0
+
+
+async def test_read_displaces_queued_verify_when_full():
+    ctl = AdmissionController(verify_limit=1, read_limit=1, queue_size=2, verify_queue_ms=1000, read_queue_ms=1000)
+    assert await ctl.acquire("verify") and await ctl.acquire("read")
+    verifies = [asyncio.create_task(ctl.acquire("verify")) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    read = asyncio.create_task(ctl.acquire("read"))
+    await asyncio.sleep(0.01)
+    assert verifies[1].done() and verifies[1].result() is False  # newest verify shed
+    ctl.release("read", 0.01)
+    assert await read
+    ctl.release("verify", 0.01)
+    assert await verifies[0]
+
+
+async def test_cancelled_waiter_returns_reserved_slot():
+    ctl = AdmissionController(verify_limit=1, read_limit=1, queue_size=8, verify_queue_ms=1000)
+    assert await ctl.acquire("verify")
+    waiter = asyncio.create_task(ctl.acquire("verify"))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+    ctl.release("verify", 0.01)  # slot reserved for the waiter before it sees the cancel
+    await asyncio.gather(waiter, return_exceptions=True)
+    assert ctl.metrics()["verify"]["inflight"] == 0 and ctl.metrics()["queue_depth"] == 0
+
+
+def test_middleware_sheds_with_retry_after_and_lets_probes_through():
+    ctl = AdmissionController(verify_limit=1, read_limit=1, queue_size=0)
+    ctl.classes["read"].inflight = 1  # a read already holds the only slot
+    mini = FastAPI()
+    mini.add_middleware(AdmissionMiddleware, controller=ctl)
+
+    @mini.get("/session/{sid}")
+    async def session(sid: str):
+        return {"sid": sid}
+
+    @mini.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    with TestClient(mini) as client:
+        r = client.get("/session/a")
+        assert r.status_code == 503
+        assert int(r.headers["retry-after"]) >= 1
+        assert client.get("/health").status_code == 200
+        ctl.classes["read"].inflight = 0
+        assert client.get("/session/a").status_code == 200
+    assert ctl.metrics()["read"]["shed"] == 1
+
+
+def test_admission_metrics_endpoint():
+    with TestClient(app) as client:
+        client.get("/session/missing")
+        data = client.get("/metrics/admission").json()
+        assert data["read"]["admitted"] >= 1
+        assert data["verify"]["limit"] >= 0
@@ -0,0 +1,134 @@
+"""Unit tests for the columnar analytics snapshot (build, mmap reads, reload, endpoints)."""
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from analytics_snapshot import AnalyticsSnapshot, SnapshotReader, build_snapshot, rebuild_if_due
+from main import app
+
+
+class FakeStore:
+    """Answers iter_documents from in-memory docs, like the paged GROQ export."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.pages = 0
+
+    def iter_documents(self, doc_type, projection="{...}", page_size=1000):
+        rows = sorted((d for d in self.docs if d["_type"] == doc_type), key=lambda d: d["_id"])
+        for i in range(0, len(rows), page_size):
+            self.pages += 1
+            yield from rows[i:i + page_size]
+
+
+def _docs():
+    return [
+        {"_type": "topic", "_id": "topic-python", "slug": "python", "title": "Python"},
+        {"_type": "topic", "_id": "topic-rust", "slug": "rust", "title": "Rust"},
+        {"_type": "session", "_id": "s1", "topic": "topic-python", "question": "Q1", "answer": "A1",
+         "reliabilityScore": 0.7, "createdAt": "2024-01-01T00:00:00Z", "claims_count": 2},
+        {"_type": "session", "_id": "s2", "topic": "topic-python", "question": "Q2", "answer": "A2",
+         "reliabilityScore": 0.9, "createdAt": "2024-02-01T00:00:00Z", "claims_count": 1},
+        {"_type": "session", "_id": "s3", "topic": "topic-rust", "question": "Q3", "answer": "A3",
+         "reliabilityScore": 0.5, "createdAt": "2024-03-01T00:00:00Z", "claims_count": 1},
+        {"_type": "source", "_id": "source-a", "url": "https://a.com", "title": "A"},
+        {"_type": "source", "_id": "source-b", "url": "https://b.com", "title": "B"},
+        {"_type": "claim", "_id": "claim-s1-0", "session": "s1", "topic": "topic-python", "text": "yes",
+         "stance": "support", "sources": ["source-a", "source-b"]},
+        {"_type": "claim", "_id": "claim-s1-1", "session": "s1", "topic": "topic-python", "text": "no",
+         "stance": "oppose", "sources": ["source-a"]},
+        {"_type": "claim", "_id": "claim-s2-0", "session": "s2", "topic": "topic-python", "text": "meh",
+         "stance": "neutral", "sources": ["source-a", "source-a"]},
+        {"_type": "claim", "_id": "claim-s3-0", "session": "s3", "topic": "topic-rust", "text": "r",
+         "stance": "neutral", "sources": ["source-b", "source-missing"]},
+    ]
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = build_snapshot(FakeStore(_docs()), str(tmp_path), page_size=2)
+    return AnalyticsSnapshot(path)
+
+
+def test_top_sources_counts_claims_once_per_source(snapshot):
+    top = snapshot.top_sources(limit=10)
+    assert top == [
+        {"url": "https://a.com", "title": "A", "citation_count": 3},
+        {"url": "https://b.com", "title": "B", "citation_count": 2},
+    ]
+    assert snapshot.top_sources(limit=1)[0]["url"] == "https://a.com"
+    assert snapshot.top_sources(limit=0) == []
+
+
+def test_compare_sessions_by_topic_newest_first(snapshot):
+    sessions = snapshot.compare_sessions_by_topic("Python")
+    assert [s["session_id"] for s in sessions] == ["s2", "s1"]
+    assert sessions[1] == {
+        "session_id": "s1",
+        "question": "Q1",
+        "answer": "A1",
+        "reliability_score": 0.7,
+        "created_at": "2024-01-01T00:00:00Z",
+        "claims_count": 2,
+    }
+    assert snapshot.compare_sessions_by_topic("unknown") == []
+
+
+def test_contradictions_pairs_support_and_oppose(snapshot):
+    pairs = snapshot.get_contradictions()
+    assert pairs == [{
+        "topic": "python",
+        "support_claim": "yes",
+        "oppose_claim": "no",
+        "support_id": "claim-s1-0",
+        "oppose_id": "claim-s1-1",
+    }]
+    assert snapshot.get_contradictions("rust") == []
+    assert snapshot.get_contradictions("unknown") == []
+
+
+def test_snapshot_arrays_are_memory_mapped(snapshot):
+    import numpy as np
+    assert isinstance(snapshot.sessions, np.memmap)
+    assert isinstance(snapshot.sources, np.memmap)
+
+
+def test_empty_store_builds_empty_snapshot(tmp_path):
+    snap = AnalyticsSnapshot(build_snapshot(FakeStore([]), str(tmp_path)))
+    assert snap.top_sources() == []
+    assert snap.compare_sessions_by_topic("python") == []
+    assert snap.get_contradictions() == []
+
+
+def test_reader_follows_current_and_prunes_old(tmp_path):
+    reader = SnapshotReader(str(tmp_path))
+    assert reader.current() is None
+    store = FakeStore(_docs())
+    build_snapshot(store, str(tmp_path))
+    first = reader.current()
+    assert first is reader.current()
+    build_snapshot(store, str(tmp_path))
+    build_snapshot(store, str(tmp_path))
+    assert reader.current() is not first
+    assert len([d for d in os.listdir(tmp_path) if d.startswith("snap-")]) == 2
+
+
+def test_rebuild_if_due_respects_interval(tmp_path):
+    store = FakeStore(_docs())
+    assert rebuild_if_due(store, str(tmp_path), interval=3600) is True
+    assert rebuild_if_due(store, str(tmp_path), interval=3600) is False
+    assert rebuild_if_due(store, str(tmp_path), interval=0) is True
+
+
+def test_endpoints_answer_from_snapshot(tmp_path):
+    build_snapshot(FakeStore(_docs()), str(tmp_path))
+    with TestClient(app) as client:
+        app.state.analytics = SnapshotReader(str(tmp_path))
+        try:
+            top = client.get("/sources/top?limit=1").json()
+            compare = client.get("/topic/python/compare").json()
+        finally:
+            app.state.analytics = None
+    assert top == {"sources": [{"url": "https://a.com", "title": "A", "citation_count": 3}]}
+    assert [s["session_id"] for s in compare["sessions"]] == ["s2", "s1"]
@@ -0,0 +1,147 @@
+"""Unit tests for the backfill / re-scoring CLI: scoring, batching, checkpoints and resume."""
+import json
+
+import pytest
+
+import claim_extraction
+from backfill import rescore_session, run_backfill
+
+
+def _session(i: int, n_sources: int = 3, score: float = 0.1, can_execute: bool = True) -> dict:
+    return {
+        "_id": f"s{i:05d}",
+        "question": f"Q{i}",
+        "answer": "A",
+        "reliabilityScore": score,
+        "canExecute": can_execute,
+        "topic": "General",
+        "createdAt": "2024-01-01T00:00:00Z",
+        "claims": [
+            {"_id": f"claim-s{i:05d}-{j}", "text": "t", "stance": "neutral",
+             "sources": [{"url": f"https://site{j}.com", "title": f"T{j}", "snippet": f"S{j}"}]}
+            for j in range(n_sources)
+        ],
+    }
+
+
+class FakeStore:
+    def __init__(self, docs, fail_after=None):
+        self.docs = sorted(docs, key=lambda d: d["_id"])
+        self.batches = []
+        self.fail_after = fail_after
+
+    def iter_documents(self, doc_type, projection="{...}", page_size=1000, after=""):
+        assert doc_type == "session"
+        for d in self.docs:
+            if d["_id"] > after:
+                yield d
+
+    def mutate_batch(self, mutations):
+        if self.fail_after is not None and len(self.batches) >= self.fail_after:
+            raise RuntimeError("upstream down")
+        self.batches.append(list(mutations))
+
+
+def test_rescore_session_patches_stale_score():
+    muts = rescore_session(_session(1, score=0.1))
+    assert len(muts) == 1
+    patch = muts[0]["patch"]
+    assert patch["id"] == "s00001"
+    assert 0 < patch["set"]["reliabilityScore"] <= 0.95
+    # Already current: nothing to write
+    current = {**_session(1, score=patch["set"]["reliabilityScore"], can_execute=patch["set"]["canExecute"]),
+               "mode": patch["set"]["mode"]}
+    assert rescore_session(current) == []
+
+
+def test_rescore_session_revokes_execute_below_threshold():
+    patch = rescore_session(_session(1, n_sources=0, score=0.9))[0]["patch"]
+    assert patch["set"]["canExecute"] is False
+
+
+def test_rescore_session_grants_execute_again_for_execute_sessions():
+    revoked = rescore_session(_session(1, n_sources=0, score=0.9))[0]["patch"]["set"]
+    assert revoked["mode"] == "execute"  # inferred for legacy docs, then stored
+    doc = {**_session(1, n_sources=5, score=0.1, can_execute=False), "mode": revoked["mode"]}
+    assert rescore_session(doc)[0]["patch"]["set"]["canExecute"] is True
+    answer = {**_session(2, n_sources=5, score=0.1, can_execute=False), "mode": "answer"}
+    assert rescore_session(answer)[0]["patch"]["set"]["canExecute"] is False
+
+
+def test_rescore_session_rebuild_rewrites_claims_and_deletes_stale():
+    doc = _session(1, n_sources=2)
+    doc["claims"].append({"_id": "claim-s00001-old", "text": "x", "sources": []})
+    muts = rescore_session(doc, rebuild=True)
+    kinds = [next(iter(m)) for m in muts]
+    assert "createOrReplace" in kinds
+    assert {"delete": {"id": "claim-s00001-old"}} in muts
+    session = [m["createOrReplace"] for m in muts if "createOrReplace" in m and m["createOrReplace"]["_type"] == "session"]
+    assert session[0]["_id"] == "s00001"
+    assert not any(m.get("createOrReplace", {}).get("_type") == "topic" for m in muts)
+
+
+def test_run_backfill_batches_writes(tmp_path):
+    store = FakeStore([_session(i) for i in range(25)])
+    out = run_backfill(store, str(tmp_path / "ckpt"), workers=0, chunk_size=4, batch_size=10, log=None)
+    assert out["done"] is True
+    assert out["sessions"] == 25
+    assert out["mutations"] == 25
+    assert sum(len(b) for b in store.batches) == 25
+    assert [len(b) for b in store.batches] == [10, 10, 5]  # not bound to chunk edges
+
+
+def test_run_backfill_resumes_from_checkpoint(tmp_path):
+    ckpt = str(tmp_path / "ckpt")
+    docs = [_session(i) for i in range(30)]
+    store = FakeStore(docs, fail_after=1)
+    with pytest.raises(RuntimeError):
+        run_backfill(store, ckpt, workers=0, chunk_size=5, batch_size=10, log=None)
+    with open(ckpt) as f:
+        saved = json.load(f)
+    assert saved["last_id"] == "s00009" and saved["done"] is False  # checkpointed at the first flush
+    written = [m["patch"]["id"] for b in store.batches for m in b]
+
+    resumed = FakeStore(docs)
+    out = run_backfill(resumed, ckpt, workers=0, chunk_size=5, batch_size=10, log=None)
+    written += [m["patch"]["id"] for b in resumed.batches for m in b]
+    assert written == [d["_id"] for d in docs]
+    assert out["sessions"] == 30
+    # A finished checkpoint is a no-op
+    assert run_backfill(FakeStore(docs), ckpt, workers=0, log=None)["done"] is True
+
+
+def test_rebuild_flushes_whole_sessions_within_batch_size(tmp_path):
+    store = FakeStore([_session(i, n_sources=2) for i in range(6)])
+    per_session = len(rescore_session(_session(0, n_sources=2), rebuild=True))
+    run_backfill(store, str(tmp_path / "ckpt"), rebuild=True, workers=0, chunk_size=6,
+                 batch_size=2 * per_session + 1, log=None)
+    assert [len(b) for b in store.batches] == [2 * per_session] * 3
+    assert all(len({m["createOrReplace"]["_id"] for m in b if m.get("createOrReplace", {}).get("_type") == "session"}) == 2
+               for b in store.batches)
+
+
+def test_rescoring_does_not_depend_on_earlier_sessions():
+    before = claim_extraction._model.n_docs
+    doc = _session(7, n_sources=3)
+    doc["question"] = "when was the library first released"
+    for j, cl in enumerate(doc["claims"]):
+        cl["sources"][0]["snippet"] = f"The library number {j} was first released in 20{j}5. It is maintained by volunteers."
+    alone = rescore_session(doc, rebuild=True)
+    for i in range(20):
+        rescore_session({**_session(i, n_sources=4), "question": f"site{i % 3} question"}, rebuild=True)
+    assert rescore_session(doc, rebuild=True) == alone
+    assert claim_extraction._model.n_docs == before  # no statistics carried between sessions
+
+
+def test_run_backfill_dry_run_writes_nothing(tmp_path):
+    store = FakeStore([_session(i) for i in range(5)])
+    out = run_backfill(store, "", workers=0, dry_run=True, log=None)
+    assert store.batches == []
+    assert out["mutations"] == 5
+
+
+def test_run_backfill_process_pool_preserves_order():
+    docs = [_session(i) for i in range(40)]
+    store = FakeStore(docs)
+    run_backfill(store, "", workers=2, chunk_size=3, batch_size=7, log=None)
+    assert [m["patch"]["id"] for b in store.batches for m in b] == [d["_id"] for d in docs]
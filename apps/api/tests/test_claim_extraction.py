@@ -0,0 +1,138 @@
+"""Unit tests for query-aware claim extraction: segmenter, truncation, BM25 ranking, top-k per source."""
+import numpy as np
+
+from claim_extraction import (
+    MAX_SENTENCE_CHARS,
+    BM25Model,
+    _buckets,
+    extract_claim_sentences,
+    is_factual,
+    split_sentences,
+    truncate_sentences,
+)
+from embeddings import tokenize
+from models import Citation, Claim
+from verification import _build_claims_from_citations, _compute_reliability
+
+
+def test_split_sentences_keeps_abbreviations_initials_and_decimals():
+    text = 'Use e.g. Asyncio to start. Python 3.11 is faster! J. Smith wrote it. "Quoted." Next one\nline two'
+    assert split_sentences(text) == [
+        "Use e.g. Asyncio to start.",
+        "Python 3.11 is faster!",
+        "J. Smith wrote it.",
+        '"Quoted."',
+        "Next one",
+        "line two",
+    ]
+
+
+def test_split_sentences_bullets_and_empty():
+    assert split_sentences("First point • Second point") == ["First point", "Second point"]
+    assert split_sentences("") == []
+    assert split_sentences(None) == []
+
+
+def test_truncate_sentences_never_cuts_mid_sentence():
+    text = "Short one. " + "This second sentence is long enough to push past the limit entirely. " * 3
+    assert truncate_sentences(text, 60) == "Short one."
+    long_sentence = "word " * 60
+    cut = truncate_sentences(long_sentence, 50)
+    assert len(cut) <= 50 and not cut.endswith(" ") and cut.endswith("word")
+
+
+def test_is_factual_filters_questions_fragments_and_boilerplate():
+    def check(s):
+        return is_factual(s, tokenize(s))
+
+    assert check("The event loop runs coroutines on a single thread.")
+    assert not check("How does the event loop work?")
+    assert not check("Read more.")
+    assert not check("Click here to subscribe to our asyncio newsletter today.")
+    assert not check("»» ## $$ ~~ ** 1 2 3 4 5 §§ @@ %% ^^ && ++")
+
+
+def test_bm25_prefers_matching_and_rare_terms():
+    model = BM25Model()
+    docs = [_buckets(tokenize(t)) for t in (
+        "the event loop schedules coroutines",
+        "python is a programming language",
+        "python python python language",
+    )]
+    model.observe(docs)
+    scores = model.score(_buckets(tokenize("event loop")), docs)
+    assert scores[0] > 0 and scores[1] == 0 and scores[2] == 0
+    assert model.n_docs == 3
+    # Each term is counted once per document
+    assert model.df[_buckets(["python"])[0]] == 2
+
+
+def test_bm25_empty_inputs():
+    model = BM25Model()
+    assert model.score([], [[1, 2]]).tolist() == [0.0]
+    assert model.score([1], []).shape == (0,)
+    model.observe([])
+    assert model.n_docs == 0
+
+
+def test_model_is_reused_across_requests():
+    model = BM25Model()
+    extract_claim_sentences("asyncio", ["Asyncio runs coroutines concurrently."], model=model)
+    extract_claim_sentences("asyncio", ["Asyncio runs tasks on an event loop."], model=model)
+    assert model.n_docs == 2
+    extract_claim_sentences("tasks", ["Asyncio runs tasks on an event loop."] * 2, model=model)
+    assert model.n_docs == 2  # a source repeated across or within requests is counted once
+
+
+def test_fallback_fragment_is_truncated():
+    blob = "x1 " * 3333  # 10k chars, no sentence boundary, not factual
+    [[(text, _)]] = extract_claim_sentences("x1", [blob], model=BM25Model())
+    assert 0 < len(text) <= MAX_SENTENCE_CHARS and blob.startswith(text)
+
+
+def test_extract_top_k_factual_sentences_per_source():
+    snippets = [
+        "Cookies help us deliver our services. The asyncio event loop schedules coroutines and callbacks. "
+        "Our team loves Python. Tasks wrap coroutines so the event loop can run them concurrently.",
+        "Read more",
+    ]
+    picks = extract_claim_sentences("How does the asyncio event loop schedule coroutines?", snippets, k=2, model=BM25Model())
+    texts = [t for t, _ in picks[0]]
+    assert texts == [
+        "The asyncio event loop schedules coroutines and callbacks.",
+        "Tasks wrap coroutines so the event loop can run them concurrently.",
+    ]
+    assert picks[0][0][1] >= picks[0][1][1]
+    # No factual sentence: the best fragment is still kept so the source is not lost
+    assert [t for t, _ in picks[1]] == ["Read more"]
+
+
+def test_build_claims_with_question_covers_sources_before_second_sentences():
+    raw = [
+        Citation(url="https://a.com", title="A", snippet="Asyncio uses an event loop for scheduling. Asyncio tasks wrap coroutines for the loop."),
+        Citation(url="https://b.com", title="B", snippet="The event loop polls sockets with a selector in asyncio."),
+    ]
+    claims, citations = _build_claims_from_citations(raw, "asyncio event loop")
+    assert [c.citation_ids for c in claims] == [[0], [1], [0]]
+    assert [c.id for c in claims] == ["cl-0", "cl-1", "cl-2"]
+    assert citations[0] is raw[0]
+
+
+def test_build_claims_with_question_caps_claims_on_many_citations():
+    raw = [Citation(url=f"https://s{i}.com", title=f"T{i}", snippet=f"Source {i} says the event loop runs task number {i}. It also polls sockets.") for i in range(120)]
+    claims, citations = _build_claims_from_citations(raw, "event loop task")
+    assert len(citations) == 120
+    assert len(claims) == 10
+    assert len({c.citation_ids[0] for c in claims}) == 10
+
+
+def test_reliability_counts_distinct_evidence_not_sentences():
+    one_source = [Citation(url="https://a.com", snippet="x")]
+    split = [Claim(f"cl-{i}", "t", "neutral", [0], 0.85) for i in range(3)]
+    single = split[:1]
+    assert _compute_reliability(split, one_source) == _compute_reliability(single, one_source)
+
+
+def test_scores_are_finite():
+    picks = extract_claim_sentences("?", ["Just some words in a sentence here."], model=BM25Model())
+    assert np.isfinite(picks[0][0][1])
@@ -0,0 +1,170 @@
+"""Unit tests for the claim ANN index: persistence, IVF search, pipeline reuse."""
+import numpy as np
+import pytest
+from claim_index import ClaimIndex
+from embeddings import hash_embed, tokenize
+from models import Citation
+from verification import run_verification_pipeline
+
+
+def _result(session_id, topic, texts):
+    return {
+        "session_id": session_id,
+        "topic": topic,
+        "claims": [{"id": f"cl-{i}", "text": t, "citation_ids": [i]} for i, t in enumerate(texts)],
+        "citations": [{"url": f"https://{session_id}.com/{i}", "title": f"T{i}", "snippet": t} for i, t in enumerate(texts)],
+    }
+
+
+def test_hash_embed_is_unit_and_stable():
+    a = hash_embed(["python asyncio event loop"])
+    b = hash_embed(["python asyncio event loop"])
+    assert a.shape == (1, 256)
+    assert np.allclose(a, b)
+    assert abs(float(np.linalg.norm(a[0])) - 1.0) < 1e-5
+    assert tokenize("How does the Event loop work?") == ["event", "loop", "work"]
+
+
+def test_empty_index_returns_no_hits(tmp_path):
+    idx = ClaimIndex(str(tmp_path))
+    assert len(idx) == 0
+    assert idx.search("anything") == []
+
+
+def test_add_result_and_search_finds_closest(tmp_path):
+    idx = ClaimIndex(str(tmp_path))
+    idx.add_result(_result("s1", "python", [
+        "asyncio runs coroutines on an event loop",
+        "httpx supports async requests",
+    ]))
+    hits = idx.search("asyncio event loop coroutines", k=1)
+    assert len(hits) == 1
+    assert hits[0]["session_id"] == "s1"
+    assert hits[0]["url"] == "https://s1.com/0"
+    assert hits[0]["score"] > 0.5
+
+
+def test_index_persists_across_reopen(tmp_path):
+    ClaimIndex(str(tmp_path)).add_result(_result("s1", "general", ["fastapi supports async endpoints"]))
+    reopened = ClaimIndex(str(tmp_path))
+    assert len(reopened) == 1
+    assert reopened.search("fastapi async endpoints")[0]["text"] == "fastapi supports async endpoints"
+
+
+def test_topic_filter(tmp_path):
+    idx = ClaimIndex(str(tmp_path))
+    idx.add_result(_result("a", "python", ["event loop schedules callbacks"]))
+    idx.add_result(_result("b", "rust", ["event loop schedules callbacks"]))
+    hits = idx.search("event loop callbacks", topic="rust")
+    assert [h["session_id"] for h in hits] == ["b"]
+
+
+def test_ivf_training_keeps_recall_and_incremental_adds(tmp_path):
+    idx = ClaimIndex(str(tmp_path), train_min=200, nprobe=4)
+    texts = [f"claim number {i} about topic{i % 37} and item{i}" for i in range(300)]
+    idx.add(texts[:250], [{"session_id": str(i)} for i in range(250)])
+    idx.add(texts[250:], [{"session_id": str(i)} for i in range(250, 300)])  # may land mid-training
+    idx.wait_trained()
+    assert idx._centroids is not None and sum(len(ids) for ids in idx._lists) == 300
+    assert idx.search(texts[123], k=1)[0]["session_id"] == "123"
+    idx.add(["brand new claim about zebras"], [{"session_id": "new"}])
+    assert idx.search("zebras brand new claim", k=1)[0]["session_id"] == "new"
+    reopened = ClaimIndex(str(tmp_path), train_min=200, nprobe=4)
+    assert reopened.search(texts[42], k=1)[0]["session_id"] == "42"
+
+
+def test_related_citations_dedupes_and_thresholds(tmp_path):
+    idx = ClaimIndex(str(tmp_path))
+    idx.add(["asyncio event loop", "asyncio event loop again"], [
+        {"url": "https://same.com", "topic": "general"},
+        {"url": "https://same.com", "topic": "general"},
+    ])
+    out = idx.related_citations("asyncio event loop", topic="general")
+    assert len(out) == 1
+    assert out[0].url == "https://same.com"
+    assert idx.related_citations("completely unrelated words", topic="general") == []
+
+
+@pytest.mark.asyncio
+async def test_pipeline_skips_search_when_prior_coverage_high(tmp_path):
+    idx = ClaimIndex(str(tmp_path))
+    idx.add_result(_result("old", "general", [f"asyncio event loop fact {i}" for i in range(5)]))
+
+    class FailingYou:
+        async def search(self, q):
+            raise AssertionError("upstream search should be skipped")
+
+    result = await run_verification_pipeline(
+        question="asyncio event loop fact",
+        mode="answer",
+        topic=None,
+        you_client=FailingYou(),
+        sanity_store=type("S", (), {"enabled": False})(),
+        claim_index=idx,
+        prior_coverage=3,
+    )
+    assert result["reused_claims"] >= 3
+    assert all(c.url.startswith("https://old.com") for c in result["citations"])
+
+
+@pytest.mark.asyncio
+async def test_pipeline_merges_prior_with_search_when_coverage_low(tmp_path):
+    idx = ClaimIndex(str(tmp_path))
+    idx.add_result(_result("old", "general", ["asyncio event loop fact"]))
+
+    class OneYou:
+        async def search(self, q):
+            return [Citation(url="https://fresh.com", title="F", snippet="fresh")]
+
+    result = await run_verification_pipeline(
+        question="asyncio event loop fact",
+        mode="answer",
+        topic=None,
+        you_client=OneYou(),
+        sanity_store=type("S", (), {"enabled": False})(),
+        claim_index=idx,
+    )
+    assert result["reused_claims"] == 1
+    assert [c.url for c in result["citations"]] == ["https://old.com/0", "https://fresh.com"]
+
+
+async def test_reused_claims_are_not_indexed_again(tmp_path):
+    class CoveredYou:
+        async def search(self, q):
+            raise AssertionError("covered by prior claims")
+
+    idx = ClaimIndex(str(tmp_path))
+    idx.add_result(_result("old", "general", ["asyncio event loop fact", "asyncio event loop fact"]))
+    assert len(idx) == 2  # same text, different urls
+    result = await run_verification_pipeline("asyncio event loop fact", "answer", None, CoveredYou(), None,
+                                             claim_index=idx, prior_coverage=1)
+    idx.add_result(result)
+    idx.add_result(result)
+    assert len(ClaimIndex(str(tmp_path))) == 2
+
+
+def test_open_cuts_rows_a_crash_left_half_written(tmp_path):
+    idx = ClaimIndex(str(tmp_path))
+    idx.add_result(_result("s1", "general", ["fastapi supports async endpoints", "httpx supports http2"]))
+    with open(tmp_path / "meta.jsonl", "ab") as f:
+        f.write(b'{"url": "https://torn.com", "te')  # crash after meta, before vectors and offsets
+    with open(tmp_path / "vectors.f32", "ab") as f:
+        f.write(b"\0" * 100)
+    (tmp_path / "keys.u64").write_bytes(b"")  # or before the keys
+    reopened = ClaimIndex(str(tmp_path))
+    assert len(reopened) == 2
+    assert (tmp_path / "vectors.f32").stat().st_size == 2 * 256 * 4
+    reopened.add_result(_result("s2", "general", ["uvicorn serves asgi apps"]))
+    reopened.add_result(_result("s1", "general", ["fastapi supports async endpoints"]))  # key rebuilt: skipped
+    hits = ClaimIndex(str(tmp_path)).search("uvicorn serves asgi apps", k=1)
+    assert len(ClaimIndex(str(tmp_path))) == 3 and hits[0]["url"] == "https://s2.com/0"
+
+
+def test_index_refuses_another_embedding_dimension(tmp_path):
+    ClaimIndex(str(tmp_path)).add_result(_result("s1", "general", ["fastapi supports async endpoints"]))
+    with pytest.raises(ValueError, match="256-dim"):
+        ClaimIndex(str(tmp_path), dim=384)
+    (tmp_path / "manifest.json").unlink()  # index written before the manifest: dim inferred
+    with pytest.raises(ValueError):
+        ClaimIndex(str(tmp_path), dim=384)
+    assert len(ClaimIndex(str(tmp_path))) == 1
@@ -0,0 +1,124 @@
+"""Unit tests for the per-request time budget: header parsing, stage degradation, /verify."""
+import asyncio
+import math
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from deadline import Deadline, parse_deadline_header
+from main import app
+from models import Citation
+from verification import run_verification_pipeline
+
+
+@pytest.fixture(autouse=True)
+def clear_sessions():
+    yield
+    main._sessions.clear()
+
+
+class SlowClient:
+    def __init__(self, delay: float, n: int = 3):
+        self.delay = delay
+        self.n = n
+
+    async def search(self, query: str):
+        await asyncio.sleep(self.delay)
+        return [
+            Citation(url=f"https://s{i}.com", title=f"S{i}", snippet=f"Source {i} explains how {query} works in practice.")
+            for i in range(self.n)
+        ]
+
+
+class FakeIndex:
+    def __init__(self):
+        self.added = []
+
+    def related_citations(self, question, topic="general", vector=None):
+        return []
+
+    def add_result(self, payload):
+        self.added.append(payload["session_id"])
+
+
+def test_parse_deadline_header_forms():
+    assert parse_deadline_header("250") == 250
+    assert 4000 < parse_deadline_header(str(time.time() + 5)) <= 5000
+    assert 4000 < parse_deadline_header(str((time.time() + 5) * 1000)) <= 5000
+    assert parse_deadline_header(str(time.time() - 5)) == 0
+    assert parse_deadline_header("soon") is None
+    assert parse_deadline_header("-1") is None
+    assert parse_deadline_header("nan") is None
+
+
+def test_deadline_for_request_precedence_and_cap():
+    assert Deadline.for_request("100", 5000, default_ms=20000).remaining() <= 0.1
+    assert 4.5 < Deadline.for_request(None, 5000, default_ms=20000).remaining() <= 5
+    assert Deadline.for_request("junk", None, default_ms=300).remaining() <= 0.3
+    assert Deadline.for_request("60000", None, default_ms=1000).remaining() <= 1
+    assert math.isinf(Deadline().remaining())
+
+
+def test_deadline_timeout_and_degrade():
+    d = Deadline(1.0)
+    assert d.timeout(15.0, reserve=0.5) <= 0.5
+    assert d.timeout(0.1) == 0.1
+    assert Deadline(0).timeout(15.0) == 0
+    d.degrade("search")
+    d.degrade("search")
+    assert d.degraded == ["search"]
+
+
+async def test_pipeline_unbounded_reports_no_degradation():
+    result = await run_verification_pipeline("q", "answer", None, SlowClient(0), None)
+    assert result["degraded_stages"] == []
+    assert len(result["citations"]) == 3
+
+
+async def test_pipeline_search_timeout_degrades_search():
+    t = time.perf_counter()
+    result = await run_verification_pipeline("q", "answer", None, SlowClient(5), None, deadline=Deadline(0.3))
+    assert time.perf_counter() - t < 1
+    assert "search" in result["degraded_stages"]
+    assert result["citations"] == []
+    assert not result["can_execute"]
+
+
+async def test_pipeline_exhausted_budget_degrades_extraction():
+    result = await run_verification_pipeline(
+        "q", "answer", None, SlowClient(0), None, claim_index=FakeIndex(), deadline=Deadline(0)
+    )
+    assert result["degraded_stages"] == ["claim_reuse", "search", "extraction"]
+
+
+def test_verify_defers_persistence_when_budget_is_short(monkeypatch):
+    index = FakeIndex()
+    with TestClient(app) as client:
+        app.state.claim_index = index
+        monkeypatch.setattr(main, "_persist_cost", [60.0])
+        r = client.post("/verify", json={"question": "Python asyncio", "mode": "answer"},
+                        headers={"X-Request-Deadline": "2000"})
+        assert r.status_code == 200
+        data = r.json()
+        assert data["degraded_stages"] == ["persistence"]
+        assert data["claims"]
+    # Deferred writes finish by shutdown
+    assert index.added == [data["session_id"]]
+
+
+def test_verify_persists_inline_within_budget(monkeypatch):
+    index = FakeIndex()
+    with TestClient(app) as client:
+        app.state.claim_index = index
+        monkeypatch.setattr(main, "_persist_cost", [0.0])
+        r = client.post("/verify", json={"question": "Python asyncio", "mode": "answer", "budget_ms": 5000})
+        assert r.json()["degraded_stages"] == []
+        assert index.added == [r.json()["session_id"]]
+
+
+def test_verify_rejects_invalid_budget():
+    with TestClient(app) as client:
+        r = client.post("/verify", json={"question": "Q", "budget_ms": 0})
+        assert r.status_code == 422
@@ -0,0 +1,126 @@
+"""Unit tests for the cross-request embedding batcher against a local fake embedding worker."""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from embeddings import DIM, EmbeddingBatcher, EmbeddingUnavailable, hash_embed
+from models import Citation
+from semantic_cache import SemanticCache
+from verification import run_verification_pipeline
+
+WORKER_DIM = 8
+
+
+class Worker(BaseHTTPRequestHandler):
+    batches: list[list[str]] = []
+    mode = "ok"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        texts = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["texts"]
+        Worker.batches.append(texts)
+        if Worker.mode == "error":
+            self.send_response(503)
+            self.end_headers()
+            return
+        vectors = hash_embed(texts, WORKER_DIM) if Worker.mode == "ok" else np.zeros((len(texts), WORKER_DIM))
+        data = json.dumps({"embeddings": vectors.tolist(), "dim": WORKER_DIM, "gpu_used": False}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def worker():
+    Worker.batches, Worker.mode = [], "ok"
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Worker)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+async def test_concurrent_requests_share_one_worker_batch(worker):
+    batcher = EmbeddingBatcher(worker, dim=WORKER_DIM, wait_ms=20)
+    questions = [f"question number {i}" for i in range(10)]
+    vectors = await asyncio.gather(*(batcher.embed([q]) for q in questions), batcher.embed(questions[:2]))
+    assert len(Worker.batches) == 1 and sorted(Worker.batches[0]) == sorted(questions)  # deduped
+    assert np.allclose(vectors[3][0], hash_embed([questions[3]], WORKER_DIM)[0])
+    assert vectors[-1].shape == (2, WORKER_DIM)
+    again = await batcher.embed(questions[:3])
+    assert len(Worker.batches) == 1 and np.allclose(again, np.concatenate(vectors[:3]))
+    assert batcher.metrics()["cache_hits"] == 3 and batcher.metrics()["avg_batch"] == 10
+    await batcher.aclose()
+
+
+async def test_max_batch_splits_and_blocking_callers_join(worker):
+    batcher = EmbeddingBatcher(worker, dim=WORKER_DIM, max_batch=4, wait_ms=5)
+    out = await batcher.embed([f"claim {i}" for i in range(6)])
+    threaded = await asyncio.to_thread(batcher.embed_blocking, ["from a thread", "claim 1"])
+    assert sorted(len(b) for b in Worker.batches[:2]) == [2, 4] and len(Worker.batches[2]) == 1  # cached claim not resent
+    assert out.shape == (6, WORKER_DIM) and np.allclose(threaded[1], out[1])
+    with pytest.raises(RuntimeError):
+        batcher.embed_blocking(["on the loop"])
+    await batcher.aclose()
+
+
+@pytest.mark.parametrize("mode", ["error", "zeros"])
+async def test_worker_failure_is_not_masked_with_another_model(worker, mode):
+    Worker.mode = mode
+    batcher = EmbeddingBatcher(worker, dim=WORKER_DIM, wait_ms=1)
+    with pytest.raises(EmbeddingUnavailable):
+        await batcher.embed(["a question"])
+    assert batcher.metrics()["errors"] == 1 and batcher.metrics()["cached"] == 0
+    await batcher.aclose()
+
+
+async def test_blocking_callers_get_unavailable_when_the_worker_hangs(worker):
+    batcher = EmbeddingBatcher(worker, dim=WORKER_DIM, wait_ms=1, timeout=0.1)
+    hung = asyncio.Event()
+
+    async def hang(texts):
+        await hung.wait()  # never set: no answer, not even a timeout
+
+    batcher._model = hang
+    with pytest.raises(EmbeddingUnavailable):
+        await asyncio.to_thread(batcher.embed_blocking, ["a claim"])
+    assert batcher.metrics()["errors"] == 1
+    await batcher.aclose()
+
+
+def test_local_model_matches_hash_embed_and_caches():
+    batcher = EmbeddingBatcher("")
+    out = batcher.embed_blocking(["alpha beta", "gamma"])
+    assert batcher.dim == DIM and np.allclose(out, hash_embed(["alpha beta", "gamma"]))
+    batcher.embed_blocking(["gamma"])
+    assert batcher.metrics()["cache_hits"] == 1
+
+
+class OneSource:
+    async def search(self, query):
+        return [Citation(url="https://docs.python.org/3/library/asyncio.html", title="asyncio",
+                         snippet="asyncio is a library to write concurrent code using async and await.")]
+
+
+async def test_pipeline_embeds_question_once_for_the_semantic_cache(worker):
+    batcher = EmbeddingBatcher(worker, dim=WORKER_DIM, wait_ms=1)
+    cache = SemanticCache(embed=batcher.embed_blocking, dim=WORKER_DIM)
+    first = await run_verification_pipeline("what is asyncio", "answer", None, OneSource(), None,
+                                            semantic_cache=cache, embedder=batcher)
+    second = await run_verification_pipeline("what is asyncio", "answer", None, OneSource(), None,
+                                             semantic_cache=cache, embedder=batcher)
+    assert second["cached_from"] == first["session_id"] and len(Worker.batches) == 1
+    Worker.mode = "error"
+    degraded = await run_verification_pipeline("what is a coroutine", "answer", None, OneSource(), None,
+                                               semantic_cache=cache, embedder=batcher)
+    assert degraded["degraded_stages"] == ["embedding"] and degraded["citations"]
+    await batcher.aclose()
@@ -0,0 +1,190 @@
+"""Unit tests for source-page enrichment against a local HTTP fixture server."""
+import ipaddress
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from deadline import Deadline
+from enrichment import MainTextParser, PageEnricher, is_public_address, select_passage
+from models import Citation
+from verification import run_verification_pipeline
+
+ARTICLE = """<html><head><title>asyncio</title><style>p { color: red }</style>
+<script>var tracking = "The event loop is tracked here for analytics purposes only.";</script></head>
+<body><nav><a href="/">Home</a> <a href="/docs">Documentation index and navigation links</a></nav>
+<main><h1>Event loop</h1>
+<p>The event loop runs asynchronous tasks and callbacks, performs network IO operations, and runs subprocesses.</p>
+<p>Coroutines declared with async def are scheduled on the event loop with asyncio.create_task.</p>
+<div>Use asyncio.gather to run several awaitables concurrently and collect their results in order.</div>
+</main><footer>Copyright 2024 Python Software Foundation. All rights reserved worldwide.</footer></body></html>"""
+
+
+class Pages(BaseHTTPRequestHandler):
+    validators: list[tuple[str, str]] = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match"):
+            Pages.validators.append((self.path, self.headers["If-None-Match"]))
+        if self.path.startswith("/slow"):
+            time.sleep(0.5)
+        if self.path.startswith("/to-"):
+            self.send_response(302)
+            self.send_header("Location", "http://169.254.169.254/latest/meta-data" if self.path == "/to-metadata" else "/page")
+            self.end_headers()
+            return
+        if self.path == "/umlauts":
+            data = ("ü" * 2000).encode()  # 4000 bytes, 2000 chars
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        if self.path == "/missing":
+            self.send_response(404)
+            self.end_headers()
+            return
+        if self.path == "/cached" and self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        data = ARTICLE.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if self.path == "/cached":
+            self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def loopback_ok(ip):
+    return ip.is_loopback or is_public_address(ip)  # the fixture server runs on 127.0.0.1
+
+
+@pytest.fixture
+def site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Pages)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_parser_keeps_main_text_and_skips_chrome():
+    parser = MainTextParser()
+    for i in range(0, len(ARTICLE), 64):  # streamed in small chunks
+        parser.feed(ARTICLE[i:i + 64])
+    blocks = parser.text_blocks()
+    assert blocks[0].startswith("The event loop runs asynchronous tasks")
+    assert len(blocks) == 3
+    assert not any("tracking" in b or "Documentation" in b or "Copyright" in b for b in blocks)
+
+
+def test_select_passage_prefers_relevant_blocks_in_page_order():
+    blocks = ["a" * 50 + " unrelated filler", "asyncio gather runs awaitables concurrently", "more asyncio gather text here"]
+    assert select_passage("how does asyncio gather work", blocks, limit=80).split("\n") == blocks[1:]
+
+
+async def test_enrich_fetches_pages_and_revalidates_with_etag(site, tmp_path):
+    enricher = PageEnricher(cache_dir=str(tmp_path), timeout=2.0, address_allowed=loopback_ok)
+    cites = [Citation(url=f"{site}/cached"), Citation(url=f"{site}/missing"), Citation(url="ftp://x/y")]
+    passages, cut = await enricher.enrich("what does the event loop do", cites, 2.0)
+    assert set(passages) == {f"{site}/cached"} and not cut
+    assert "event loop runs asynchronous tasks" in passages[f"{site}/cached"]
+    again, _ = await enricher.enrich("what does the event loop do", cites, 2.0)
+    assert again == passages
+    assert enricher.stats["not_modified"] == 1 and enricher.stats["fetched"] == 1
+    await enricher.aclose()
+
+
+async def test_enrich_respects_budget(site):
+    enricher = PageEnricher(timeout=2.0, address_allowed=loopback_ok)
+    t = time.perf_counter()
+    passages, cut = await enricher.enrich("event loop", [Citation(url=f"{site}/slow"), Citation(url=f"{site}/fast")], 0.2)
+    assert time.perf_counter() - t < 0.45
+    assert set(passages) == {f"{site}/fast"} and cut
+    assert enricher.stats["timed_out"] == 1
+    await enricher.aclose()
+
+
+async def test_per_host_limit_serialises_fetches(site):
+    enricher = PageEnricher(timeout=2.0, per_host=1, address_allowed=loopback_ok)
+    t = time.perf_counter()
+    await enricher.enrich("event loop", [Citation(url=f"{site}/slow"), Citation(url=f"{site}/slow?2")], 2.0)
+    assert time.perf_counter() - t >= 1.0
+    assert enricher._hosts == {}
+    await enricher.aclose()
+
+
+async def test_internal_addresses_are_refused_on_every_hop(site):
+    default = PageEnricher(timeout=2.0)
+    passages, _ = await default.enrich("event loop", [Citation(url=f"{site}/page")], 2.0)
+    assert passages == {} and default.stats["blocked"] == 1
+    enricher = PageEnricher(timeout=2.0, address_allowed=loopback_ok)
+    cites = [Citation(url=f"{site}/to-page"), Citation(url=f"{site}/to-metadata")]
+    passages, _ = await enricher.enrich("event loop", cites, 2.0)
+    assert set(passages) == {f"{site}/to-page"}  # redirect followed to a public (here: allowed) page
+    assert enricher.stats["blocked"] == 1 and enricher.stats["fetched"] == 1
+    assert not is_public_address(ipaddress.ip_address("::ffff:10.0.0.1"))
+    await default.aclose()
+    await enricher.aclose()
+
+
+async def test_connects_to_the_address_it_checked(site):
+    enricher = PageEnricher(timeout=2.0, address_allowed=loopback_ok)
+    answers = iter([["127.0.0.1"], ["169.254.169.254"]])  # a rebinding resolver
+
+    async def rebinding(host, port):
+        return next(answers)
+
+    enricher._getaddrinfo = rebinding
+    port = site.rsplit(":", 1)[1]
+    passages, _ = await enricher.enrich("event loop", [Citation(url=f"http://rebind.example:{port}/page")], 2.0)
+    assert list(passages) == [f"http://rebind.example:{port}/page"]  # one lookup, used for the connect
+    passages, _ = await enricher.enrich("event loop", [Citation(url=f"http://other.example:{port}/page")], 2.0)
+    assert passages == {} and enricher.stats["blocked"] == 1
+    await enricher.aclose()
+
+
+async def test_validators_are_sent_on_the_first_hop_only(site, tmp_path):
+    Pages.validators = []
+    enricher = PageEnricher(cache_dir=str(tmp_path), timeout=2.0, address_allowed=loopback_ok)
+    enricher._store(f"{site}/to-page", {"etag": '"old"', "last_modified": None, "blocks": ["stale"]})
+    passages, _ = await enricher.enrich("event loop", [Citation(url=f"{site}/to-page")], 2.0)
+    assert "event loop runs asynchronous tasks" in passages[f"{site}/to-page"]
+    assert Pages.validators == [("/to-page", '"old"')]
+    await enricher.aclose()
+
+
+async def test_body_cap_counts_bytes(site):
+    enricher = PageEnricher(timeout=2.0, max_bytes=1000, address_allowed=loopback_ok)
+    passages, _ = await enricher.enrich("umlauts", [Citation(url=f"{site}/umlauts")], 2.0)
+    assert passages[f"{site}/umlauts"] == "ü" * 500
+    await enricher.aclose()
+
+
+class OneResult:
+    def __init__(self, url):
+        self.url = url
+
+    async def search(self, query):
+        return [Citation(url=self.url, title="asyncio", snippet="The event loop is...")]
+
+
+async def test_pipeline_builds_claims_from_page_text(site):
+    enricher = PageEnricher(timeout=2.0, address_allowed=loopback_ok)
+    result = await run_verification_pipeline("How does asyncio gather run awaitables?", "answer", None,
+                                             OneResult(f"{site}/page"), None, enricher=enricher)
+    assert any("asyncio.gather" in c.text for c in result["claims"])
+    assert result["citations"][0].snippet == "The event loop is..."  # citations stay as returned
+    tight = await run_verification_pipeline("How does asyncio gather work?", "answer", None, OneResult(f"{site}/page"),
+                                            None, deadline=Deadline(0.25), enricher=enricher)
+    assert "enrichment" in tight["degraded_stages"]
+    await enricher.aclose()
@@ -1,4 +1,7 @@
-"""API endpoint tests: /verify, /execute, /session, /topic/compare, /sources, /health."""
+"""API endpoint tests: /verify, /execute, /session, /topic/compare, /topic/export, /sources, /health."""
+import json
+import zlib
+
 import pytest
 from fastapi.testclient import TestClient
 from main import app, _sessions
@@ -94,6 +97,32 @@ def test_verify_then_get_session(client: TestClient):
     assert data["question"] == "Test question"
 
 
+def test_verify_response_has_only_response_fields(client: TestClient):
+    r = client.post("/verify", json={"question": "Python asyncio", "mode": "answer"})
+    assert r.headers["content-type"] == "application/json"
+    data = r.json()
+    assert set(data) == {
+        "answer", "reliability_score", "claims", "citations",
+        "session_id", "can_execute", "next_question", "topic", "degraded_stages", "stale", "cached_from",
+    }
+    assert data["claims"][0]["id"] == "cl-0"
+    assert data["citations"][0]["url"].startswith("https://")
+
+
+def test_session_served_from_precomputed_bytes(client: TestClient):
+    session_id = client.post("/verify", json={"question": "Q", "mode": "answer"}).json()["session_id"]
+    r = client.get(f"/session/{session_id}")
+    assert r.status_code == 200
+    assert r.content == _sessions.encoded(session_id)
+    assert r.json()["claims"][0]["text"]
+
+
+def test_session_cache_ignored_after_session_replaced(client: TestClient):
+    session_id = client.post("/verify", json={"question": "Q", "mode": "answer"}).json()["session_id"]
+    _sessions[session_id] = {**_sessions[session_id], "answer": "changed"}
+    assert client.get(f"/session/{session_id}").json()["answer"] == "changed"
+
+
 def test_execute_404_when_session_missing(client: TestClient):
     r = client.post(
         "/execute",
@@ -190,6 +219,45 @@ def test_topic_compare_returns_structure_when_sanity_disabled(client: TestClient
     assert isinstance(data["sessions"], list)
 
 
+def _verify(client: TestClient, question: str, topic: str) -> dict:
+    return client.post("/verify", json={"question": question, "mode": "answer", "topic": topic}).json()
+
+
+def test_topic_export_streams_ndjson_oldest_first(client: TestClient):
+    ids = [_verify(client, f"Q{i}", "Python Asyncio")["session_id"] for i in range(3)]
+    _verify(client, "other", "rust")
+    r = client.get("/topic/python-asyncio/export", headers={"Accept-Encoding": "identity"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    assert "content-encoding" not in r.headers
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert [s["session_id"] for s in lines] == ids
+    assert lines[0]["claims"] and lines[0]["citations"]
+
+
+def test_topic_export_since_filters_incrementally(client: TestClient):
+    for i in range(3):
+        _verify(client, f"Q{i}", "asyncio")
+    created = sorted(s["created_at"] for s in _sessions.values())
+    r = client.get("/topic/asyncio/export", params={"since": created[1]}, headers={"Accept-Encoding": "identity"})
+    assert [json.loads(line)["created_at"] for line in r.text.splitlines()] == created[1:]
+
+
+def test_topic_export_gzip(client: TestClient):
+    _verify(client, "Q", "asyncio")
+    with client.stream("GET", "/topic/asyncio/export", headers={"Accept-Encoding": "gzip"}) as r:
+        assert r.headers["content-encoding"] == "gzip"
+        raw = b"".join(r.iter_raw())
+    lines = zlib.decompress(raw, 31).decode().splitlines()
+    assert json.loads(lines[0])["question"] == "Q"
+
+
+def test_topic_export_empty_topic(client: TestClient):
+    r = client.get("/topic/nothing-here/export")
+    assert r.status_code == 200
+    assert r.content == b""
+
+
 def test_sources_top_returns_structure_when_sanity_disabled(client: TestClient):
     r = client.get("/sources/top")
     assert r.status_code == 200
@@ -0,0 +1,88 @@
+"""Unit tests for admin diagnostics: sampling profiler, slow-request log, loop-lag monitor."""
+import asyncio
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+from profiling import LoopLagMonitor, SlowRequestLog, collapsed, note_request, sample_stacks, stage
+
+
+def _spin_for_profiler(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sample_stacks_collapses_busy_thread():
+    stop = threading.Event()
+    t = threading.Thread(target=_spin_for_profiler, args=(stop,), name="busy")
+    t.start()
+    try:
+        counts = sample_stacks(0.1, interval=0.005)
+    finally:
+        stop.set()
+        t.join()
+    text = collapsed(counts)
+    line = next(ln for ln in text.splitlines() if ln.startswith("busy;"))
+    assert "test_profiling.py:_spin_for_profiler" in line
+    assert int(line.rsplit(" ", 1)[1]) >= 1
+
+
+def test_stage_and_note_are_noops_outside_requests():
+    with stage("search"):
+        note_request(question_chars=3)
+
+
+def test_slow_request_log_is_bounded():
+    log = SlowRequestLog(threshold_ms=10, size=2)
+    for i in range(5):
+        log.record({"path": "/verify", "total_ms": 5 if i == 0 else 20 + i})
+    snap = log.snapshot()
+    assert snap["seen"] == 5
+    assert [e["total_ms"] for e in snap["slow"]] == [24, 23]
+
+
+def _block_the_loop():
+    time.sleep(0.25)
+
+
+async def test_loop_lag_monitor_names_blocking_call():
+    monitor = LoopLagMonitor(threshold_ms=50, interval=0.01)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        _block_the_loop()
+        await asyncio.sleep(0.1)
+    finally:
+        monitor.stop()
+    snap = monitor.snapshot()
+    assert snap["max_lag_ms"] >= 200
+    event = snap["blocking_events"][0]
+    assert event["culprit"].startswith("test_profiling.py:_block_the_loop")
+    assert event["blocked_ms"] >= 50
+
+
+def test_admin_endpoints_hidden_without_token(monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "")
+    with TestClient(app) as client:
+        assert client.get("/admin/slow-requests").status_code == 404
+
+
+def test_admin_endpoints_with_token(monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "s3cret")
+    monkeypatch.setattr(main.slow_requests, "threshold_ms", 0)
+    auth = {"Authorization": "Bearer s3cret"}
+    with TestClient(app) as client:
+        assert client.get("/admin/loop-lag", headers={"Authorization": "Bearer nope"}).status_code == 401
+        client.post("/verify", json={"question": "How does asyncio work?", "mode": "answer"})
+        slow = client.get("/admin/slow-requests", headers=auth).json()["slow"][0]
+        assert slow["path"] == "/verify" and slow["status"] == 200
+        assert slow["shape"]["question_chars"] == len("How does asyncio work?")
+        assert {"search", "extraction", "persistence"} <= set(slow["stages_ms"])
+        r = client.get("/admin/profile?seconds=0.05", headers=auth)
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/plain")
+        assert "max_lag_ms" in client.get("/admin/loop-lag", headers=auth).json()
+    main._sessions.clear()
@@ -1,5 +1,8 @@
 """Unit tests for Sanity store (disabled mode and helpers)."""
 import hashlib
+import json
+
+import pytest
 from sanity_store import SanityStore, _url_hash
 
 
@@ -62,3 +65,140 @@ def test_sanity_store_upsert_does_not_raise_when_disabled():
         "topic": "general",
     })
     # No network call; should not raise
+
+
+def test_sanity_store_iter_documents_empty_when_disabled():
+    store = SanityStore(project_id="", token="")
+    assert list(store.iter_documents("session")) == []
+
+
+def test_sanity_store_iter_documents_pages_by_id(monkeypatch):
+    store = SanityStore(project_id="proj", token="secret")
+    docs = [{"_id": f"d{i}"} for i in range(5)]
+    calls = []
+
+    def fake_query(query, params=None):
+        calls.append(params["$last"])
+        last = params["$last"].strip('"')
+        return [d for d in docs if d["_id"] > last][:2]
+
+    monkeypatch.setattr(store, "_query", fake_query)
+    assert [d["_id"] for d in store.iter_documents("session", page_size=2)] == ["d0", "d1", "d2", "d3", "d4"]
+    assert calls == ['""', '"d1"', '"d3"']
+
+
+def test_sanity_store_iter_documents_resumes_after_id(monkeypatch):
+    store = SanityStore(project_id="proj", token="secret")
+    calls = []
+
+    def fake_query(query, params=None):
+        calls.append(params["$last"])
+        return []
+
+    monkeypatch.setattr(store, "_query", fake_query)
+    assert list(store.iter_documents("session", after="s42")) == []
+    assert calls == ['"s42"']
+
+
+def test_sanity_store_mutate_batch_single_transaction(monkeypatch):
+    store = SanityStore(project_id="proj", token="secret")
+    sent = []
+    monkeypatch.setattr(store, "_mutate", lambda payload, params=None: sent.append((payload, params)) or {})
+    store.mutate_batch([{"patch": {"id": "a", "set": {"x": 1}}}, {"delete": {"id": "b"}}])
+    store.mutate_batch([])
+    assert len(sent) == 1
+    assert len(sent[0][0]["mutations"]) == 2
+    assert sent[0][1]["visibility"] == "async"
+
+
+def test_sanity_store_iter_topic_sessions_keyset_pages(monkeypatch):
+    store = SanityStore(project_id="proj", token="secret")
+    docs = [
+        {"_id": f"s{i}", "question": f"Q{i}", "createdAt": f"2024-01-0{1 + i // 2}", "canExecute": True,
+         "claims": [{"_id": f"c{i}", "text": "T", "sources": [{"_id": "source-a", "url": "https://a.com"}]}]}
+        for i in range(5)
+    ]
+    calls = []
+
+    def fake_query(query, params=None):
+        after, last = json.loads(params["$after"]), json.loads(params["$last"])
+        calls.append((after, last))
+        assert json.loads(params["$slug"]) == "python-asyncio"
+        keep = [d for d in docs if d["createdAt"] > after or (d["createdAt"] == after and d["_id"] > last)]
+        return keep[:2]
+
+    monkeypatch.setattr(store, "_query", fake_query)
+    pages = list(store.iter_topic_sessions("Python Asyncio", since="2024-01-02", page_size=2))
+    assert [[s["session_id"] for s in p] for p in pages] == [["s2", "s3"], ["s4"]]
+    assert calls == [("2024-01-02", ""), ("2024-01-02", "s3")]
+    first = pages[0][0]
+    assert first["can_execute"] is True
+    assert first["citations"][0].url == "https://a.com"
+    assert first["claims"][0].citation_ids == ["source-a"]
+
+
+def _verified(session_id, snippet="S", topic="general"):
+    return {
+        "session_id": session_id,
+        "question": "Q?",
+        "answer": "A",
+        "reliability_score": 0.8,
+        "claims": [{"id": "c1", "text": "T", "citation_ids": [0, 1]}],
+        "citations": [
+            {"url": "https://docs.python.org", "title": "Docs", "snippet": snippet},
+            {"url": "https://x.com", "title": "X", "snippet": "S"},
+        ],
+        "can_execute": True,
+        "topic": topic,
+    }
+
+
+def _capturing_store(monkeypatch):
+    store = SanityStore(project_id="proj", token="secret")
+    sent = []
+    monkeypatch.setattr(store, "_mutate", lambda payload, params=None: sent.append(payload["mutations"]) or {})
+    return store, sent
+
+
+def test_upsert_sends_one_transaction_and_skips_unchanged_shared_docs(monkeypatch):
+    store, sent = _capturing_store(monkeypatch)
+    first = store.upsert_verification_result(_verified("s1"))
+    assert len(sent) == 1
+    kinds = [next(iter(m)) for m in sent[0]]
+    assert kinds.count("createIfNotExists") == 3  # topic + 2 sources
+    assert first["planned"] == 5 and first["skipped"] == 0
+
+    second = store.upsert_verification_result(_verified("s2"))
+    ids = [m.get("createOrReplace", {}).get("_id") for m in sent[1]]
+    assert ids == ["claim-s2-0", "s2"]
+    assert second == {"planned": 5, "sent": 2, "skipped": 3, "created": 0, "patched": 0}
+    assert store.stats["verifications"] == 2 and store.stats["skipped"] == 3
+
+
+def test_upsert_patches_only_changed_fields(monkeypatch):
+    store, sent = _capturing_store(monkeypatch)
+    store.upsert_verification_result(_verified("s1"))
+    store.upsert_verification_result(_verified("s2", snippet="New snippet"))
+    patches = [m["patch"] for m in sent[1] if "patch" in m]
+    assert patches == [{"id": f"source-{_url_hash('https://docs.python.org')}", "set": {"snippet": "New snippet"}}]
+
+
+def test_upsert_failure_is_not_remembered(monkeypatch):
+    store = SanityStore(project_id="proj", token="secret")
+
+    def failing(payload, params=None):
+        raise RuntimeError("sanity down")
+
+    monkeypatch.setattr(store, "_mutate", failing)
+    with pytest.raises(RuntimeError):
+        store.upsert_verification_result(_verified("s1"))
+    mutations, _ = store.diff_mutations(store.build_mutations(_verified("s2")))
+    assert sum(1 for m in mutations if "createIfNotExists" in m) == 3
+
+
+def test_hash_cache_entries_expire(monkeypatch):
+    import sanity_store
+    monkeypatch.setattr(sanity_store, "SANITY_HASH_TTL", 0.0)
+    store, sent = _capturing_store(monkeypatch)
+    store.upsert_verification_result(_verified("s1"))
+    assert store.upsert_verification_result(_verified("s2"))["skipped"] == 0
@@ -0,0 +1,97 @@
+"""Unit tests for the semantic result cache and its use in the verification pipeline."""
+import time
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+from models import Citation
+from semantic_cache import SemanticCache
+from verification import run_verification_pipeline
+
+
+class CountingYou:
+    def __init__(self):
+        self.calls = 0
+
+    async def search(self, query):
+        self.calls += 1
+        return [Citation(url="https://docs.python.org/3/library/asyncio.html", title="asyncio",
+                         snippet="asyncio runs coroutines on an event loop in a single thread.")]
+
+
+def _result(session_id="s0", **extra):
+    return {"session_id": session_id, "claims": [], "citations": [Citation(url="https://a.com")], **extra}
+
+
+def test_lookup_hits_similar_question_in_same_topic_only():
+    cache = SemanticCache(threshold=0.9)
+    assert cache.add("How does Python asyncio work?", "python", _result())
+    entry, sim = cache.lookup("how does python asyncio work", "python")
+    assert entry["session_id"] == "s0" and sim > 0.99
+    assert cache.lookup("how does python asyncio work", "rust") is None
+    assert cache.lookup("What is the Rust borrow checker?", "python") is None
+    m = cache.metrics()
+    assert m["lookups"] == 3 and m["hits"] == 1 and m["hit_rate"] == round(1 / 3, 4)
+    assert sum(m["best_similarity_histogram"].values()) == 2  # the other topic has no entries
+
+
+def test_entries_expire_and_ring_is_bounded():
+    cache = SemanticCache(threshold=0.9, ttl=0.05, max_per_topic=2)
+    cache.add("question one about asyncio", "t", _result("s1"))
+    time.sleep(0.06)
+    assert cache.lookup("question one about asyncio", "t") is None
+    for i in range(3):
+        cache.add(f"question {i} about loops", "t", _result(f"r{i}"))
+    assert cache.metrics()["entries"] == 2
+    assert {e["session_id"] for e in cache._topics["t"].entries} == {"r1", "r2"}  # oldest overwritten
+
+
+def test_rings_grow_on_demand_and_topics_are_capped():
+    cache = SemanticCache(threshold=0.9, max_per_topic=40, max_topics=2)
+    cache.add("first question", "a", _result("a0"))
+    assert cache._topics["a"].vectors.shape[0] == 16  # not max_per_topic rows up front
+    for i in range(1, 45):
+        cache.add(f"question number {i} on topic a", "a", _result(f"a{i}"))
+    ring = cache._topics["a"]
+    assert ring.vectors.shape[0] == 40 and ring.entries[0]["session_id"] == "a40"  # grew, then wrapped
+    cache.add("a question on topic b", "b", _result("b0"))
+    cache.lookup("question number 44 on topic a", "a")  # "a" used more recently than "b"
+    cache.add("a question on topic c", "c", _result("c0"))
+    assert list(cache._topics) == ["a", "c"] and cache.metrics()["evicted_topics"] == 1
+
+
+def test_unclean_results_are_not_cached():
+    cache = SemanticCache()
+    assert not cache.add("q", "t", _result(degraded_stages=["search"]))
+    assert not cache.add("q", "t", _result(stale=True))
+    assert not cache.add("q", "t", {"session_id": "s", "claims": [], "citations": []})
+    assert not SemanticCache(ttl=0).add("q", "t", _result())
+
+
+def test_custom_embedder():
+    cache = SemanticCache(threshold=0.5, embed=lambda texts: np.ones((len(texts), 4)) / 2, dim=4)
+    cache.add("anything", "t", _result())
+    assert cache.lookup("something else entirely", "t")[0]["session_id"] == "s0"
+
+
+async def test_pipeline_reuses_cached_result_under_new_session():
+    you, cache = CountingYou(), SemanticCache(threshold=0.9)
+    first = await run_verification_pipeline("How does Python asyncio work?", "answer", "python", you, None, semantic_cache=cache)
+    second = await run_verification_pipeline("how does python asyncio work", "answer", "python", you, None, semantic_cache=cache)
+    assert you.calls == 1
+    assert second["cached_from"] == first["session_id"]
+    assert second["session_id"] != first["session_id"]
+    assert second["claims"] == first["claims"] and second["reliability_score"] == first["reliability_score"]
+    assert first["cached_from"] is None
+
+
+def test_verify_reports_cache_hits():
+    with TestClient(app) as client:
+        app.state.semantic_cache = SemanticCache(threshold=0.9)
+        a = client.post("/verify", json={"question": "How does asyncio work?", "topic": "py"}).json()
+        b = client.post("/verify", json={"question": "how does asyncio work", "topic": "py"}).json()
+        assert b["cached_from"] == a["session_id"]
+        assert client.get("/metrics/semantic-cache").json()["hits"] == 1
+    main._sessions.clear()
@@ -0,0 +1,106 @@
+"""Unit tests for the local session write-ahead log: framing, recovery, compaction."""
+import os
+import time
+
+import orjson
+from fastapi.testclient import TestClient
+
+import main
+from main import app, _sessions
+from session_wal import SessionWAL, _frame, scan_frames
+
+
+def _body(i: int) -> bytes:
+    return orjson.dumps({"session_id": f"s{i}", "question": f"question {i}", "claims": [], "citations": []})
+
+
+def test_frames_scan_until_torn_or_corrupt():
+    buf = _frame("s1", _body(1), 1.0) + _frame("s2", _body(2), 2.0)
+    assert [(ts, sid) for _, _, ts, sid in scan_frames(buf)] == [(1.0, "s1"), (2.0, "s2")]
+    assert [sid for *_, sid in scan_frames(buf[:-3])] == ["s1"]
+    corrupt = bytearray(buf)
+    corrupt[20] ^= 0xFF
+    assert list(scan_frames(bytes(corrupt))) == []
+
+
+def test_group_commit_and_recovery(tmp_path):
+    wal = SessionWAL(str(tmp_path), fsync_ms=50)
+    wal.open()
+    for i in range(20):
+        wal.append(f"s{i}", _body(i))
+    wal.append("s3", _body(33))  # rewritten: last frame wins
+    assert wal.flush()
+    assert wal.stats["appended"] == 21 and wal.stats["fsyncs"] <= 3
+    assert orjson.loads(wal.get("s3"))["question"] == "question 33"
+    wal.close()
+
+    segment = sorted(n for n in os.listdir(tmp_path) if n.endswith(".wal"))[0]
+    with open(tmp_path / segment, "ab") as f:
+        f.write(_frame("s99", _body(99), time.time())[:-5])  # crash mid-write
+    reopened = SessionWAL(str(tmp_path))
+    report = reopened.open()
+    assert report["recovered"] == 20 and report["torn_frames"] == 1
+    assert orjson.loads(reopened.get("s3"))["question"] == "question 33"
+    assert reopened.get("s99") is None
+    assert reopened.recent(1) == ["s3"]
+    reopened.close()
+
+
+def test_expired_sessions_are_dropped(tmp_path):
+    wal = SessionWAL(str(tmp_path), ttl=0.05)
+    wal.open()
+    wal.append("old", _body(1))
+    wal.flush()
+    time.sleep(0.06)
+    assert wal.get("old") is None
+    wal.close()
+    reopened = SessionWAL(str(tmp_path), ttl=0.05)
+    assert reopened.open()["recovered"] == 0
+    reopened.close()
+
+
+def test_compaction_keeps_latest_frames_and_recovers(tmp_path):
+    wal = SessionWAL(str(tmp_path), fsync_ms=0, segment_mb=0.0005, compact_after=100)  # ~500-byte segments
+    wal.open()
+    for i in range(30):
+        wal.append(f"s{i % 10}", _body(i))
+        wal.flush()
+    upto = wal._segment - 1
+    kept = wal.compact(upto)
+    assert 0 < kept < 30  # one frame per session whose latest frame was in the compacted segments
+    names = sorted(os.listdir(tmp_path))
+    assert f"{upto:08d}.snap" in names and all(int(n[:8]) > upto for n in names if n.endswith(".wal"))
+    assert orjson.loads(wal.get("s9"))["question"] == "question 29"
+    wal.append("s0", _body(100))
+    wal.close()
+    reopened = SessionWAL(str(tmp_path))
+    assert reopened.open()["recovered"] == 10
+    assert orjson.loads(reopened.get("s0"))["question"] == "question 100"
+    assert orjson.loads(reopened.get("s5"))["question"] == "question 25"
+    reopened.close()
+
+
+def _wait_ready(client):
+    deadline = time.time() + 5
+    r = client.get("/ready")
+    while r.status_code != 200 and time.time() < deadline:
+        time.sleep(0.01)
+        r = client.get("/ready")
+    return r
+
+
+def test_sessions_survive_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "SESSION_WAL_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "SESSION_WAL_WARM", 1)
+    with TestClient(app) as client:
+        assert _wait_ready(client).status_code == 200
+        first = client.post("/verify", json={"question": "Q1", "mode": "execute"}).json()["session_id"]
+        second = client.post("/verify", json={"question": "Q2", "mode": "execute"}).json()["session_id"]
+    _sessions.clear()  # restart: memory is gone
+    with TestClient(app) as client:
+        assert _wait_ready(client).status_code == 200
+        assert set(_sessions) == {second}  # newest loaded eagerly, the rest on demand
+        assert client.get(f"/session/{first}").json()["question"] == "Q1"
+        wal = client.get("/metrics/session-cache").json()["wal"]
+        assert wal["recovery"]["recovered"] == 2 and wal["recovery"]["loaded"] == 1
+    _sessions.clear()
@@ -0,0 +1,248 @@
+"""Unit tests for the shared state tier: backends, locks, hash ring, cached search, cross-replica sessions."""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app, _sessions
+from models import Citation
+from shared_state import HashRing, MemoryState, SQLiteState, open_state
+from you_client import CachedYouClient, search_cache_key
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def state(request, tmp_path):
+    if request.param == "memory":
+        return MemoryState()
+    return SQLiteState(str(tmp_path / "state.db"))
+
+
+def test_get_set_delete(state):
+    assert state.get("k") is None
+    state.set("k", b"v")
+    assert state.get("k") == b"v"
+    state.delete("k")
+    assert state.get("k") is None
+
+
+def test_ttl_expires(state):
+    state.set("k", b"v", ttl=0.05)
+    assert state.get("k") == b"v"
+    time.sleep(0.1)
+    assert state.get("k") is None
+
+
+def test_purge_drops_unread_expired_entries(state):
+    state.set("session:old", b"v", ttl=0.05)
+    state.set("session:new", b"v", ttl=60)
+    state.set("pinned", b"v")
+    time.sleep(0.1)
+    assert state.purge_expired() == 1
+    assert state.purge_expired() == 0
+    assert state.get("session:new") == b"v" and state.get("pinned") == b"v"
+
+
+def test_memory_state_is_safe_across_threads():
+    state = MemoryState()
+
+    def writer(i):
+        for j in range(2000):
+            state.set(f"k{i}:{j}", b"v", ttl=0.001 if j % 2 else None)
+            state.get(f"k{i}:{j - 1}")
+            if j % 3 == 0:
+                state.delete(f"k{i}:{j - 2}")
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(writer, i) for i in range(4)]
+        while not all(f.done() for f in futures):
+            state.purge_expired()  # iterates the dict while the writers change it
+        for f in futures:
+            f.result()
+    assert state.acquire("q", ttl=1) and state.acquire("q", ttl=1) is None
+
+
+def test_sqlite_state_avoids_wal_mode(tmp_path):
+    state = SQLiteState(str(tmp_path / "state.db"))
+    assert state._conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    assert not (tmp_path / "state.db-wal").exists()
+
+
+def test_lock_is_exclusive_and_expires(state):
+    token = state.acquire("q", ttl=0.1)
+    assert token
+    assert state.acquire("q", ttl=0.1) is None
+    state.release("q", "not-the-token")
+    assert state.acquire("q", ttl=0.1) is None
+    state.release("q", token)
+    assert state.acquire("q", ttl=0.05)
+    time.sleep(0.1)
+    assert state.acquire("q", ttl=0.05)
+
+
+def test_sqlite_state_shared_between_connections(tmp_path):
+    path = str(tmp_path / "shared.db")
+    pod_a, pod_b = SQLiteState(path), SQLiteState(path)
+    pod_a.set("session:1", b"{}")
+    assert pod_b.get("session:1") == b"{}"
+    assert pod_a.acquire("search:x", ttl=5)
+    assert pod_b.acquire("search:x", ttl=5) is None
+
+
+def test_open_state_urls(tmp_path):
+    assert isinstance(open_state("memory://"), MemoryState)
+    assert isinstance(open_state(f"sqlite:///{tmp_path}/s.db"), SQLiteState)
+    with pytest.raises(ValueError):
+        open_state("redis://localhost")
+
+
+def test_hash_ring_is_stable_and_balanced():
+    ring = HashRing(["api-0", "api-1", "api-2"])
+    assert HashRing([]).node_for("x") is None
+    assignments = {f"s{i}": ring.node_for(f"s{i}") for i in range(3000)}
+    counts = {n: list(assignments.values()).count(n) for n in ("api-0", "api-1", "api-2")}
+    assert min(counts.values()) > 600
+    grown = HashRing(["api-0", "api-1", "api-2", "api-3"])
+    moved = sum(1 for k, n in assignments.items() if grown.node_for(k) != n)
+    assert moved < 1300  # roughly a quarter of keys move, not all of them
+
+
+def test_search_cache_key_normalizes_whitespace_and_case():
+    assert search_cache_key("How  does Asyncio work") == search_cache_key("how does asyncio work")
+
+
+class CountingYou:
+    stub = True
+
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+
+    async def search(self, query):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return [Citation(url="https://a.com", title="A", snippet=query)]
+
+
+@pytest.mark.asyncio
+async def test_cached_search_hits_cache_across_clients(tmp_path):
+    shared = SQLiteState(str(tmp_path / "s.db"))
+    upstream = CountingYou()
+    pod_a = CachedYouClient(upstream, shared)
+    pod_b = CachedYouClient(upstream, shared)
+    first = await pod_a.search("asyncio")
+    second = await pod_b.search("asyncio")
+    assert upstream.calls == 1
+    assert first == second
+
+
+@pytest.mark.asyncio
+async def test_cached_search_single_flight():
+    upstream = CountingYou(delay=0.05)
+    client = CachedYouClient(upstream, MemoryState(), poll_interval=0.01)
+    results = await asyncio.gather(*(client.search("same question") for _ in range(5)))
+    assert upstream.calls == 1
+    assert all(r[0].url == "https://a.com" for r in results)
+
+
+class FlakyYou:
+    stub = True
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)  # per call: list of urls, or an exception to raise
+        self.calls = 0
+
+    async def search(self, query):
+        outcome = self.outcomes[min(self.calls, len(self.outcomes) - 1)]
+        self.calls += 1
+        if isinstance(outcome, Exception):
+            raise outcome
+        return [Citation(url=u, title="T", snippet=query) for u in outcome]
+
+
+async def _drain(client):
+    while client._refreshing:
+        await asyncio.gather(*client._refreshing)
+
+
+@pytest.mark.asyncio
+async def test_cached_search_serves_stale_and_refreshes_in_background():
+    upstream = FlakyYou([["https://old.com"], ["https://new.com"]])
+    client = CachedYouClient(upstream, MemoryState(), ttl=0.05, stale_ttl=60)
+    fresh = await client.search("q")
+    assert not fresh.stale
+    time.sleep(0.06)
+    stale = await client.search("q")
+    assert stale.stale and stale[0].url == "https://old.com"
+    await _drain(client)
+    refreshed = await client.search("q")
+    assert not refreshed.stale and refreshed[0].url == "https://new.com"
+    assert upstream.calls == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("refresh", [RuntimeError("429"), []], ids=["error", "empty"])
+async def test_cached_search_failed_refresh_keeps_stale_and_backs_off(refresh):
+    upstream = FlakyYou([["https://old.com"], refresh])
+    client = CachedYouClient(upstream, MemoryState(), ttl=0.05, stale_ttl=60, negative_ttl=60)
+    await client.search("q")
+    time.sleep(0.06)
+    await client.search("q")
+    await _drain(client)
+    again = await client.search("q")
+    assert again.stale and again[0].url == "https://old.com"
+    await _drain(client)
+    assert upstream.calls == 2  # no refresh until the negative TTL passes
+
+
+@pytest.mark.asyncio
+async def test_cached_search_caches_errors_and_empty_results_briefly():
+    upstream = FlakyYou([RuntimeError("upstream 503"), ["https://a.com"]])
+    client = CachedYouClient(upstream, MemoryState(), negative_ttl=0.05)
+    first = await client.search("q")
+    second = await client.search("q")
+    assert first == [] and "upstream 503" in first.error
+    assert second.error and upstream.calls == 1
+    time.sleep(0.06)
+    assert (await client.search("q"))[0].url == "https://a.com"
+
+    empty = FlakyYou([[]])
+    client = CachedYouClient(empty, MemoryState(), negative_ttl=60)
+    assert await client.search("nothing") == []
+    assert await client.search("nothing") == []
+    assert empty.calls == 1
+
+
+def test_verify_survives_upstream_failure():
+    with TestClient(app) as client:
+        app.state.you_client = CachedYouClient(FlakyYou([RuntimeError("timeout")]), MemoryState())
+        r = client.post("/verify", json={"question": "Q", "mode": "execute"})
+        assert r.status_code == 200
+        assert r.json()["degraded_stages"] == ["search"]
+        assert r.json()["can_execute"] is False
+    _sessions.clear()
+
+
+def test_session_visible_on_other_replica(tmp_path):
+    with TestClient(app) as client:
+        app.state.shared = SQLiteState(str(tmp_path / "s.db"))
+        session_id = client.post("/verify", json={"question": "Q", "mode": "execute"}).json()["session_id"]
+        # Simulate pod B: empty local cache, same shared tier
+        _sessions.clear()
+        r = client.get(f"/session/{session_id}")
+        assert r.status_code == 200
+        assert r.json()["question"] == "Q"
+        _sessions[session_id] = {**_sessions[session_id], "can_execute": True}
+        assert client.post("/execute", json={"session_id": session_id, "action_type": "config"}).status_code == 200
+    _sessions.clear()
+
+
+def test_verify_sets_affinity_header_when_replicas_known():
+    with TestClient(app) as client:
+        app.state.ring = HashRing(["api-0", "api-1"])
+        r = client.post("/verify", json={"question": "Q", "mode": "answer"})
+        assert r.headers["X-Session-Affinity"] == app.state.ring.node_for(r.json()["session_id"])
+        app.state.ring = HashRing([])
+        assert "X-Session-Affinity" not in client.post("/verify", json={"question": "Q", "mode": "answer"}).headers
+    _sessions.clear()
@@ -0,0 +1,75 @@
+"""Unit tests for the content-addressed snippet store and the packed session cache."""
+from fastapi.testclient import TestClient
+
+from main import app, _sessions
+from models import Citation, Claim
+from snippet_store import PackedSessions, SnippetStore, train_zdict
+
+SNIPPETS = [
+    f"Python asyncio runs coroutines on a single-threaded event loop; example {i} shows how tasks "
+    f"are scheduled cooperatively and awaited with asyncio.gather in release 3.{i}."
+    for i in range(40)
+]
+
+
+def test_put_is_content_addressed_and_round_trips():
+    store = SnippetStore(min_compress=16, train_after=0)
+    a = store.put(SNIPPETS[0])
+    assert store.put(str(SNIPPETS[0])) is a  # same canonical key object
+    assert store.get(a) == SNIPPETS[0]
+    short = store.put("tiny")
+    assert store.get(short) == "tiny"
+    assert store.stats()["texts"] == 2
+
+
+def test_trained_dictionary_shrinks_similar_texts():
+    plain, trained = SnippetStore(min_compress=16, train_after=0), SnippetStore(min_compress=16, train_after=20)
+    keys = [trained.put(s) for s in SNIPPETS]
+    for s in SNIPPETS:
+        plain.put(s)
+    assert trained.stats()["dictionaries"] == 1
+    assert trained.stats()["stored_bytes"] < plain.stats()["stored_bytes"] < plain.stats()["raw_bytes"]
+    assert [trained.get(k) for k in keys] == SNIPPETS  # blobs written before and after training
+    assert train_zdict(["no repeats here at all"]) == b""
+
+
+def _session(sid="s1", **extra):
+    return {
+        "session_id": sid, "question": "Q", "topic": "py", "created_at": "2024-01-01T00:00:00Z",
+        "answer": SNIPPETS[0],
+        "claims": [Claim("cl-0", SNIPPETS[1], "supports", [0], 0.85)],
+        "citations": [Citation("asyncio docs", "https://docs.python.org/3/library/asyncio.html", SNIPPETS[1], None, "Python")],
+        **extra,
+    }
+
+
+def test_packed_sessions_rebuild_models_and_share_texts():
+    sessions = PackedSessions()
+    sessions["s1"] = _session()
+    sessions["s2"] = _session("s2", claims=[c.to_dict() for c in _session()["claims"]])
+    assert sessions["s1"] == _session()
+    assert sessions["s2"]["claims"] == _session()["claims"]  # plain dicts are packed too
+    assert sessions.store.stats()["texts"] == 3  # answer, title, snippet == claim text
+    assert sessions.field("s2", "topic") == "py" and sessions.field("nope", "topic") is None
+    assert set(sessions) == {"s1", "s2"} and "s1" in sessions
+
+
+def test_encoded_bodies_are_bounded_and_dropped_on_replace():
+    sessions = PackedSessions(bytes_cache=1)
+    sessions["s1"], sessions["s2"] = _session(), _session("s2")
+    sessions.set_encoded("s1", b"one")
+    sessions.set_encoded("s2", b"two")
+    assert sessions.encoded("s1") is None and sessions.encoded("s2") == b"two"
+    sessions["s2"] = _session("s2", answer="changed")
+    assert sessions.encoded("s2") is None
+    sessions.set_encoded("missing", b"x")
+    assert sessions.encoded("missing") is None
+    assert sessions.stats()["sessions"] == 2 and sessions.stats()["encoded_bodies"] == 0
+
+
+def test_session_cache_metrics():
+    with TestClient(app) as client:
+        client.post("/verify", json={"question": "How does asyncio work?"})
+        m = client.get("/metrics/session-cache").json()
+    assert m["sessions"] == 1 and m["texts"] > 0 and m["raw_bytes"] > 0
+    _sessions.clear()
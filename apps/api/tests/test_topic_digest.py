@@ -0,0 +1,95 @@
+"""Unit tests for incremental topic digests and GET /topic/{topic}/digest."""
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+from fastapi.testclient import TestClient
+
+from main import app, _sessions
+from shared_state import MemoryState, SQLiteState
+from topic_digest import DigestStore, _empty, _vectors, apply_result, render, topic_slug
+
+
+def _result(i, score, urls=("https://a.com",), claims=("Python asyncio runs an event loop for coroutines.",), topic="Python Async"):
+    return {
+        "session_id": f"s{i}",
+        "question": f"Q{i}",
+        "answer": f"A{i}",
+        "reliability_score": score,
+        "topic": topic,
+        "created_at": f"2024-01-01T00:00:{i:02d}Z",
+        "citations": [{"url": u, "title": u[8:]} for u in urls],
+        "claims": [{"id": f"cl-{n}", "text": t, "citation_ids": [n % len(urls)]} for n, t in enumerate(claims)],
+    }
+
+
+def test_reliability_stats_match_batch_computation():
+    scores = [0.5, 0.9, 0.7, 0.6, 0.8]
+    digest = _empty("t")
+    for i, s in enumerate(scores):
+        apply_result(digest, _result(i, s))
+    view = render(digest)
+    assert view["sessions"] == 5
+    assert abs(view["reliability"]["mean"] - statistics.mean(scores)) < 1e-4
+    assert abs(view["reliability"]["stddev"] - statistics.stdev(scores)) < 1e-4
+    assert view["reliability"]["min"] == 0.5 and view["reliability"]["max"] == 0.9
+
+
+def test_top_sources_and_latest_sessions():
+    digest = _empty("t")
+    apply_result(digest, _result(0, 0.7, urls=("https://a.com", "https://b.com"), claims=("x one two three", "y four five six")))
+    apply_result(digest, _result(1, 0.7, urls=("https://a.com",)))
+    for i in range(2, 30):
+        apply_result(digest, _result(i, 0.7, urls=("https://a.com",)), latest=3)
+    view = render(digest)
+    assert view["top_sources"][0] == {"url": "https://a.com", "title": "a.com", "citation_count": 30}
+    assert [s["session_id"] for s in view["latest"]] == ["s29", "s28", "s27"]
+
+
+def test_claims_cluster_by_similarity():
+    digest = _empty("t")
+    apply_result(digest, _result(0, 0.7, claims=("Python asyncio runs an event loop for coroutines.",)))
+    apply_result(digest, _result(1, 0.7, claims=("Python asyncio runs an event loop for many coroutines.",)))
+    apply_result(digest, _result(2, 0.7, claims=("Rust ownership prevents data races at compile time.",)))
+    view = render(digest)
+    assert [c["size"] for c in view["claim_clusters"]] == [2, 1]
+    assert view["consensus"].startswith("Python asyncio")
+    assert view["claim_clusters"][0]["sessions"] == ["s0", "s1"]
+
+
+def test_store_shares_digest_across_replicas(tmp_path):
+    path = str(tmp_path / "s.db")
+    pod_a, pod_b = DigestStore(SQLiteState(path)), DigestStore(SQLiteState(path))
+    threads = [threading.Thread(target=(pod_a if i % 2 else pod_b).update, args=(_result(i, 0.8),)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert orjson.loads(pod_a.get("python async"))["sessions"] == 8
+    assert pod_b.get("other") is None
+    assert topic_slug("Python Async") == "python-async"
+
+
+def test_digest_endpoint_updates_on_verify():
+    with TestClient(app) as client:
+        app.state.digests = DigestStore(MemoryState())
+        assert client.get("/topic/asyncio/digest").status_code == 404
+        for _ in range(2):
+            client.post("/verify", json={"question": "How does asyncio work?", "topic": "asyncio"})
+        r = client.get("/topic/asyncio/digest")
+        assert r.status_code == 200
+        data = r.json()
+        assert data["sessions"] == 2
+        assert data["top_sources"][0]["url"].startswith("https://")
+        assert len(data["latest"]) == 2
+    _sessions.clear()
+
+
+def test_representative_vectors_are_safe_across_threads():
+    def work(seed):
+        texts = [f"claim {seed} {i}" for i in range(600)]  # enough distinct texts to keep evicting
+        return _vectors(texts).shape
+
+    with ThreadPoolExecutor(8) as pool:
+        assert set(pool.map(work, range(32))) == {(600, 256)}
@@ -0,0 +1,115 @@
+"""Unit tests for the /verify traffic recorder and its log format."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+from traffic_recorder import TrafficRecorder, read_records, scrub
+from you_client import YouClient
+
+
+def test_scrub_replaces_personal_data_only():
+    text = "mail jane.doe+x@example.co.uk or call (415) 555-0100 / +1 415-555-0100, card 4111 1111 1111 1111, ip 10.0.0.12"
+    out = scrub(text)
+    assert out == "mail <email> or call <phone> / <phone>, card <card>, ip <ip>"
+    kept = "released 2024-01-15, ts 1700000000, v3.11.4, https://docs.python.org/3/library/asyncio.html"
+    assert scrub(kept) == kept
+
+
+def test_frames_round_trip_and_torn_tail_is_ignored(tmp_path):
+    path = str(tmp_path / "traffic.log")
+    rec = TrafficRecorder(path, sample=1.0, batch=2)
+    rid = rec.begin()
+    rec.record_search("q one", 12.5, 200, '{"results": []}')
+    rec.record_verify(rid, {"question": "q one", "mode": "answer"}, 20.0, 200)
+    rec.close()
+    records = list(read_records(path))
+    assert [r["t"] for r in records] == ["search", "verify"]
+    assert records[0]["rid"] == records[1]["rid"] == rid
+    with open(path, "ab") as f:
+        f.write(b"\x10\x00\x00\x00garbage")  # crash mid-frame
+    assert len(list(read_records(path))) == 2
+
+
+def test_recorded_json_bodies_stay_parseable(tmp_path):
+    path = str(tmp_path / "traffic.log")
+    rec = TrafficRecorder(path, sample=1.0)
+    rec.begin()
+    body = json.dumps({"results": [{"page_age": 1700000000123, "id": 12345678901234567,
+                                    "description": "contact jane@example.com, card 4111 1111 1111 1111"}]})
+    rec.record_search("q", 1.0, 200, body)
+    rec.record_search("q", 1.0, 502, "<html>mail ops@example.com</html>")
+    rec.close()
+    recorded, error = [r["body"] for r in read_records(path)]
+    hit = json.loads(recorded)["results"][0]
+    assert hit["page_age"] == 1700000000123 and hit["id"] == 12345678901234567
+    assert hit["description"] == "contact <email>, card <card>"
+    assert error == "<html>mail <email></html>"
+
+
+def test_unsampled_requests_record_nothing(tmp_path):
+    path = str(tmp_path / "traffic.log")
+    rec = TrafficRecorder(path, sample=0.0)
+    assert rec.begin() is None
+    rec.record_search("q", 1.0, 200, "{}")
+    rec.record_verify(None, {"question": "q"}, 1.0, 200)
+    rec.close()
+    assert rec.recorded == 0
+    assert not (tmp_path / "traffic.log").exists()
+
+
+class _You(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        data = json.dumps({"results": [{"url": "https://a.com", "title": "A", "description": "ask bob@example.com"}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def fake_you():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _You)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+async def test_you_client_records_raw_exchanges(tmp_path, fake_you):
+    rec = TrafficRecorder(str(tmp_path / "traffic.log"))
+    client = YouClient(api_key="k", stub=False, recorder=rec)
+    client.base = fake_you
+    rec.begin()
+    assert (await client.search("what is asyncio"))[0].url == "https://a.com"
+    client.base = "http://127.0.0.1:1"  # nothing listening
+    with pytest.raises(httpx.HTTPError):
+        await client.search("unreachable")
+    rec.close()
+    ok, failed = read_records(rec.path)
+    assert ok["query"] == "what is asyncio" and ok["status"] == 200
+    assert "<email>" in ok["body"] and json.loads(ok["body"])["results"][0]["url"] == "https://a.com"
+    assert failed["status"] == 0 and failed["body"] == ""
+
+
+def test_verify_is_recorded(tmp_path):
+    with TestClient(app) as client:
+        app.state.recorder = TrafficRecorder(str(tmp_path / "traffic.log"))
+        client.post("/verify", json={"question": "How does asyncio work? me@x.io", "topic": "py", "budget_ms": 5000},
+                    headers={"X-Request-Deadline": "4000"})
+        app.state.recorder.close()
+        app.state.recorder = None
+    (verify,) = read_records(str(tmp_path / "traffic.log"))  # stub search: no upstream exchange
+    assert verify["request"] == {"question": "How does asyncio work? <email>", "mode": "answer", "topic": "py",
+                                 "budget_ms": 5000, "deadline_ms": 4000}
+    assert verify["status"] == 200 and verify["latency_ms"] > 0
+    main._sessions.clear()
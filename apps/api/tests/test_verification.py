@@ -1,5 +1,6 @@
 """Unit tests for verification pipeline and execute."""
 import pytest
+from models import Citation, Claim
 from verification import (
     _build_claims_from_citations,
     _compute_reliability,
@@ -17,40 +18,40 @@ def test_build_claims_empty_citations():
 
 def test_build_claims_dedupes_by_url():
     raw = [
-        {"url": "https://a.com", "title": "A", "snippet": "Snippet A"},
-        {"url": "https://a.com", "title": "A again", "snippet": "Duplicate"},
-        {"url": "https://b.com", "title": "B", "snippet": "Snippet B"},
+        Citation(url="https://a.com", title="A", snippet="Snippet A"),
+        Citation(url="https://a.com", title="A again", snippet="Duplicate"),
+        Citation(url="https://b.com", title="B", snippet="Snippet B"),
     ]
     claims, citations = _build_claims_from_citations(raw)
     assert len(citations) == 2
     assert len(claims) == 2
-    urls = [c["url"] for c in citations]
+    urls = [c.url for c in citations]
     assert urls == ["https://a.com", "https://b.com"]
 
 
 def test_build_claims_skips_empty_url():
     raw = [
-        {"url": "", "title": "No URL", "snippet": "x"},
-        {"url": "https://ok.com", "title": "OK", "snippet": "y"},
+        Citation(url="", title="No URL", snippet="x"),
+        Citation(url="https://ok.com", title="OK", snippet="y"),
     ]
     claims, citations = _build_claims_from_citations(raw)
     assert len(citations) == 1
-    assert citations[0]["url"] == "https://ok.com"
+    assert citations[0].url == "https://ok.com"
     assert len(claims) == 1
-    assert claims[0]["citation_ids"] == [0]
+    assert claims[0].citation_ids == [0]
 
 
 def test_build_claims_shape():
-    raw = [{"url": "https://x.com", "title": "X", "snippet": "Some text here."}]
+    raw = [Citation(url="https://x.com", title="X", snippet="Some text here.")]
     claims, citations = _build_claims_from_citations(raw)
     assert len(claims) == 1
-    assert claims[0]["id"] == "cl-0"
-    assert claims[0]["text"] == "Some text here."
-    assert claims[0]["stance"] == "neutral"
-    assert claims[0]["citation_ids"] == [0]
-    assert claims[0].get("confidence") == 0.85
-    assert citations[0]["url"] == "https://x.com"
-    assert citations[0]["title"] == "X"
+    assert claims[0].id == "cl-0"
+    assert claims[0].text == "Some text here."
+    assert claims[0].stance == "neutral"
+    assert claims[0].citation_ids == [0]
+    assert claims[0].confidence == 0.85
+    assert citations[0].url == "https://x.com"
+    assert citations[0].title == "X"
 
 
 def test_compute_reliability_empty_claims():
@@ -60,11 +61,11 @@ def test_compute_reliability_empty_claims():
 
 def test_compute_reliability_increases_with_claims_and_citations():
     one = _compute_reliability(
-        [{"confidence": 0.8}],
-        [{"url": "u"}],
+        [Claim(id="c", text="t", confidence=0.8)],
+        [Citation(url="u")],
     )
     five = _compute_reliability(
-        [{"confidence": 0.8}] * 5,
+        [Claim(id="c", text="t", confidence=0.8)] * 5,
         [{"url": f"u{i}"} for i in range(5)],
     )
     assert five >= one
@@ -73,18 +74,24 @@ def test_compute_reliability_increases_with_claims_and_citations():
 
 def test_compute_reliability_capped():
     many = _compute_reliability(
-        [{"confidence": 1.0}] * 20,
+        [Claim(id="c", text="t", confidence=1.0)] * 20,
         [{"url": f"u{i}"} for i in range(20)],
     )
     assert many <= 0.95
 
 
+def test_compute_reliability_penalizes_stale_results():
+    claims = [Claim(id="c", text="t", citation_ids=[0])]
+    citations = [Citation(url="https://a.com")]
+    assert _compute_reliability(claims, citations, stale=True) < _compute_reliability(claims, citations)
+
+
 @pytest.mark.asyncio
 async def test_run_verification_pipeline_returns_required_keys():
     class StubYou:
         async def search(self, q):
             return [
-                {"url": "https://a.com", "title": "A", "snippet": "Snippet"},
+                Citation(url="https://a.com", title="A", snippet="Snippet"),
             ]
 
     class StubSanity:
@@ -113,7 +120,7 @@ async def test_run_verification_pipeline_returns_required_keys():
 async def test_run_verification_pipeline_execute_mode_sets_next_question_when_low():
     class LowEvidenceYou:
         async def search(self, q):
-            return [{"url": "https://one.com", "title": "One", "snippet": "Only one."}]
+            return [Citation(url="https://one.com", title="One", snippet="Only one.")]
 
     result = await run_verification_pipeline(
         question="?",
@@ -160,3 +167,23 @@ def test_run_execute_unknown_action_returns_safe():
     out = run_execute(session, "unknown_type")
     assert out["artifact"] == ""
     assert "Unknown" in str(out["safety_notes"])
+
+
+def test_build_claims_reuses_citation_objects():
+    a = Citation(url="https://a.com", title="A", snippet="S")
+    _, citations = _build_claims_from_citations([a])
+    assert citations[0] is a
+
+
+def test_models_are_slotted_and_round_trip():
+    from models import to_payload
+    c = Citation(url="https://a.com", title="A", snippet="S")
+    cl = Claim(id="cl-0", text="S", citation_ids=[0], confidence=0.85)
+    assert not hasattr(c, "__dict__") and not hasattr(cl, "__dict__")
+    assert Citation.from_dict(c.to_dict()) == c
+    assert Claim.from_dict(cl.to_dict()) == cl
+    assert Claim(id="x", text="t").to_dict()["confidence"] is None
+    payload = to_payload({"session_id": "s", "claims": [cl], "citations": [c, {"url": "plain"}]})
+    assert payload["claims"] == [{"id": "cl-0", "text": "S", "stance": "neutral", "citation_ids": [0], "confidence": 0.85}]
+    assert payload["citations"][0]["url"] == "https://a.com"
+    assert payload["citations"][1] == {"url": "plain"}
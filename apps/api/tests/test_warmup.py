@@ -0,0 +1,115 @@
+"""Unit tests for cold-start work: deferred imports, warm-up, snapshot priming and /ready."""
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+import claim_extraction
+from claim_index import ClaimIndex
+from main import app
+from shared_state import MemoryState
+from warmup import prime_from_snapshot, warm_up
+from you_client import YouClient, search_cache_entry, search_cache_key
+
+API_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+
+def _write_snapshot(path, sessions):
+    with open(path, "w") as f:
+        for s in sessions:
+            f.write((s if isinstance(s, str) else json.dumps(s)) + "\n")
+
+
+def test_import_main_defers_heavy_optional_modules():
+    code = "import sys, main; print(sorted(m for m in ('httpx', 'reportlab') if m in sys.modules))"
+    env = {**os.environ, "YOU_STUB": "true", "SANITY_PROJECT_ID": "", "SANITY_TOKEN": ""}
+    out = subprocess.run([sys.executable, "-c", code], cwd=API_DIR, env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_warm_up_reports_steps():
+    report = warm_up(MemoryState(), you_client=YouClient(stub=True), snapshot_path="")
+    assert {"embedder", "claim_ranker"} <= set(report["steps_ms"])
+    assert "http_stack" not in report["steps_ms"]
+    assert report["total_ms"] >= 0
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def test_prime_from_snapshot_seeds_search_cache(tmp_path):
+    state = MemoryState()
+    path = str(tmp_path / "warmup.ndjson")
+    existing = search_cache_entry([{"url": "https://kept.com"}])
+    state.set(search_cache_key("Q1"), existing)
+    now = _iso(time.time())
+    _write_snapshot(path, [
+        {"question": "Q0", "created_at": now,
+         "citations": [{"url": "https://a.com", "title": "A", "snippet": "Asyncio runs an event loop."}]},
+        "not json",
+        {"question": "Q1", "created_at": now, "citations": [{"url": "https://b.com"}]},
+        {"question": "", "created_at": now, "citations": [{"url": "https://c.com"}]},
+        {"question": "Q3", "created_at": now, "citations": [{"url": "https://d.com"}]},
+    ])
+    assert prime_from_snapshot(path, state, max_sessions=2) == 2
+    assert orjson.loads(state.get(search_cache_key("Q0")))["citations"][0]["url"] == "https://a.com"
+    assert state.get(search_cache_key("Q1")) == existing  # fresher cache entries win
+    assert state.get(search_cache_key("Q3")) is None  # past max_sessions
+
+
+def test_prime_keeps_session_age_and_skips_index_claims(tmp_path):
+    state, model = MemoryState(), claim_extraction.BM25Model()
+    index = ClaimIndex(str(tmp_path / "index"))
+    index.add(["Indexed claim text."], [{"url": "https://index.com"}])
+    path = str(tmp_path / "warmup.ndjson")
+    created = time.time() - 100
+    search = {"url": "https://a.com", "title": "A", "snippet": "Asyncio runs an event loop."}
+    _write_snapshot(path, [
+        {"question": "recent", "created_at": _iso(created), "reused_claims": 1, "citations": [
+            {"url": "https://reused.com", "snippet": "A reused claim."}, search]},
+        {"question": "sanity", "created_at": _iso(created), "citations": [
+            {"url": "https://index.com", "snippet": "Indexed claim text."}, search]},
+        {"question": "old", "created_at": _iso(created - 10_000), "citations": [search]},
+        {"question": "undated", "citations": [search]},
+    ])
+    before = claim_extraction._model.n_docs
+    assert prime_from_snapshot(path, state, ttl=300, stale_ttl=3600, model=model, claim_index=index) == 2
+    for question in ("recent", "sanity"):
+        entry = orjson.loads(state.get(search_cache_key(question)))
+        assert entry["citations"] == [search] and entry["at"] == pytest.approx(created)
+    assert state.get(search_cache_key("old")) is None and state.get(search_cache_key("undated")) is None
+    assert model.n_docs > 0 and claim_extraction._model.n_docs == before  # merged by the caller
+
+
+def _wait_ready(client):
+    deadline = time.time() + 5
+    r = client.get("/ready")
+    while r.status_code != 200 and time.time() < deadline:
+        time.sleep(0.01)
+        r = client.get("/ready")
+    return r
+
+
+def test_ready_turns_200_after_warm_up():
+    with TestClient(app) as client:
+        r = _wait_ready(client)
+        assert r.status_code == 200
+        assert r.json()["status"] == "ready"
+        assert "steps_ms" in r.json()["warmup"]
+        assert client.get("/health").status_code == 200
+
+
+def test_ready_is_503_while_warming():
+    with TestClient(app) as client:
+        _wait_ready(client)
+        app.state.ready = False
+        r = client.get("/ready")
+        assert r.status_code == 503
+        assert r.json() == {"status": "warming"}
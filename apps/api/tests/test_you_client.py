@@ -12,27 +12,27 @@ def test_normalize_citation():
         "source": "Example",
     }
     c = _normalize_citation(raw)
-    assert c["title"] == "My Title"
-    assert c["url"] == "https://example.com"
-    assert c["snippet"] == "A snippet."
-    assert c["published_at"] == "2024-01-01"
-    assert c["source_name"] == "Example"
+    assert c.title == "My Title"
+    assert c.url == "https://example.com"
+    assert c.snippet == "A snippet."
+    assert c.published_at == "2024-01-01"
+    assert c.source_name == "Example"
 
 
 def test_normalize_citation_alternate_keys():
     raw = {"name": "Name", "link": "https://link.com", "description": "Desc", "date": "2023-01-01"}
     c = _normalize_citation(raw)
-    assert c["title"] == "Name"
-    assert c["url"] == "https://link.com"
-    assert c["snippet"] == "Desc"
-    assert c["published_at"] == "2023-01-01"
+    assert c.title == "Name"
+    assert c.url == "https://link.com"
+    assert c.snippet == "Desc"
+    assert c.published_at == "2023-01-01"
 
 
 def test_normalize_citation_missing_fields():
     c = _normalize_citation({})
-    assert c["title"] == ""
-    assert c["url"] == ""
-    assert c["snippet"] == ""
+    assert c.title == ""
+    assert c.url == ""
+    assert c.snippet == ""
 
 
 def test_stub_mode_search_returns_list():
@@ -40,9 +40,9 @@ def test_stub_mode_search_returns_list():
     assert isinstance(result, list)
     assert len(result) >= 1
     for item in result:
-        assert "url" in item
-        assert "title" in item
-        assert "snippet" in item
+        assert item.url
+        assert item.title
+        assert item.snippet
 
 
 def test_you_client_stub_returns_same_shape():
@@ -57,6 +57,6 @@ async def test_you_client_search_stub_returns_citations():
     assert isinstance(citations, list)
     assert len(citations) == 3
     for c in citations:
-        assert "url" in c and c["url"].startswith("http")
-        assert "title" in c
-        assert "snippet" in c
+        assert c.url.startswith("http")
+        assert c.title
+        assert c.snippet
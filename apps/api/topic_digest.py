@@ -0,0 +1,187 @@
+"""
+Per-topic digests maintained incrementally as sessions are persisted, served by
+GET /topic/{topic}/digest without touching Sanity.
+A digest holds rolling reliability statistics (Welford mean/variance, EWMA trend), the
+top sources by citation count (Misra-Gries heavy hitters, bounded memory), the latest
+sessions and claim-cluster representatives (greedy clustering on the claim embeddings).
+Digests live in the shared state tier, so every replica updates and serves the same one:
+the working state under digest:{slug} and the encoded response under digest:{slug}:view.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+import orjson
+
+from embeddings import hash_embed
+from models import to_payload
+
+DIGEST_LATEST = int(os.environ.get("DIGEST_LATEST", "20"))
+DIGEST_TOP_SOURCES = 10
+DIGEST_SOURCE_SLOTS = 64     # Misra-Gries counters kept per topic (>= DIGEST_TOP_SOURCES)
+DIGEST_CLUSTERS = 16         # claim clusters kept per topic (smallest evicted)
+DIGEST_CLUSTER_MIN_SIM = 0.6
+DIGEST_EWMA_ALPHA = 0.2
+DIGEST_LOCK_TTL = 5.0
+DIGEST_LOCK_WAIT = 1.0
+
+
+def topic_slug(topic: Optional[str]) -> str:
+    """Same slug the Sanity store uses for topics."""
+    return (topic or "general").replace(" ", "-").lower()[:50]
+
+
+def _empty(slug: str) -> dict:
+    return {
+        "topic": slug,
+        "reliability": {"count": 0, "mean": 0.0, "m2": 0.0, "ewma": 0.0, "min": None, "max": None},
+        "sources": {},
+        "latest": [],
+        "clusters": [],
+        "updated_at": None,
+    }
+
+
+_rep_vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+_rep_vectors_lock = threading.Lock()  # updates run concurrently in the persistence threadpool
+
+
+def _vectors(texts: list[str]) -> np.ndarray:
+    """Embeddings of cluster representatives, memoized (they recur on every update)."""
+    with _rep_vectors_lock:
+        known = {t: _rep_vectors[t] for t in texts if t in _rep_vectors}
+    missing = [t for t in dict.fromkeys(texts) if t not in known]
+    if missing:
+        fresh = dict(zip(missing, hash_embed(missing)))  # embedded outside the lock
+        known.update(fresh)
+        with _rep_vectors_lock:
+            _rep_vectors.update(fresh)
+            while len(_rep_vectors) > 4096:
+                _rep_vectors.popitem(last=False)
+    return np.stack([known[t] for t in texts])
+
+
+def _update_reliability(r: dict, score: float) -> None:
+    r["count"] += 1
+    delta = score - r["mean"]
+    r["mean"] += delta / r["count"]
+    r["m2"] += delta * (score - r["mean"])
+    r["ewma"] = score if r["count"] == 1 else r["ewma"] + DIGEST_EWMA_ALPHA * (score - r["ewma"])
+    r["min"] = score if r["min"] is None else min(r["min"], score)
+    r["max"] = score if r["max"] is None else max(r["max"], score)
+
+
+def _update_sources(sources: dict, citations: list[dict], claims: list[dict]) -> None:
+    """Count claims citing each URL; Misra-Gries decrement when the table is full."""
+    for cl in claims:
+        for i in cl.get("citation_ids") or []:
+            if not (isinstance(i, int) and 0 <= i < len(citations)):
+                continue
+            url = citations[i].get("url")
+            if not url:
+                continue
+            if url in sources:
+                sources[url]["n"] += 1
+            elif len(sources) < DIGEST_SOURCE_SLOTS:
+                sources[url] = {"n": 1, "title": citations[i].get("title") or ""}
+            else:
+                for key in list(sources):
+                    sources[key]["n"] -= 1
+                    if sources[key]["n"] <= 0:
+                        del sources[key]
+
+
+def _update_clusters(clusters: list[dict], claims: list[dict], session_id: str) -> None:
+    texts = [c.get("text") for c in claims if c.get("text")]
+    if not texts:
+        return
+    vectors = hash_embed(texts)
+    for text, v in zip(texts, vectors):
+        if clusters:
+            sims = _vectors([c["text"] for c in clusters]) @ v
+            best = int(np.argmax(sims))
+            if sims[best] >= DIGEST_CLUSTER_MIN_SIM:
+                clusters[best]["size"] += 1
+                clusters[best]["sessions"] = clusters[best]["sessions"][-4:] + [session_id]
+                continue
+        if len(clusters) >= DIGEST_CLUSTERS:
+            clusters.remove(min(clusters, key=lambda c: c["size"]))
+        clusters.append({"text": text, "size": 1, "sessions": [session_id]})
+
+
+def apply_result(digest: dict, result: dict, latest: int = DIGEST_LATEST) -> dict:
+    """Fold one verification result into a digest (in place; returned for chaining)."""
+    payload = to_payload(result)
+    score = float(payload.get("reliability_score") or 0.0)
+    _update_reliability(digest["reliability"], score)
+    _update_sources(digest["sources"], payload["citations"], payload["claims"])
+    _update_clusters(digest["clusters"], payload["claims"], payload.get("session_id") or "")
+    digest["latest"] = [{
+        "session_id": payload.get("session_id"),
+        "question": payload.get("question"),
+        "answer": payload.get("answer"),
+        "reliability_score": score,
+        "created_at": payload.get("created_at"),
+    }] + [s for s in digest["latest"] if s["session_id"] != payload.get("session_id")][:latest - 1]
+    digest["updated_at"] = payload.get("created_at")
+    return digest
+
+
+def render(digest: dict) -> dict:
+    """Public view of a digest: the shape GET /topic/{topic}/digest returns."""
+    r = digest["reliability"]
+    std = (r["m2"] / (r["count"] - 1)) ** 0.5 if r["count"] > 1 else 0.0
+    clusters = sorted(digest["clusters"], key=lambda c: -c["size"])
+    top = sorted(digest["sources"].items(), key=lambda kv: -kv[1]["n"])[:DIGEST_TOP_SOURCES]
+    return {
+        "topic": digest["topic"],
+        "sessions": r["count"],
+        "reliability": {
+            "mean": round(r["mean"], 4),
+            "stddev": round(std, 4),
+            "ewma": round(r["ewma"], 4),
+            "trend": round(r["ewma"] - r["mean"], 4),
+            "min": r["min"],
+            "max": r["max"],
+        },
+        "consensus": clusters[0]["text"] if clusters else None,
+        "top_sources": [{"url": url, "title": s["title"], "citation_count": s["n"]} for url, s in top],
+        "claim_clusters": [{"text": c["text"], "size": c["size"], "sessions": c["sessions"]} for c in clusters],
+        "latest": digest["latest"],
+        "updated_at": digest["updated_at"],
+    }
+
+
+class DigestStore:
+    """Read-modify-write of topic digests in the shared state tier under a per-topic lock."""
+
+    def __init__(self, state, latest: int = DIGEST_LATEST):
+        self.state = state
+        self.latest = latest
+
+    def update(self, result: dict) -> None:
+        """Blocking: may wait up to DIGEST_LOCK_WAIT for another writer of the same topic."""
+        slug = topic_slug(result.get("topic"))
+        key = f"digest:{slug}"
+        token = self.state.acquire(key, DIGEST_LOCK_TTL)
+        give_up = time.monotonic() + DIGEST_LOCK_WAIT
+        while token is None and time.monotonic() < give_up:
+            time.sleep(0.002)
+            token = self.state.acquire(key, DIGEST_LOCK_TTL)
+        # Still no lock: update anyway (last writer wins) rather than drop the session
+        try:
+            raw = self.state.get(key)
+            digest = orjson.loads(raw) if raw is not None else _empty(slug)
+            apply_result(digest, result, self.latest)
+            self.state.set(key, orjson.dumps(digest))
+            self.state.set(f"{key}:view", orjson.dumps(render(digest)))
+        finally:
+            if token is not None:
+                self.state.release(key, token)
+
+    def get(self, topic: str) -> Optional[bytes]:
+        """Encoded digest for a topic, or None when no session has been recorded for it."""
+        return self.state.get(f"digest:{topic_slug(topic)}:view")
@@ -0,0 +1,158 @@
+"""
+Opt-in traffic recorder for /verify (TRAFFIC_RECORD_PATH). Each sampled request and every
+raw You.com response it triggered (with upstream latency and status) are appended to a
+compact log that benchmarks/replay.py replays against a fake upstream.
+Log format: frames of <u32 length><u32 crc32><zlib(NDJSON records)>, written by a
+background thread every TRAFFIC_RECORD_BATCH records or second, so a crash loses at most
+the last frame and readers skip a torn tail. Questions and response bodies are scrubbed
+of e-mail addresses, phone and card numbers and IP addresses before they are written;
+JSON bodies are scrubbed string by string, so they stay valid JSON for replay.
+"""
+import contextvars
+import os
+import queue
+import random
+import re
+import struct
+import threading
+import time
+import uuid
+import zlib
+from typing import Iterator, Optional
+
+import orjson
+
+TRAFFIC_RECORD_PATH = os.environ.get("TRAFFIC_RECORD_PATH", "")
+TRAFFIC_RECORD_SAMPLE = float(os.environ.get("TRAFFIC_RECORD_SAMPLE", "1.0"))
+TRAFFIC_RECORD_BATCH = 64
+FLUSH_INTERVAL = 1.0
+_HEADER = struct.Struct("<II")
+
+_PII = (
+    (re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"), "<email>"),
+    (re.compile(r"(?<![\w.])(?:\d[ -]?){12,18}\d(?![\w.])"), "<card>"),
+    (re.compile(r"(?<![\w.])(?:\+\d{1,3}[ .-]?)?(?:\(\d{3}\)\s?|\d{3}[ .-])\d{3}[ .-]\d{4}(?![\w.])"), "<phone>"),
+    (re.compile(r"(?<![\w.])\d{1,3}(?:\.\d{1,3}){3}(?![\w.])"), "<ip>"),
+)
+
+# Request id of the /verify being recorded ("" = not sampled; None = outside a request)
+_recording: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("traffic_rid", default=None)
+
+
+def scrub(text: str) -> str:
+    """Replace personal data in free text (questions, raw response bodies) with placeholders."""
+    for pattern, placeholder in _PII:
+        text = pattern.sub(placeholder, text)
+    return text
+
+
+def _scrub_strings(value):
+    if isinstance(value, str):
+        return scrub(value)
+    if isinstance(value, list):
+        return [_scrub_strings(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _scrub_strings(v) for k, v in value.items()}
+    return value  # numbers (timestamps, ids) are not personal data patterns
+
+
+def scrub_body(body: str) -> str:
+    """scrub() for a response body: the string leaves of a JSON body (re-serialized), or the
+    whole text when it is not JSON."""
+    try:
+        parsed = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return scrub(body)
+    return orjson.dumps(_scrub_strings(parsed)).decode()
+
+
+class TrafficRecorder:
+    def __init__(self, path: str, sample: float = TRAFFIC_RECORD_SAMPLE, batch: int = TRAFFIC_RECORD_BATCH):
+        self.path = path
+        self.sample = sample
+        self.batch = batch
+        self.recorded = 0
+        self._q: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._run, name="traffic-recorder", daemon=True)
+        self._writer.start()
+
+    def begin(self) -> Optional[str]:
+        """Start recording the current /verify (sampled); returns its request id or None."""
+        rid = uuid.uuid4().hex[:16] if random.random() < self.sample else ""
+        _recording.set(rid)
+        return rid or None
+
+    def record_verify(self, rid: Optional[str], request: dict, latency_ms: float, status: int) -> None:
+        if not rid:
+            return
+        self._put({
+            "t": "verify",
+            "rid": rid,
+            "ts": time.time() - latency_ms / 1000,  # arrival time
+            "request": {**request, "question": scrub(request.get("question") or "")},
+            "latency_ms": round(latency_ms, 2),
+            "status": status,
+        })
+
+    def record_search(self, query: str, latency_ms: float, status: int, body: str) -> None:
+        """Raw upstream exchange; status 0 means no response (timeout, connection error)."""
+        rid = _recording.get()
+        if rid == "":
+            return  # inside an unsampled request
+        self._put({
+            "t": "search",
+            "rid": rid,
+            "ts": time.time() - latency_ms / 1000,
+            "query": scrub(query),
+            "latency_ms": round(latency_ms, 2),
+            "status": status,
+            "body": scrub_body(body),
+        })
+
+    def _put(self, record: dict) -> None:
+        self.recorded += 1
+        self._q.put(orjson.dumps(record))
+
+    def _run(self) -> None:
+        pending: list[bytes] = []
+        last_flush = time.monotonic()
+        closing = False
+        while not closing:
+            try:
+                item = self._q.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                item = b""
+            if item is None:
+                closing = True
+            elif item:
+                pending.append(item)
+            due = closing or len(pending) >= self.batch or time.monotonic() - last_flush >= FLUSH_INTERVAL
+            if pending and due:
+                self._write_frame(pending)
+                pending = []
+                last_flush = time.monotonic()
+
+    def _write_frame(self, records: list[bytes]) -> None:
+        payload = zlib.compress(b"\n".join(records), 6)
+        with open(self.path, "ab") as f:
+            f.write(_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush buffered records and stop the writer."""
+        self._q.put(None)
+        self._writer.join(timeout)
+
+
+def read_records(path: str) -> Iterator[dict]:
+    """Records in write order; stops at a truncated or corrupt frame (torn tail)."""
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            size, crc = _HEADER.unpack(header)
+            payload = f.read(size)
+            if len(payload) < size or zlib.crc32(payload) != crc:
+                return
+            for line in zlib.decompress(payload).split(b"\n"):
+                yield orjson.loads(line)
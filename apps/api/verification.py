@@ -2,60 +2,81 @@
 Verification pipeline: search -> normalize citations -> build claims -> reliability score -> persist.
 Execute: generate code snippet / PDF report / config from session (in-memory only).
 """
+import asyncio
+import math
 import uuid
 import base64
 from io import BytesIO
 from datetime import datetime, timezone
 
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet
+from models import Citation, Claim
+from claim_extraction import BM25Model, extract_claim_sentences, truncate_sentences
+from deadline import Deadline
+from embeddings import EmbeddingUnavailable
+from profiling import stage
 
 RELIABILITY_THRESHOLD = 0.65
+PRIOR_COVERAGE = 5  # prior claims needed to skip the upstream search
+MAX_CLAIMS = 10
+SEARCH_TIMEOUT = 15.0  # upstream cap, same as YouClient's HTTP timeout
+# Budget (seconds) the stages after search need; search gets whatever is left beyond it
+POST_SEARCH_RESERVE = 0.15
+CLAIM_REUSE_MIN_BUDGET = 0.05
+EXTRACTION_MIN_BUDGET = 0.02  # below this: no ranking, sentence-truncated snippets
+EXTRACTION_FULL_BUDGET = 0.1  # below this: rank only the first REDUCED_SOURCES sources
+REDUCED_SOURCES = 20
+ENRICHMENT_MIN_BUDGET = 0.2  # page fetches are skipped below this (beyond the extraction reserve)
+STALE_PENALTY = 0.05  # reliability cost of search results served past their freshness TTL
 
 
-def _build_claims_from_citations(citations: list[dict]) -> tuple[list[dict], list[dict]]:
-    """Convert citations into short factual claims and dedupe citations by url."""
+def _build_claims_from_citations(
+    citations: list[Citation], question: str = "", max_sources: int | None = None,
+    passages: dict[str, str] | None = None, model: BM25Model | None = None,
+) -> tuple[list[Claim], list[Citation]]:
+    """Convert citations into short factual claims and dedupe citations by url.
+    Unique citations are kept as-is (no copy); claims reference them by index.
+    With a question, every source is split into sentences and its top-ranked ones become
+    claims (best sentence of each source first); otherwise the first sources give one
+    sentence-truncated claim each. max_sources limits how many sources are ranked.
+    passages (url -> page text from enrichment) replace the snippet of those sources.
+    model overrides the process-wide BM25 statistics (see extract_claim_sentences)."""
     seen_urls = set()
     unique_citations = []
-    url_to_idx = {}
     for c in citations:
-        url = c.get("url", "")
-        if not url or url in seen_urls:
+        if not c.url or c.url in seen_urls:
             continue
-        seen_urls.add(url)
-        url_to_idx[url] = len(unique_citations)
-        unique_citations.append({
-            "title": c.get("title", ""),
-            "url": url,
-            "snippet": c.get("snippet", ""),
-            "published_at": c.get("published_at"),
-            "source_name": c.get("source_name"),
-        })
-
-    claims = []
-    for i, c in enumerate(unique_citations[:10]):
-        snippet = (c.get("snippet") or "")[:200]
-        if not snippet:
-            snippet = c.get("title", "No snippet")
-        claim_id = f"cl-{i}"
-        claims.append({
-            "id": claim_id,
-            "text": snippet,
-            "stance": "neutral",
-            "citation_ids": [i],
-            "confidence": 0.85,
-        })
+        seen_urls.add(c.url)
+        unique_citations.append(c)
+
+    if not question:
+        claims = []
+        for i, c in enumerate(unique_citations[:MAX_CLAIMS]):
+            snippet = truncate_sentences(c.snippet) or c.title or "No snippet"
+            claims.append(Claim(f"cl-{i}", snippet, "neutral", [i], 0.85))
+        return claims, unique_citations
+
+    passages = passages or {}
+    picks = extract_claim_sentences(
+        question, [passages.get(c.url) or c.snippet or c.title for c in unique_citations[:max_sources]], model=model,
+    )
+    ranked = sorted(
+        ((rank, -score, i, text) for i, source in enumerate(picks) for rank, (text, score) in enumerate(source)),
+    )[:MAX_CLAIMS]
+    claims = [Claim(f"cl-{n}", text, "neutral", [i], 0.85) for n, (_, _, i, text) in enumerate(ranked)]
     return claims, unique_citations
 
 
-def _compute_reliability(claims: list[dict], citations: list[dict]) -> float:
-    """Simple reliability: more claims + more citations -> higher score. Cap at 0.95."""
-    n_claims = max(len(claims), 1)
+def _compute_reliability(claims: list[Claim], citations: list[Citation], stale: bool = False) -> float:
+    """Simple reliability: more claims + more citations -> higher score. Cap at 0.95.
+    Claims count once per distinct evidence, so splitting a source into sentences adds nothing.
+    Stale search results cost STALE_PENALTY."""
+    n_claims = max(len({tuple(c.citation_ids) for c in claims}), 1)
     n_citations = max(len(citations), 1)
     score = 0.3 + 0.3 * min(n_claims / 5, 1) + 0.3 * min(n_citations / 5, 1)
-    avg_conf = sum(c.get("confidence", 0.8) for c in claims) / n_claims
+    avg_conf = sum(0.8 if c.confidence is None else c.confidence for c in claims) / max(len(claims), 1)
     score += 0.1 * avg_conf
+    if stale:
+        score -= STALE_PENALTY
     return round(min(score, 0.95), 2)
 
 
@@ -65,23 +86,55 @@ async def run_verification_pipeline(
     topic: str | None,
     you_client,
     sanity_store,
+    claim_index=None,
+    prior_coverage: int = PRIOR_COVERAGE,
+    deadline: Deadline | None = None,
+    semantic_cache=None,
+    enricher=None,
+    embedder=None,
 ) -> dict:
-    """Run You.com search -> claims -> reliability -> build response."""
-    raw_citations = await you_client.search(question)
-    claims, citations = _build_claims_from_citations(raw_citations)
-    reliability_score = _compute_reliability(claims, citations)
+    """Run You.com search -> claims -> reliability -> build response.
+    With a semantic_cache, a fresh result for a similar question on the same topic supplies
+    the claims and citations (cached_from names its session) and nothing else runs.
+    With a claim_index, prior verified claims for the question are reused and the
+    upstream search is skipped when they already cover it.
+    With an enricher, the cited pages' main text replaces their snippets for extraction.
+    With an embedder (EmbeddingBatcher), the question is embedded once, batched with other
+    requests, for both the semantic cache and claim reuse; when it fails both are skipped.
+    With a deadline, each stage fits its work into the remaining budget; stages that had to
+    cut work are listed in degraded_stages."""
+    deadline = deadline or Deadline()
+    topic_key = topic or "general"
+    cached = None
+    query_vector = None
+    if embedder is not None and (semantic_cache is not None or claim_index):
+        with stage("embedding"):
+            query_vector = await _embed_within(embedder, question, deadline)
+        if query_vector is None:
+            semantic_cache = claim_index = None  # the stores' own model may be another vector space
+    if semantic_cache is not None:
+        with stage("semantic_cache"):
+            cached = semantic_cache.lookup(question, topic_key, vector=query_vector)
+    if cached:
+        entry, _ = cached
+        claims, citations, reused, stale = entry["claims"], entry["citations"], 0, False
+    else:
+        claims, citations, reused, stale = await _gather_evidence(
+            question, topic_key, you_client, claim_index, prior_coverage, deadline, enricher, query_vector
+        )
+    reliability_score = _compute_reliability(claims, citations, stale)
     can_execute = reliability_score >= RELIABILITY_THRESHOLD and mode == "execute"
     session_id = str(uuid.uuid4())
 
     # Build a short answer from top claim snippets
-    answer_parts = [c.get("text", "")[:150] for c in claims[:3] if c.get("text")]
+    answer_parts = [c.text[:150] for c in claims[:3] if c.text]
     answer = " ".join(answer_parts).strip() or "Insufficient evidence to form a confident answer."
 
     next_question = None
     if not can_execute and mode == "execute":
         next_question = "Reliability is below threshold. Could you narrow your question or add context so we can gather more evidence?"
 
-    return {
+    result = {
         "session_id": session_id,
         "question": question,
         "answer": answer,
@@ -91,8 +144,99 @@ async def run_verification_pipeline(
         "can_execute": can_execute,
         "next_question": next_question,
         "topic": topic or "general",
+        "mode": mode,
+        "reused_claims": reused,
+        "stale": stale,
+        "degraded_stages": deadline.degraded,
+        "cached_from": cached[0]["session_id"] if cached else None,
         "created_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
     }
+    if semantic_cache is not None and not cached:
+        semantic_cache.add(question, topic_key, result, vector=query_vector)
+    return result
+
+
+async def _gather_evidence(
+    question: str, topic: str, you_client, claim_index, prior_coverage: int, deadline: Deadline, enricher=None,
+    query_vector=None,
+) -> tuple[list[Claim], list[Citation], int, bool]:
+    """Claim reuse -> search -> enrichment -> extraction: (claims, citations, reused claims,
+    stale results)."""
+    prior = []
+    if claim_index:
+        if deadline.remaining() >= CLAIM_REUSE_MIN_BUDGET:
+            with stage("claim_reuse"):
+                prior = await asyncio.to_thread(claim_index.related_citations, question, topic=topic, vector=query_vector)
+        else:
+            deadline.degrade("claim_reuse")
+    stale = False
+    if len(prior) >= prior_coverage:
+        raw_citations = prior
+    else:
+        with stage("search"):
+            results = await _search_within(you_client, question, deadline)
+        # CachedYouClient flags results served past their TTL and cached upstream failures
+        stale = getattr(results, "stale", False)
+        if getattr(results, "error", None):
+            deadline.degrade("search")
+        raw_citations = prior + results
+
+    passages = None
+    if enricher is not None and raw_citations:
+        with stage("enrichment"):
+            passages = await _enrich_within(enricher, question, raw_citations, deadline)
+
+    remaining = deadline.remaining()
+    with stage("extraction"):
+        if remaining < EXTRACTION_MIN_BUDGET:
+            deadline.degrade("extraction")
+            claims, citations = _build_claims_from_citations(raw_citations)
+        elif remaining < EXTRACTION_FULL_BUDGET and len(raw_citations) > REDUCED_SOURCES:
+            deadline.degrade("extraction")
+            claims, citations = _build_claims_from_citations(raw_citations, question, REDUCED_SOURCES, passages)
+        else:
+            claims, citations = _build_claims_from_citations(raw_citations, question, passages=passages)
+    return claims, citations, len(prior), stale
+
+
+async def _search_within(you_client, question: str, deadline: Deadline) -> list[Citation]:
+    """Upstream search bounded by the budget; no results (stage degraded) when it cannot fit."""
+    timeout = deadline.timeout(SEARCH_TIMEOUT, reserve=POST_SEARCH_RESERVE)
+    if timeout <= 0:
+        deadline.degrade("search")
+        return []
+    try:
+        return await asyncio.wait_for(you_client.search(question), None if math.isinf(timeout) else timeout)
+    except asyncio.TimeoutError:
+        deadline.degrade("search")
+        return []
+
+
+async def _embed_within(embedder, question: str, deadline: Deadline):
+    """The question's vector from the embedder, or None (stage degraded) when it failed or
+    did not fit the budget left before search."""
+    timeout = deadline.timeout(embedder.timeout + embedder.wait, reserve=POST_SEARCH_RESERVE)
+    if timeout <= 0:
+        deadline.degrade("embedding")
+        return None
+    try:
+        return (await asyncio.wait_for(embedder.embed([question]), timeout))[0]
+    except (asyncio.TimeoutError, EmbeddingUnavailable):
+        deadline.degrade("embedding")
+        return None
+
+
+async def _enrich_within(enricher, question: str, citations: list[Citation], deadline: Deadline) -> dict[str, str]:
+    """Source-page passages fetched within the budget left before extraction (stage degraded
+    when the budget, not the enricher's own timeout, cut fetches short)."""
+    budget = deadline.timeout(enricher.timeout, reserve=EXTRACTION_FULL_BUDGET)
+    if budget < ENRICHMENT_MIN_BUDGET:
+        deadline.degrade("enrichment")
+        return {}
+    passages, cut = await enricher.enrich(question, citations, budget)
+    if cut and budget < enricher.timeout:
+        deadline.degrade("enrichment")
+    return passages
 
 
 def run_execute(session: dict, action_type: str) -> dict:
@@ -115,6 +259,11 @@ def run_execute(session: dict, action_type: str) -> dict:
 
     if action_type == "pdf_report":
         logs.append("Generating PDF report.")
+        # reportlab is imported on first use: most pods never render a PDF
+        from reportlab.lib.pagesizes import letter
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+        from reportlab.lib.styles import getSampleStyleSheet
+
         buf = BytesIO()
         doc = SimpleDocTemplate(buf, pagesize=letter)
         styles = getSampleStyleSheet()
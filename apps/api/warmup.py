@@ -0,0 +1,119 @@
+"""
+Warm-up for API pods: runs once in the background at startup, before /ready reports ready.
+Loads what the first real request would otherwise pay for (HTTP stack for live upstreams,
+numpy paths of the embedder and claim ranker, claim index and analytics snapshot pages) and,
+with WARMUP_SNAPSHOT set, primes the search cache and claim ranker from an NDJSON file of
+past sessions (the /topic/{topic}/export format).
+Primed search results keep the session's age: they are cached as fetched at its created_at
+and sessions past the stale window are skipped. Citations made from reused index claims are
+not search results and are left out. Ranker statistics go into a model of their own, which
+the caller merges into the process-wide one (merge_statistics) on the event loop.
+"""
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+import orjson
+
+from claim_extraction import BM25Model, extract_claim_sentences
+from embeddings import hash_embed
+from you_client import search_cache_entry, search_cache_key, SEARCH_CACHE_TTL, SEARCH_STALE_TTL
+
+WARMUP_SNAPSHOT = os.environ.get("WARMUP_SNAPSHOT", "")
+WARMUP_MAX_SESSIONS = int(os.environ.get("WARMUP_MAX_SESSIONS", "5000"))
+
+
+def _created_ts(session: dict) -> Optional[float]:
+    try:
+        return datetime.fromisoformat((session.get("created_at") or "").replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def _search_citations(session: dict, claim_index=None) -> list[dict]:
+    """The session's citations that came from search: reused index claims lead the list
+    (reused_claims of them), and the index itself knows the rest (e.g. Sanity exports)."""
+    citations = (session.get("citations") or [])[session.get("reused_claims") or 0:]
+    if claim_index is not None:
+        citations = [c for c in citations if not claim_index.contains(c.get("url") or "", c.get("snippet") or "")]
+    return citations
+
+
+def prime_from_snapshot(
+    path: str,
+    state,
+    max_sessions: int = WARMUP_MAX_SESSIONS,
+    ttl: float = SEARCH_CACHE_TTL,
+    stale_ttl: float = SEARCH_STALE_TTL,
+    model: Optional[BM25Model] = None,
+    claim_index=None,
+) -> int:
+    """Seed the search cache (entries not already cached) and the claim ranker's statistics
+    (model) and per-snippet cache from exported sessions. Returns the number of sessions read."""
+    model = model or BM25Model()
+    now = time.time()
+    n = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if n >= max_sessions:
+                break
+            try:
+                session = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                continue
+            question = session.get("question") or ""
+            citations = _search_citations(session, claim_index)
+            created = _created_ts(session)
+            if not question or not citations or created is None:
+                continue
+            remaining = created + ttl + stale_ttl - now
+            if remaining <= 0:
+                continue  # too old to be served even stale
+            key = search_cache_key(question)
+            if state.get(key) is None:
+                state.set(key, search_cache_entry(citations, fetched_at=created), remaining)
+            extract_claim_sentences(question, [c.get("snippet") or c.get("title") or "" for c in citations], model=model)
+            n += 1
+    return n
+
+
+def warm_up(
+    state,
+    you_client=None,
+    sanity=None,
+    claim_index=None,
+    analytics=None,
+    snapshot_path: str = WARMUP_SNAPSHOT,
+    max_sessions: int = WARMUP_MAX_SESSIONS,
+    model: Optional[BM25Model] = None,
+) -> dict:
+    """Blocking warm-up; returns per-step timings in ms (run it in a thread). Snapshot ranker
+    statistics are collected in model, for the caller to merge."""
+    steps: dict[str, float] = {}
+
+    def step(name: str, fn) -> None:
+        t = time.perf_counter()
+        fn()
+        steps[name] = round((time.perf_counter() - t) * 1000, 2)
+
+    if (you_client is not None and not you_client.stub) or (sanity is not None and sanity.enabled):
+        step("http_stack", lambda: __import__("httpx"))
+    step("embedder", lambda: hash_embed(["warm up the embedder"]))
+    step("claim_ranker", lambda: extract_claim_sentences(
+        "warm up", ["The ranker is warmed up with one sentence."], model=BM25Model()
+    ))
+    if claim_index is not None:
+        step("claim_index", lambda: claim_index.search("warm up", k=1))
+    if analytics is not None:
+        step("analytics_snapshot", analytics.current)
+    report: dict = {"steps_ms": steps}
+    if snapshot_path:
+        t = time.perf_counter()
+        report["snapshot_sessions"] = prime_from_snapshot(
+            snapshot_path, state, max_sessions, model=model, claim_index=claim_index,
+        )
+        steps["snapshot"] = round((time.perf_counter() - t) * 1000, 2)
+    report["total_ms"] = round(sum(steps.values()), 2)
+    return report
+
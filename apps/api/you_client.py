@@ -2,18 +2,27 @@
 You.com API client for live web search with citations.
 Supports stubbed mode when YOU_API_KEY is not set (for local/dev).
 """
+import asyncio
 import os
 import hashlib
+import time
 import uuid
 from typing import Optional
 
-import httpx
+import orjson
+
+from models import Citation
+from shared_state import run_state
 
-# Normalized citation as used across the app
-Citation = dict  # { title, url, snippet, published_at?, source_name? }
 STUB_MODE = os.environ.get("YOU_STUB", "true").lower() in ("1", "true", "yes")
 YOU_API_KEY = os.environ.get("YOU_API_KEY", "")
-YOU_BASE = "https://api.you.com/v1"
+YOU_BASE = os.environ.get("YOU_BASE_URL", "https://api.you.com/v1")
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", "300"))
+# How long past SEARCH_CACHE_TTL a result may still be served (stale) while it is refreshed
+SEARCH_STALE_TTL = float(os.environ.get("SEARCH_STALE_TTL", "3600"))
+# How long an empty result or an upstream error is cached before the upstream is asked again
+SEARCH_NEGATIVE_TTL = float(os.environ.get("SEARCH_NEGATIVE_TTL", "30"))
+SEARCH_LOCK_TTL = 20.0  # longer than the upstream timeout, so a crashed holder cannot wedge a key
 
 
 class StubMode:
@@ -21,61 +30,70 @@ class StubMode:
     @staticmethod
     def search(query: str) -> list[Citation]:
         return [
-            {
-                "title": "Example: Python asyncio documentation",
-                "url": "https://docs.python.org/3/library/asyncio.html",
-                "snippet": "asyncio is used as a foundation for multiple Python asynchronous frameworks.",
-                "published_at": None,
-                "source_name": "Python Docs",
-            },
-            {
-                "title": "Example: FastAPI Concurrency",
-                "url": "https://fastapi.tiangolo.com/async/",
-                "snippet": "FastAPI supports async def endpoints for non-blocking I/O.",
-                "published_at": None,
-                "source_name": "FastAPI",
-            },
-            {
-                "title": "Example: HTTPX async client",
-                "url": "https://www.python-httpx.org/async/",
-                "snippet": "Use httpx.AsyncClient() for async HTTP requests.",
-                "published_at": None,
-                "source_name": "HTTPX",
-            },
+            Citation(
+                title="Example: Python asyncio documentation",
+                url="https://docs.python.org/3/library/asyncio.html",
+                snippet="asyncio is used as a foundation for multiple Python asynchronous frameworks.",
+                source_name="Python Docs",
+            ),
+            Citation(
+                title="Example: FastAPI Concurrency",
+                url="https://fastapi.tiangolo.com/async/",
+                snippet="FastAPI supports async def endpoints for non-blocking I/O.",
+                source_name="FastAPI",
+            ),
+            Citation(
+                title="Example: HTTPX async client",
+                url="https://www.python-httpx.org/async/",
+                snippet="Use httpx.AsyncClient() for async HTTP requests.",
+                source_name="HTTPX",
+            ),
         ]
 
 
 def _normalize_citation(raw: dict) -> Citation:
     """Map You.com result item to our citation shape."""
-    return {
-        "title": raw.get("title") or raw.get("name") or "",
-        "url": raw.get("url") or raw.get("link") or "",
-        "snippet": raw.get("snippet") or raw.get("description") or raw.get("body") or "",
-        "published_at": raw.get("published_at") or raw.get("date"),
-        "source_name": raw.get("source") or raw.get("source_name"),
-    }
+    get = raw.get
+    return Citation(  # positional: title, url, snippet, published_at, source_name
+        get("title") or get("name") or "",
+        get("url") or get("link") or "",
+        get("snippet") or get("description") or get("body") or "",
+        get("published_at") or get("date"),
+        get("source") or get("source_name"),
+    )
 
 
 class YouClient:
     """Minimal You.com Search API client with citation-backed results."""
 
-    def __init__(self, api_key: Optional[str] = None, stub: Optional[bool] = None):
+    def __init__(self, api_key: Optional[str] = None, stub: Optional[bool] = None, recorder=None):
         self.api_key = api_key or YOU_API_KEY
         self.stub = stub if stub is not None else (not self.api_key or STUB_MODE)
         self.base = YOU_BASE
+        self.recorder = recorder  # TrafficRecorder: raw upstream exchanges for replay
 
     async def search(self, query: str) -> list[Citation]:
         """Fetch search results; return normalized citations. Uses stub when no API key."""
         if self.stub:
             return StubMode.search(query)
 
+        import httpx  # deferred: stub-mode pods never load the HTTP stack
+
+        t = time.perf_counter()
         async with httpx.AsyncClient(timeout=15.0) as client:
             # You.com Search API (typical pattern: GET with query and API key header)
-            resp = await client.get(
-                f"{self.base}/search",
-                params={"query": query},
-                headers={"X-API-Key": self.api_key} if self.api_key else {},
-            )
+            try:
+                resp = await client.get(
+                    f"{self.base}/search",
+                    params={"query": query},
+                    headers={"X-API-Key": self.api_key} if self.api_key else {},
+                )
+            except httpx.HTTPError:
+                if self.recorder is not None:
+                    self.recorder.record_search(query, (time.perf_counter() - t) * 1000, 0, "")
+                raise
+            if self.recorder is not None:
+                self.recorder.record_search(query, (time.perf_counter() - t) * 1000, resp.status_code, resp.text)
             resp.raise_for_status()
             data = resp.json()
 
@@ -89,3 +107,133 @@ class YouClient:
                 if isinstance(item, dict):
                     citations.append(_normalize_citation(item))
         return citations[:15]  # cap for response size
+
+
+def search_cache_key(query: str) -> str:
+    normalized = " ".join(query.lower().split())
+    return "search:" + hashlib.sha256(normalized.encode()).hexdigest()[:32]
+
+
+def search_cache_entry(citations: list, error: Optional[str] = None, fetched_at: Optional[float] = None,
+                       retry_at: float = 0.0) -> bytes:
+    """Encoded search cache value: results plus when they were fetched (wall clock, shared by
+    replicas). retry_at holds off refreshes after a failed one; error marks a cached failure."""
+    entry = {"at": time.time() if fetched_at is None else fetched_at, "citations": citations}
+    if error:
+        entry["error"] = error
+    if retry_at:
+        entry["retry_at"] = retry_at
+    return orjson.dumps(entry)
+
+
+class SearchResults(list):
+    """Citations from CachedYouClient.search. stale: served past SEARCH_CACHE_TTL while a
+    refresh runs; error: the upstream failed (recently) and there was nothing to fall back to."""
+
+    __slots__ = ("stale", "error")
+
+    def __init__(self, citations=(), stale: bool = False, error: Optional[str] = None):
+        super().__init__(citations)
+        self.stale = stale
+        self.error = error
+
+
+class CachedYouClient:
+    """YouClient wrapper backed by the shared state tier: results are cached across
+    replicas, and concurrent misses for the same query are collapsed to one upstream
+    call (single-flight lock; waiters poll the cache).
+    Results older than ttl are served stale (for up to stale_ttl more) while one background
+    refresh replaces them; empty results and upstream errors are cached for negative_ttl."""
+
+    def __init__(self, client: YouClient, state, ttl: float = SEARCH_CACHE_TTL, poll_interval: float = 0.05,
+                 stale_ttl: float = SEARCH_STALE_TTL, negative_ttl: float = SEARCH_NEGATIVE_TTL):
+        self.client = client
+        self.state = state
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self._refreshing: set[asyncio.Task] = set()
+
+    @property
+    def stub(self) -> bool:
+        return self.client.stub
+
+    async def _entry(self, key: str) -> Optional[dict]:
+        raw = await run_state(self.state, "get", key)
+        return None if raw is None else orjson.loads(raw)
+
+    def _results(self, entry: dict) -> SearchResults:
+        citations = [Citation.from_dict(c) for c in entry["citations"]]
+        if entry.get("error"):
+            return SearchResults(citations, error=entry["error"])
+        return SearchResults(citations, stale=time.time() - entry["at"] >= self.ttl)
+
+    async def search(self, query: str) -> SearchResults:
+        key = search_cache_key(query)
+        entry = await self._entry(key)
+        if entry is not None:
+            results = self._results(entry)
+            if results.stale and time.time() >= entry.get("retry_at", 0):
+                await self._refresh_in_background(query, key)
+            return results
+        token = await run_state(self.state, "acquire", key, SEARCH_LOCK_TTL)
+        if token is None:
+            # Another request (maybe on another replica) is fetching this query
+            deadline = asyncio.get_running_loop().time() + SEARCH_LOCK_TTL
+            while asyncio.get_running_loop().time() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                entry = await self._entry(key)
+                if entry is not None:
+                    return self._results(entry)
+                token = await run_state(self.state, "acquire", key, SEARCH_LOCK_TTL)
+                if token is not None:
+                    break
+        try:
+            return await self._fetch(query, key, None)
+        finally:
+            if token is not None:
+                await run_state(self.state, "release", key, token)
+
+    async def _fetch(self, query: str, key: str, previous: Optional[dict]) -> SearchResults:
+        """Ask the upstream and cache the outcome. A failed refresh keeps the previous good
+        results (served stale) and only delays the next attempt."""
+        try:
+            citations = await self.client.search(query)
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            if previous is not None:
+                return await self._keep_previous(key, previous)
+            await run_state(self.state, "set", key, search_cache_entry([], error=error), self.negative_ttl)
+            return SearchResults(error=error)
+        if not citations and previous is not None:
+            return await self._keep_previous(key, previous)  # an empty refresh does not replace good results
+        ttl = self.ttl + self.stale_ttl if citations else self.negative_ttl
+        await run_state(self.state, "set", key, search_cache_entry(citations), ttl)
+        return SearchResults(citations)
+
+    async def _keep_previous(self, key: str, previous: dict) -> SearchResults:
+        """Keep serving previous after a failed or empty refresh; hold off the next for negative_ttl."""
+        retry_at = time.time() + self.negative_ttl
+        entry = search_cache_entry(previous["citations"], fetched_at=previous["at"], retry_at=retry_at)
+        await run_state(self.state, "set", key, entry, self._remaining_ttl(previous))
+        return self._results(previous)
+
+    def _remaining_ttl(self, entry: dict) -> float:
+        return max(entry["at"] + self.ttl + self.stale_ttl - time.time(), 0.001)
+
+    async def _refresh_in_background(self, query: str, key: str) -> None:
+        token = await run_state(self.state, "acquire", key + ":refresh", SEARCH_LOCK_TTL)
+        if token is None:
+            return  # another request or replica is already refreshing
+        task = asyncio.create_task(self._refresh(query, key, token))
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshing.discard)
+
+    async def _refresh(self, query: str, key: str, token: str) -> None:
+        try:
+            previous = await self._entry(key)
+            if previous is not None and not previous.get("error"):
+                await self._fetch(query, key, previous)
+        finally:
+            await run_state(self.state, "release", key + ":refresh", token)
@@ -0,0 +1,175 @@
+"""
+Micro-batcher for the embedding worker: request threads enqueue texts and block on a future;
+one batcher thread per process drains the queue into batches (up to EMBED_MAX_BATCH texts,
+waiting at most EMBED_MAX_WAIT_MS for more) and runs the model once per batch.
+Counters live in shared memory created before fork (shared_metrics(), called from the
+gunicorn master's on_starting hook), so /metrics from any worker process reports pod-wide
+queue depth and batch sizes, with or without preload_app.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import Array
+from typing import Optional
+
+EMBED_MAX_BATCH = int(os.environ.get("EMBED_MAX_BATCH", "64"))
+EMBED_MAX_WAIT_MS = float(os.environ.get("EMBED_MAX_WAIT_MS", "5"))
+EMBED_TIMEOUT = float(os.environ.get("EMBED_TIMEOUT", "30"))
+
+# Batch-size histogram buckets (upper bounds, in texts); the last bucket is open-ended
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+_QUEUE_DEPTH, _REQUESTS, _TEXTS, _BATCHES, _ERRORS, _BUSY_US = range(6)
+_HIST = 6
+
+
+class Metrics:
+    """Pod-wide counters in a shared int64 array (inherited across fork)."""
+
+    def __init__(self):
+        self._a = Array("q", _HIST + len(BATCH_BUCKETS) + 1)
+
+    def add(self, index: int, value: int = 1) -> None:
+        with self._a.get_lock():
+            self._a[index] += value
+
+    def record_batch(self, size: int, busy_s: float) -> None:
+        bucket = next((i for i, b in enumerate(BATCH_BUCKETS) if size <= b), len(BATCH_BUCKETS))
+        with self._a.get_lock():
+            self._a[_BATCHES] += 1
+            self._a[_TEXTS] += size
+            self._a[_BUSY_US] += int(busy_s * 1e6)
+            self._a[_HIST + bucket] += 1
+
+    def snapshot(self) -> dict:
+        with self._a.get_lock():
+            a = list(self._a)
+        labels = [f"<={b}" for b in BATCH_BUCKETS] + [f">{BATCH_BUCKETS[-1]}"]
+        return {
+            "queue_depth": a[_QUEUE_DEPTH],
+            "requests": a[_REQUESTS],
+            "texts": a[_TEXTS],
+            "batches": a[_BATCHES],
+            "errors": a[_ERRORS],
+            "avg_batch_size": round(a[_TEXTS] / a[_BATCHES], 2) if a[_BATCHES] else 0.0,
+            "model_busy_s": round(a[_BUSY_US] / 1e6, 3),
+            "batch_size_histogram": dict(zip(labels, a[_HIST:])),
+        }
+
+
+_metrics = None
+
+
+def shared_metrics() -> Metrics:
+    """The pod's Metrics. Must first be called before fork (gunicorn on_starting) so every
+    worker inherits the same shared array; a process that allocates it later counts alone."""
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics()
+    return _metrics
+
+
+class BatcherClosed(RuntimeError):
+    """Submitted to (or still queued in) a batcher that has been closed."""
+
+
+class MicroBatcher:
+    """Collects concurrent embed calls into model batches. Create it after fork (threads do
+    not survive fork); see batcher_for_process."""
+
+    def __init__(self, fn, metrics: Metrics, max_batch: int = EMBED_MAX_BATCH, max_wait_ms: float = EMBED_MAX_WAIT_MS):
+        self.fn = fn
+        self.metrics = metrics
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._q: queue.Queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: list[str], timeout: float = EMBED_TIMEOUT) -> list:
+        if self._closed:
+            raise BatcherClosed("batcher is closed")
+        fut: Future = Future()
+        self.metrics.add(_REQUESTS)
+        self.metrics.add(_QUEUE_DEPTH, len(texts))
+        self._q.put((texts, fut))
+        return fut.result(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stop the batcher thread once the batch in progress is done; calls still queued
+        fail with BatcherClosed."""
+        self._closed = True
+        self._q.put(None)
+        self._thread.join(timeout)
+
+    def _fail_queued(self) -> None:
+        while True:
+            try:
+                item = self._q.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                self.metrics.add(_QUEUE_DEPTH, -len(item[0]))
+                item[1].set_exception(BatcherClosed("batcher is closed"))
+
+    def _run(self) -> None:
+        while True:
+            first = None if self._closed else self._q.get()
+            if self._closed:  # close() also queues None to wake a waiting get
+                if first is not None:
+                    self._q.put(first)
+                self._fail_queued()
+                return
+            batch = [first]
+            n = len(first[0])
+            deadline = time.monotonic() + self.max_wait
+            while n < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._q.get(timeout=remaining) if remaining > 0 else self._q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:  # closed: run what was collected, then stop
+                    break
+                batch.append(item)
+                n += len(item[0])
+            self.metrics.add(_QUEUE_DEPTH, -n)
+            texts = [t for item, _ in batch for t in item]
+            t0 = time.perf_counter()
+            try:
+                vectors = self.fn(texts)
+            except Exception as exc:
+                self.metrics.add(_ERRORS)
+                for _, fut in batch:
+                    fut.set_exception(exc)
+            else:
+                self.metrics.record_batch(n, time.perf_counter() - t0)
+                i = 0
+                for item, fut in batch:
+                    fut.set_result(vectors[i:i + len(item)])
+                    i += len(item)
+
+
+_batcher = None
+_batcher_pid = None
+_batcher_lock = threading.Lock()
+
+
+def batcher_for_process(fn, metrics: Metrics) -> MicroBatcher:
+    """The current process's batcher, (re)created lazily after fork."""
+    global _batcher, _batcher_pid
+    with _batcher_lock:
+        if _batcher_pid != os.getpid():
+            _batcher = MicroBatcher(fn, metrics)
+            _batcher_pid = os.getpid()
+        return _batcher
+
+
+def close_process_batcher(timeout: Optional[float] = None) -> None:
+    """Close this process's batcher, if it has one (worker shutdown)."""
+    with _batcher_lock:
+        batcher = _batcher if _batcher_pid == os.getpid() else None
+    if batcher is not None:
+        batcher.close(timeout)
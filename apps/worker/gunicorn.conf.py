@@ -0,0 +1,46 @@
+"""
+gunicorn settings for the embedding worker: gunicorn -c gunicorn.conf.py server:app
+CPU pods: several processes; preload_app loads the model once in the master and forked
+workers share its pages copy-on-write. GPU pods (CUDA_VISIBLE_DEVICES set): CUDA cannot be
+initialised before fork, so they default to one process without preload.
+gthread workers: request threads only enqueue into the process's micro-batcher and wait.
+The batcher's shared metrics are allocated in the master (on_starting) in both modes.
+"""
+import os
+
+_cpus = os.cpu_count() or 1
+_gpu = os.environ.get("CUDA_VISIBLE_DEVICES", "") not in ("", "-1")
+os.environ.setdefault("WORKER_PRELOAD", "0" if _gpu else "1")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get("WORKER_PROCESSES", "1" if _gpu else str(_cpus)))
+worker_class = "gthread"
+threads = int(os.environ.get("WORKER_THREADS", "16"))
+preload_app = os.environ["WORKER_PRELOAD"] == "1"
+timeout = 60
+graceful_timeout = 20
+keepalive = 5
+
+
+def on_starting(server):
+    # Allocate the pod-wide batcher counters in the master so every forked worker shares
+    # them, whether or not the app is preloaded
+    import batcher
+
+    batcher.shared_metrics()
+
+
+def post_fork(server, worker):
+    # Split the cores between processes instead of every process using all of them
+    import sys
+
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(max(1, _cpus // workers))
+
+
+def worker_exit(server, worker):
+    # Let the batch in progress finish; requests still queued fail instead of hanging
+    import batcher
+
+    batcher.close_process_batcher(timeout=graceful_timeout)
@@ -1,26 +1,76 @@
 """
 LiveProof AI – optional GPU worker (embedding service).
-Logs GPU utilization when run with nvidia.com/gpu. Without sentence-transformers this is a stub.
+Logs GPU utilization when run with nvidia.com/gpu. Without sentence-transformers (EMBED_MODEL
+unset or not installed) embeddings are a stub.
+torch is imported by a background warm-up thread, not at module import, so the server
+starts listening immediately; /ready turns 200 once the probe (and model load) is done.
+
+Production: gunicorn -c gunicorn.conf.py server:app  (several processes; the model is loaded
+once in the master before fork and shared copy-on-write; /embed calls are micro-batched).
+Development: python server.py
 """
 import os
 import json
+import threading
 from flask import Flask, request, jsonify
 
+from batcher import batcher_for_process, shared_metrics
+
 app = Flask(__name__)
 
-try:
-    import torch
-    HAS_TORCH = True
-    HAS_CUDA = torch.cuda.is_available()
-except Exception:
-    HAS_TORCH = False
-    HAS_CUDA = False
+EMBED_MODEL = os.environ.get("EMBED_MODEL", "")  # sentence-transformers model name, e.g. all-MiniLM-L6-v2
+STUB_DIM = 384  # sentence-transformers all-MiniLM-L6-v2 dimension
+
+torch = None
+HAS_TORCH = False
+HAS_CUDA = False
+model = None
+_warm = threading.Event()
+metrics = shared_metrics()  # allocated in the gunicorn master (on_starting), before fork
+
+
+def _warm_up() -> None:
+    """Import torch, probe CUDA and load the model (the slow part of a cold start)."""
+    global torch, HAS_TORCH, HAS_CUDA, model
+    try:
+        import torch as _torch
+        torch = _torch
+        HAS_TORCH = True
+        HAS_CUDA = torch.cuda.is_available()
+    except Exception:
+        HAS_TORCH = False
+        HAS_CUDA = False
+    try:
+        if EMBED_MODEL:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(EMBED_MODEL, device="cuda" if HAS_CUDA else "cpu")
+            model.eval()
+    except Exception:
+        model = None
+    finally:
+        _warm.set()
+
+
+def _encode(texts: list[str]) -> list[list[float]]:
+    """Model call for one batch (runs on the batcher thread)."""
+    if model is None:
+        return [[0.0] * STUB_DIM for _ in texts]
+    return model.encode(texts, batch_size=len(texts), normalize_embeddings=True).tolist()
+
+
+if os.environ.get("WORKER_PRELOAD") == "1":
+    # gunicorn master (preload_app): load once before fork so workers share the weights
+    _warm_up()
+else:
+    threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
 
 
 @app.route("/health", methods=["GET"])
 def health():
     gpu_info = {}
-    if HAS_TORCH and HAS_CUDA:
+    if not _warm.is_set():
+        gpu_info = {"cuda_available": None, "message": "GPU probe still running"}
+    elif HAS_TORCH and HAS_CUDA:
         gpu_info = {
             "cuda_available": True,
             "device_count": torch.cuda.device_count(),
@@ -31,18 +81,33 @@ def health():
     return jsonify({"status": "ok", "gpu": gpu_info})
 
 
+@app.route("/ready", methods=["GET"])
+def ready():
+    if not _warm.is_set():
+        return jsonify({"status": "warming"}), 503
+    return jsonify({"status": "ready", "gpu_used": HAS_CUDA, "model": EMBED_MODEL if model is not None else None})
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Pod-wide batcher metrics (all worker processes): queue depth, batch sizes, model time."""
+    return jsonify({"pid": os.getpid(), **metrics.snapshot()})
+
+
 @app.route("/embed", methods=["POST"])
 def embed():
-    """Stub: return fake embeddings. Replace with sentence-transformers + CUDA for real usage."""
+    """Embed texts; concurrent requests are batched into one model call. Stub (zero vectors)
+    when no model is loaded."""
     body = request.get_json() or {}
     texts = body.get("texts", [])
     if not texts:
         return jsonify({"error": "texts required"}), 400
-    # Stub: 384-dim zero vector per text (sentence-transformers all-MiniLM-L6-v2 dimension)
-    dim = 384
-    embeddings = [[0.0] * dim for _ in texts]
+    if not _warm.is_set():
+        _warm.wait()
+    embeddings = batcher_for_process(_encode, metrics).submit([str(t) for t in texts])
+    dim = len(embeddings[0]) if embeddings else STUB_DIM
     return jsonify({"embeddings": embeddings, "dim": dim, "gpu_used": HAS_CUDA})
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=8080)
+    app.run(host="0.0.0.0", port=8080, threaded=True)
@@ -0,0 +1,96 @@
+"""Unit tests for the embedding worker's micro-batcher: batching, max-wait flush, errors, shutdown."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from batcher import BatcherClosed, Metrics, MicroBatcher
+
+
+class Model:
+    """Fake model: one vector per text, records every batch; can block or fail."""
+
+    def __init__(self, fail=False):
+        self.batches: list[list[str]] = []
+        self.fail = fail
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, texts):
+        self.gate.wait(5)
+        self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("model failed")
+        return [[float(len(t))] for t in texts]
+
+
+def test_concurrent_submits_share_one_batch():
+    model, metrics = Model(), Metrics()
+    batcher = MicroBatcher(model, metrics, max_batch=64, max_wait_ms=50)
+    with ThreadPoolExecutor(8) as pool:
+        out = list(pool.map(lambda i: batcher.submit(["x" * i, "y"]), range(1, 9)))
+    assert out[2] == [[3.0], [1.0]]  # each caller gets its own slice, in order
+    assert len(model.batches) == 1 and len(model.batches[0]) == 16
+    snap = metrics.snapshot()
+    assert snap["requests"] == 8 and snap["texts"] == 16 and snap["batches"] == 1
+    assert snap["queue_depth"] == 0 and snap["batch_size_histogram"]["<=16"] == 1
+    batcher.close(1)
+
+
+def test_max_batch_caps_a_batch():
+    model = Model()
+    batcher = MicroBatcher(model, Metrics(), max_batch=4, max_wait_ms=50)
+    model.gate.clear()  # hold the first batch so the rest queue up behind it
+    with ThreadPoolExecutor(6) as pool:
+        futures = [pool.submit(batcher.submit, [f"t{i}"]) for i in range(6)]
+        time.sleep(0.1)
+        model.gate.set()
+        assert [f.result() for f in futures] == [[[2.0]]] * 6
+    assert all(len(b) <= 4 for b in model.batches) and sum(map(len, model.batches)) == 6
+    batcher.close(1)
+
+
+def test_a_lone_request_is_flushed_after_max_wait():
+    model = Model()
+    batcher = MicroBatcher(model, Metrics(), max_batch=64, max_wait_ms=20)
+    t = time.perf_counter()
+    assert batcher.submit(["alone"]) == [[5.0]]
+    assert 0.015 <= time.perf_counter() - t < 1.0
+    assert model.batches == [["alone"]]
+    batcher.close(1)
+
+
+def test_model_error_reaches_every_caller_in_the_batch():
+    model, metrics = Model(fail=True), Metrics()
+    batcher = MicroBatcher(model, metrics, max_wait_ms=50)
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(batcher.submit, [f"t{i}"]) for i in range(3)]
+        for f in futures:
+            with pytest.raises(RuntimeError, match="model failed"):
+                f.result()
+    assert len(model.batches) == 1 and metrics.snapshot()["errors"] == 1
+    model.fail = False
+    assert batcher.submit(["ok"]) == [[2.0]]  # the batcher thread survives the error
+    batcher.close(1)
+
+
+def test_close_finishes_the_running_batch_and_fails_queued_calls():
+    model, metrics = Model(), Metrics()
+    batcher = MicroBatcher(model, metrics, max_batch=1, max_wait_ms=0)
+    model.gate.clear()
+    with ThreadPoolExecutor(2) as pool:
+        running = pool.submit(batcher.submit, ["running"])
+        time.sleep(0.05)
+        queued = pool.submit(batcher.submit, ["queued"])
+        time.sleep(0.05)
+        closer = threading.Thread(target=batcher.close, args=(2,))
+        closer.start()
+        model.gate.set()
+        closer.join(2)
+        assert running.result(1) == [[7.0]]
+        with pytest.raises(BatcherClosed):
+            queued.result(1)
+    assert not batcher._thread.is_alive() and metrics.snapshot()["queue_depth"] == 0
+    with pytest.raises(BatcherClosed):
+        batcher.submit(["late"])
@@ -25,6 +25,9 @@ export interface VerifyResponse {
   can_execute: boolean;
   next_question?: string;
   topic?: string;
+  degraded_stages?: string[];
+  stale?: boolean;
+  cached_from?: string | null;
 }
 
 export interface ExecuteRequest {
@@ -62,4 +65,22 @@ export interface TopSource {
   citation_count: number;
 }
 
+export interface TopicDigest {
+  topic: string;
+  sessions: number;
+  reliability: {
+    mean: number;
+    stddev: number;
+    ewma: number;
+    trend: number;
+    min: number | null;
+    max: number | null;
+  };
+  consensus: string | null;
+  top_sources: TopSource[];
+  claim_clusters: { text: string; size: number; sessions: string[] }[];
+  latest: Omit<TopicCompareItem, 'claims_count'>[];
+  updated_at: string | null;
+}
+
 export const RELIABILITY_THRESHOLD = 0.65;
@@ -8,6 +8,7 @@ export default {
     { name: 'answer', type: 'text', title: 'Answer' },
     { name: 'reliabilityScore', type: 'number', title: 'Reliability Score' },
     { name: 'canExecute', type: 'boolean', title: 'Can Execute' },
+    { name: 'mode', type: 'string', title: 'Mode', options: { list: ['answer', 'execute'] } },
     { name: 'claims', type: 'array', of: [{ type: 'reference', to: [{ type: 'claim' }] }], title: 'Claims' },
     { name: 'createdAt', type: 'datetime', title: 'Created At' },
   ],